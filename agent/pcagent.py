@@ -132,11 +132,10 @@ class PCAgent:
             return
 
         # hotkey
-        match = re.match(r"hotkey \((.+), (.+)\)", action)
+        match = re.match(r"hotkey \((.+, .+)\)", action)
         if match:
-            key1 = match.group(1).lower()
-            key2 = match.group(2).lower()
-            pyautogui.hotkey(key1, key2)
+            keys = [key.lower() for key in match.group(1).split(", ")]  # two or more keys
+            pyautogui.hotkey(*keys)
             return
 
         # type text
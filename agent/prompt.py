@@ -27,8 +27,8 @@ scroll the screen with the offset (dx, dy). dx is the horizontal offset, and dy
 6. press key: key_content
 press the key key_content on the keyboard.
 
-7. hotkey (key1, key2)
-press the hotkey composed of key1 and key2.
+7. hotkey (key1, key2, ...)
+press the hotkey composed of two or more keys key1, key2, ... (e.g. hotkey (ctrl, shift, esc)).
 
 8. type text: text_content
 type content text_content on the keyboard.
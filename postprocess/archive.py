@@ -0,0 +1,179 @@
+# reader for the per-session frame archive written by the tracker (tracker/archive.py)
+#
+# <session>.frames      8-byte header, then records: header (magic, name length, data length, crc32) + name + data
+# <session>.frames.idx  optional index: (offset, record length, name length) + name per record
+#
+# events refer to archived frames as "<archive path>::<member name>"
+#
+# in "delta" storage mode a member is either a plain PNG keyframe or a delta record:
+# DELTA_MAGIC + header length + json header {"base": <previous member>, "rects": [[x, y, w, h, png length], ...]}
+# followed by the PNGs of the changed rectangles, to be pasted onto the decoded base frame
+
+import io
+import os
+import json
+import struct
+import zlib
+from PIL import Image
+
+ARCHIVE_EXT = '.frames'
+INDEX_EXT = '.idx'
+ARCHIVE_MAGIC = b'PCTFRAR1'
+RECORD_MAGIC = b'FRM1'
+RECORD_HEADER = struct.Struct('<4sIII')
+INDEX_ENTRY = struct.Struct('<QIH')
+REF_SEP = '::'
+DELTA_MAGIC = b'PCTDLT1\n'
+
+
+def split_ref(ref):
+    """
+    split a screenshot reference into (archive path, member name), or (None, path) for plain files
+    """
+    if REF_SEP in ref:
+        archive_path, name = ref.split(REF_SEP, 1)
+        return archive_path, name
+    return None, ref
+
+
+class FrameArchive:
+    """
+    read-only random access to the frames of an archive
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        if self.file.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            self.file.close()
+            raise ValueError(f"{path} is not a frame archive")
+        self.size = os.path.getsize(path)
+        self.offsets = {}  # name -> (offset, length)
+
+        # the index may be missing or torn (crash), scan the data file for the rest
+        end = len(ARCHIVE_MAGIC)
+        if os.path.exists(path + INDEX_EXT):
+            with open(path + INDEX_EXT, 'rb') as f:
+                raw = f.read()
+            pos = 0
+            while pos + INDEX_ENTRY.size <= len(raw):
+                offset, length, name_len = INDEX_ENTRY.unpack_from(raw, pos)
+                pos += INDEX_ENTRY.size
+                if pos + name_len > len(raw) or offset != end or offset + length > self.size:
+                    break
+                self.offsets[raw[pos:pos + name_len].decode('utf-8')] = (offset, length)
+                pos += name_len
+                end = offset + length
+
+        while end + RECORD_HEADER.size <= self.size:
+            self.file.seek(end)
+            magic, name_len, data_len, _ = RECORD_HEADER.unpack(self.file.read(RECORD_HEADER.size))
+            length = RECORD_HEADER.size + name_len + data_len
+            if magic != RECORD_MAGIC or end + length > self.size:
+                break
+            self.offsets[self.file.read(name_len).decode('utf-8', errors='replace')] = (end, length)
+            end += length
+
+    def names(self):
+        return list(self.offsets)
+
+    def read(self, name):
+        offset, length = self.offsets[name]
+        self.file.seek(offset)
+        record = self.file.read(length)
+        magic, name_len, data_len, crc = RECORD_HEADER.unpack_from(record)
+        body = record[RECORD_HEADER.size:]
+        if magic != RECORD_MAGIC or zlib.crc32(body) != crc:
+            raise ValueError(f"corrupted record {name} in {self.path}")
+        return body[name_len:name_len + data_len]
+
+    def decode(self, name):
+        """
+        decode a member into a PIL image, applying the delta chain back to its keyframe
+        """
+        chain = []
+        data = self.read(name)
+        while data.startswith(DELTA_MAGIC):
+            pos = len(DELTA_MAGIC)
+            (header_len,) = struct.unpack_from('<I', data, pos)
+            pos += 4
+            header = json.loads(data[pos:pos + header_len].decode('utf-8'))
+            pos += header_len
+            patches = []
+            for x, y, _, _, length in header['rects']:
+                patches.append((x, y, data[pos:pos + length]))
+                pos += length
+            chain.append(patches)
+            data = self.read(header['base'])
+
+        image = Image.open(io.BytesIO(data)).convert('RGB')
+        for patches in reversed(chain):
+            for x, y, png in patches:
+                with Image.open(io.BytesIO(png)) as patch:
+                    image.paste(patch.convert('RGB'), (x, y))
+        return image
+
+    def read_png(self, name):
+        """
+        return a member as a standalone image file, in the format of its name's extension
+        (delta members, which the tracker always names .png, are rebuilt as PNG)
+        """
+        data = self.read(name)
+        if not data.startswith(DELTA_MAGIC):
+            return data
+        buffer = io.BytesIO()
+        self.decode(name).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def unpack_archive(file_path):
+    """
+    extract the archived screenshots of a task jsonl file into screenshot/ and rewrite the paths,
+    so the following steps can work on plain files. return the number of extracted frames
+    """
+    task_dir = os.path.dirname(file_path)
+    with open(file_path, 'r', encoding='utf-8') as file:
+        entries = [json.loads(line) for line in file]
+
+    archives = {}
+    extracted = set()
+    for entry in entries:
+        archive_path, name = split_ref(entry['screenshot'])
+        if archive_path is None:
+            continue
+        archive_path = os.path.join(task_dir, archive_path)
+        if archive_path not in archives:
+            archives[archive_path] = FrameArchive(archive_path)
+        archive = archives[archive_path]
+
+        screenshot = f"screenshot/{name}"
+        if screenshot not in extracted and name in archive.offsets:
+            os.makedirs(os.path.join(task_dir, 'screenshot'), exist_ok=True)
+            with open(os.path.join(task_dir, screenshot), 'wb') as f:
+                f.write(archive.read_png(name))
+            extracted.add(screenshot)
+        entry['screenshot'] = screenshot
+
+    if not archives:
+        return 0
+
+    with open(file_path, 'w', encoding='utf-8') as file:
+        for entry in entries:
+            json.dump(entry, file, ensure_ascii=False)
+            file.write('\n')
+
+    for archive_path, archive in archives.items():
+        archive.close()
+        os.remove(archive_path)
+        if os.path.exists(archive_path + INDEX_EXT):
+            os.remove(archive_path + INDEX_EXT)
+
+    return len(extracted)
@@ -8,6 +8,7 @@ from openai import OpenAI
 from concurrent.futures import ThreadPoolExecutor
 from prompt import *
 from utils import *
+from imagecodec import base64_mime_type
 
 client = OpenAI()
 model = "gpt-4o"
@@ -26,7 +27,7 @@ def call_openai(query, base64_image=None):
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
+                            "url": f"data:{base64_mime_type(base64_image)};base64,{base64_image}"
                         }
                     } if base64_image else None,
                     {
@@ -56,17 +57,15 @@ def process_concurrently(data_dir, function):
 
         if os.path.isdir(item_path) and item.startswith(directory_name):
             print(f'Processing directory: {item_path}')
-            for filename in os.listdir(item_path):
-                if filename.endswith('.jsonl') and 'task' in filename:
-                    file_path = os.path.join(item_path, filename)   
-                    md_path = os.path.join(item_path, filename.replace('.jsonl', '.md'))
-                    try:
-                        with open(md_path, 'r', encoding='utf-8') as file:
-                            lines = file.readlines()
-                        task_description = lines[1].replace('**Description:** ', '').strip()
-                        tasks.append((file_path, task_description))
-                    except Exception as e:
-                        print(f"error: failed to extract task description from {md_path}: {e}")
+            for file_path in task_jsonl_files(item_path):
+                md_path = file_path.replace('.jsonl', '.md')
+                try:
+                    with open(md_path, 'r', encoding='utf-8') as file:
+                        lines = file.readlines()
+                    task_description = lines[1].replace('**Description:** ', '').strip()
+                    tasks.append((file_path, task_description))
+                except Exception as e:
+                    print(f"error: failed to extract task description from {md_path}: {e}")
 
     random.shuffle(tasks)
     with ThreadPoolExecutor(max_workers=CONCURRENT_NUM) as executor:
@@ -0,0 +1,68 @@
+# screenshot codec settings for postprocess (same codec names as tracker/imagecodec.py)
+#
+# the tracker may record screenshots as png, webp, jpeg or qoi; the format of a screenshot
+# is the extension of the path in its event record, never assume ".png".
+# images written here (converted, resized, marked) use CODEC. qoi is not accepted by the
+# model apis, so such screenshots are converted to CODEC first (see convert_image).
+
+import os
+from PIL import Image
+
+CODEC = 'png-small'  # png-small keeps the previous behaviour (PNG with optimize=True)
+
+# name -> (PIL format, extension, save options)
+CODECS = {
+    'png': ('PNG', '.png', {}),
+    'png-fast': ('PNG', '.png', {'compress_level': 1}),
+    'png-small': ('PNG', '.png', {'optimize': True}),
+    'webp-lossless': ('WEBP', '.webp', {'lossless': True, 'quality': 50, 'method': 3}),
+    'webp': ('WEBP', '.webp', {'quality': 90, 'method': 4}),
+    'jpeg': ('JPEG', '.jpg', {'quality': 92, 'subsampling': 0}),
+}
+
+# formats the following steps and the model apis can take as they are
+API_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+_BASE64_MIME = {'iVBOR': 'image/png', '/9j/': 'image/jpeg', 'UklGR': 'image/webp'}
+
+
+def codec_extension(codec=CODEC):
+    return CODECS[codec][1]
+
+
+def save_image(image, path, codec=CODEC):
+    """
+    save the image with the codec; the extension of path is replaced by the codec's.
+    return the path written
+    """
+    image_format, ext, options = CODECS[codec]
+    output_path = os.path.splitext(path)[0] + ext
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.save(output_path, format=image_format, **options)
+    return output_path
+
+
+def convert_image(image_path, codec=CODEC):
+    """
+    re-encode a screenshot with the codec if the apis cannot take its format,
+    delete the original and return the new path (or the unchanged path)
+    """
+    if os.path.splitext(image_path)[1].lower() in API_EXTENSIONS:
+        return image_path
+    with Image.open(image_path) as image:
+        image.load()
+        output_path = save_image(image, image_path, codec)
+    if output_path != image_path:
+        os.remove(image_path)
+    return output_path
+
+
+def base64_mime_type(base64_image):
+    """
+    mime type of base64 encoded image data, from its leading bytes
+    """
+    for prefix, mime_type in _BASE64_MIME.items():
+        if base64_image.startswith(prefix):
+            return mime_type
+    return 'image/jpeg'
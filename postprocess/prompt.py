@@ -150,7 +150,7 @@ Explanation of actions:
 4. **drag from (x1, y1) to (x2, y2)**: Drag the mouse from the position (x1, y1) to (x2, y2).
 5. **scroll (dx, dy)**: Scroll with offsets (dx for horizontal movement, dy for vertical movement).
 6. **press key: key_content**: Press the `key_content` on the keyboard.
-7. **hotkey (key1, key2)**: Press the combination of `key1` and `key2`.
+7. **hotkey (key1, key2, ...)**: Press the combination of two or more keys `key1`, `key2`, ... together.
 8. **type text: text_content**: Type the text `text_content` on the keyboard.
 9. **wait**: Pause briefly, usually for system responses or screen updates.
 10. **finish**: Indicate the task has been completed.
@@ -1,6 +1,9 @@
 # multi-function script for data refinement
 # 1. rewrite screenshot path
+# 1.1 unpack screenshots stored in a frame archive (tracker "archive"/"delta" storage)
 # 2. clean fail and error record
+# 2.1 split screenshots shared by several actions
+# 2.2 convert screenshots the model apis cannot take (e.g. qoi) to the postprocess codec
 # 3. check last action finish
 # 4. merge press and drag
 # 5. remove redundant actions
@@ -14,10 +17,13 @@
 
 import os
 import json
+import shutil
 import sys
 import numpy as np
 from PIL import Image
 from utils import *
+from imagecodec import convert_image
+from archive import unpack_archive
 
 OVERWRITE_MARKED = False
 REMOVE_FAIL_RECORD = True
@@ -240,9 +246,12 @@ def resize(file_path):
         try:
             data = json.loads(line)
 
-            # process the screenshot
+            # process the screenshot (re-encoding may change its extension)
             screenshot_path = os.path.join(task_dir, data['screenshot'])
-            assert resize_to_1080p(screenshot_path), "Error occured!"
+            resized_path = resize_to_1080p(screenshot_path)
+            assert resized_path, "Error occured!"
+            if resized_path != screenshot_path:
+                data['screenshot'] = os.path.relpath(resized_path, task_dir).replace("\\", "/")
 
             # process the action
             data['action'] = resize_action(data['action'], scale_x, scale_y)
@@ -391,7 +400,7 @@ def remove_redundant_actions(file_path):
             screenshot_paths.append(screenshot_path)
             continuous_wait_at_begin = True
         # delete the redundant ctrl and shift
-        elif entry['action'] == 'press key ctrl' and (entry == all_entries[-1] or all_entries[id+1]['action'] == 'press key ctrl' or all_entries[id+1]['action'].startswith("hotkey (Ctrl,")):
+        elif entry['action'] == 'press key ctrl' and (entry == all_entries[-1] or all_entries[id+1]['action'] == 'press key ctrl' or all_entries[id+1]['action'].lower().startswith("hotkey (ctrl,")):
             ctrl_cnt += 1
             screenshot_paths.append(screenshot_path)
         elif entry['action'] == 'press key shift' and (entry == all_entries[-1] or all_entries[id+1]['action'] == 'press key shift' or all_entries[id+1]['action'].startswith('type')):
@@ -446,8 +455,7 @@ def remove_meaningless_actions(file_path):
         # check the similarity of two continuous screenshots
         if entry != all_entries[-1] and (entry['action'] == 'wait' or 'click' in entry['action']):
             screenshot_path1 = os.path.join(os.path.dirname(file_path), entry['screenshot'])
-            screenshot_path2 = os.path.join(os.path.dirname(file_path), all_entries[id+1]['screenshot'])
-            if are_screenshots_identical(screenshot_path1, screenshot_path2):
+            if are_entries_identical(entry, all_entries[id+1], os.path.dirname(file_path)):
                 screenshot_paths.append(screenshot_path1)
                 print(f"action {id}: {entry['action']} in {file_path} is a meaningless action, it has been removed")
             else:
@@ -522,6 +530,71 @@ def merge_press_drag(file_path):
         os.remove(screenshot_path)
     
 
+def split_shared_screenshots(file_path):
+    """
+    the tracker stores an unchanged screen only once and lets later actions reference
+    the same file; give every action its own copy, since the following steps delete,
+    resize and mark screenshots per action.
+    """
+    if DETAIL_OUTPUT:
+        print(f"Split shared screenshots: {file_path}")
+
+    task_dir = os.path.dirname(file_path)
+    seen = set()
+    modified = False
+    modified_lines = []
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for id, line in enumerate(file):
+            entry = json.loads(line)
+            screenshot = entry['screenshot']
+            if screenshot in seen:
+                base, ext = os.path.splitext(screenshot)
+                copied = f"{base}_dup{id}{ext}"
+                source_path = os.path.join(task_dir, screenshot)
+                if os.path.exists(source_path):
+                    shutil.copyfile(source_path, os.path.join(task_dir, copied))
+                entry['screenshot'] = copied
+                entry.pop('screenshot_reused', None)
+                modified = True
+            seen.add(entry['screenshot'])
+            modified_lines.append(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    if not modified:
+        return
+
+    with open(file_path, 'w', encoding='utf-8') as outfile:
+        outfile.writelines(modified_lines)
+
+
+def convert_screenshots(file_path):
+    """
+    re-encode screenshots in formats the model apis cannot take (the format is the
+    extension recorded in the event) with the postprocess codec, and rewrite the paths
+    """
+    if DETAIL_OUTPUT:
+        print(f"Convert screenshots: {file_path}")
+
+    task_dir = os.path.dirname(file_path)
+    modified = False
+    modified_lines = []
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            entry = json.loads(line)
+            screenshot_path = os.path.join(task_dir, entry['screenshot'])
+            if os.path.exists(screenshot_path):
+                converted = convert_image(screenshot_path)
+                if converted != screenshot_path:
+                    entry['screenshot'] = os.path.relpath(converted, task_dir).replace("\\", "/")
+                    modified = True
+            modified_lines.append(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    if not modified:
+        return
+
+    with open(file_path, 'w', encoding='utf-8') as outfile:
+        outfile.writelines(modified_lines)
+
+
 def check_finish(file_path):
     if DETAIL_OUTPUT:
         print(f"Check finish: {file_path}")
@@ -563,8 +636,11 @@ def check_finish(file_path):
 def process_task_jsonl_file(file_path):
     print(f"Process task jsonl file: {file_path}")
     rewrite_screenshot_path(file_path)
+    unpack_archive(file_path)  # the following steps open and edit screenshot files in place
     if clean_fail_and_error(file_path):
         return -1  # the file is deleted
+    split_shared_screenshots(file_path)
+    convert_screenshots(file_path)
     check_finish(file_path)
     merge_press_drag(file_path)
     remove_redundant_actions(file_path)
@@ -601,15 +677,12 @@ def process_events_directories():
         # check if it's a directory and starts with the specified name
         if os.path.isdir(item_path) and item.startswith(directory_prefix):
             print(f'Processing directory: {item_path}')
-            for filename in os.listdir(item_path):
-                # task jsonl file
-                if filename.endswith('.jsonl') and 'task' in filename:
-                    file_path = os.path.join(item_path, filename)
-                    cnt = process_task_jsonl_file(file_path)
-                    if cnt != -1:
-                        total_action_cnt += cnt
-                        total_record_cnt += 1
-                        max_action_cnt = max(max_action_cnt, cnt)
+            for file_path in task_jsonl_files(item_path):
+                cnt = process_task_jsonl_file(file_path)
+                if cnt != -1:
+                    total_action_cnt += cnt
+                    total_record_cnt += 1
+                    max_action_cnt = max(max_action_cnt, cnt)
     
     average_action_cnt = total_action_cnt / total_record_cnt
     print(f"Total records: {total_record_cnt}")
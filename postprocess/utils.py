@@ -5,12 +5,31 @@ import base64
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw
+from imagecodec import save_image
 
 POINT_RADIUS = 3
 CIRCLE_RADIUS = 18
 CIRCLE_WIDTH = 3
 
 
+def task_jsonl_files(events_dir):
+    """
+    task jsonl files of an events directory: in the session directories (one per session,
+    see tracker/sessiondir.py) or, in the older flat layout, in events_dir itself
+    """
+    files = []
+    for item in sorted(os.listdir(events_dir)):
+        item_path = os.path.join(events_dir, item)
+        if os.path.isdir(item_path):
+            if item.startswith('.') or item == 'screenshot':
+                continue  # unfinished sessions, flat layout screenshots
+            files.extend(os.path.join(item_path, filename) for filename in sorted(os.listdir(item_path))
+                         if filename.endswith('.jsonl') and 'task' in filename)
+        elif item.endswith('.jsonl') and 'task' in item:
+            files.append(item_path)
+    return files
+
+
 def rewrite_markdown_file_by_jsonl(jsonl_path):
     """
     rewrite markdown file by jsonl file
@@ -72,10 +91,12 @@ def remove_screenshot(screenshot_path):
     if os.path.exists(screenshot_path):
         os.remove(screenshot_path)
 
-    # remove the possible _marked file
-    marked_screenshot_path = screenshot_path.replace('.png', '_marked.png')
-    if os.path.exists(marked_screenshot_path):
-        os.remove(marked_screenshot_path)
+    # remove the possible _marked file (any format)
+    base = os.path.splitext(screenshot_path)[0]
+    for ext in ('.png', '.jpg', '.jpeg', '.webp'):
+        marked_screenshot_path = f"{base}_marked{ext}"
+        if os.path.exists(marked_screenshot_path):
+            os.remove(marked_screenshot_path)
 
 
 def get_full_action(entry):
@@ -167,41 +188,44 @@ def mark_image(is_click_action, image_path, rect, point1, point2=None):
     base, ext = os.path.splitext(image_path)
     output_path = f"{base}_marked{ext}"
 
-    # save the marked image
-    image.save(output_path)
+    # save the marked image (with the postprocess codec, which may change the extension)
+    output_path = save_image(image, output_path)
     # print(f"marked image saved to: {output_path}")
     return output_path
 
 
 def resize_to_1080p(image_path):
     """
-    check and resize the image to fixed 1920x1080 resolution, return whether success
+    check and resize the image to fixed 1920x1080 resolution, return the path of the
+    resulting image (the extension follows the postprocess codec), or None on failure
     """
     try:
         with Image.open(image_path) as img:
             img.verify()  # verify the image integrity
     except:
         print(f"[ERROR] image corrupted: {image_path}")
-        return False
+        return None
 
     # open the image
     with Image.open(image_path) as img:
         # check if the image is already 1080p
         if img.size == (1920, 1080):
             print(f"image is already 1080p, no need to resize: {image_path}")
-            return True
+            return image_path
 
         # resize the image to fixed 1920x1080 resolution
         try:
             resized_img = img.resize((1920, 1080), Image.LANCZOS)
         except:
             print(f"[ERROR] cannot resize image: {image_path}")
-            return False
+            return None
 
-        # save the resized image, overwrite the original file
-        resized_img.save(image_path, optimize=True)
-        print(f"image resized and saved: {image_path}")
-        return True
+    # save the resized image, overwrite the original file
+    output_path = save_image(resized_img, image_path)
+    if output_path != image_path:
+        os.remove(image_path)
+    print(f"image resized and saved: {output_path}")
+    return output_path
 
 
 def resize_action(action_str, scale_x, scale_y):
@@ -257,6 +281,24 @@ def are_screenshots_identical(screenshot_path1, screenshot_path2):
     return not np.any(difference)
 
 
+def are_entries_identical(entry1, entry2, task_dir):
+    """
+    check if the screenshots of two entries are identical, using the tile hashes
+    recorded by the tracker when available and decoding the images otherwise
+    """
+    if entry1['screenshot'] == entry2['screenshot']:
+        return True  # the tracker reused the file for an unchanged screen
+
+    hash1 = entry1.get('tile_hash')
+    hash2 = entry2.get('tile_hash')
+    if hash1 and hash2:
+        return hash1 == hash2
+
+    screenshot_path1 = os.path.join(task_dir, entry1['screenshot'])
+    screenshot_path2 = os.path.join(task_dir, entry2['screenshot'])
+    return are_screenshots_identical(screenshot_path1, screenshot_path2)
+
+
 def parse_click_action(action):
     pattern = r'((?:double |right )?click)\s*\((\d+),\s*(\d+)\)'
     match = re.match(pattern, action)
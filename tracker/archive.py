@@ -0,0 +1,367 @@
+"""Append-only per-session frame archive.
+
+Instead of one PNG file per event in its `screenshot/` directory, a session can store its
+encoded screenshots in a single container file next to its JSONL:
+
+    <prefix>_<timestamp>.frames       data file
+    <prefix>_<timestamp>.frames.idx   offset index
+
+Data file layout: an 8-byte header (`ARCHIVE_MAGIC`), then records of
+
+    RECORD_HEADER (magic, name length, data length, crc32) + name (utf-8) + data
+
+The index holds one entry per record (offset, record length, name length, name)
+and is only an accelerator: it is written after the record, so a crash can leave
+it short or torn. Readers validate it and recover trailing records by scanning
+the data file, stopping at the first torn record.
+
+Events refer to archived frames as "<archive path>::<member name>" (see
+`make_ref` / `split_ref`).
+
+Command line converter (run from the tracker directory):
+
+    python archive.py pack   [events_dir] [--keep]   PNG folder -> archives
+    python archive.py unpack [events_dir] [--keep]   archives -> PNG folder
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import sys
+import threading
+import zlib
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+ARCHIVE_EXT = ".frames"
+INDEX_EXT = ".idx"
+ARCHIVE_MAGIC = b"PCTFRAR1"
+RECORD_MAGIC = b"FRM1"
+RECORD_HEADER = struct.Struct("<4sIII")  # magic, name length, data length, crc32(name + data)
+INDEX_ENTRY = struct.Struct("<QIH")  # record offset, record length, name length
+REF_SEP = "::"
+DELTA_PREFIX = b"PCTDLT"  # members written by deltacodec.py in "delta" storage mode
+
+
+def make_ref(archive_path: str, name: str) -> str:
+    return f"{archive_path}{REF_SEP}{name}"
+
+
+def split_ref(ref: str) -> Tuple[Optional[str], str]:
+    """Split a screenshot reference into (archive path, member) or (None, file path)."""
+    if REF_SEP in ref:
+        archive_path, name = ref.split(REF_SEP, 1)
+        return archive_path, name
+    return None, ref
+
+
+class FrameArchiveWriter:
+    """Appends encoded frames to a session archive (thread-safe)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = path + INDEX_EXT
+        self._lock = threading.Lock()
+
+        self._data = open(path, "ab")
+        if self._data.tell() == 0:
+            self._data.write(ARCHIVE_MAGIC)
+            self._data.flush()
+        self._index = open(self.index_path, "ab")
+
+        self.count = 0
+        self.bytes_written = 0
+
+        # Reorder buffer: frames are encoded out of order by the pool, but are written
+        # in the order they were reserved (= recording order).
+        self._next_ticket = 0
+        self._next_write = 0
+        self._pending = {}  # ticket -> (name, data); data is None if abandoned, ... while pending
+
+    def reserve(self, name: str) -> int:
+        """Reserve the next position for `name`; fill it later with `fill()` or `abandon()`."""
+        with self._lock:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._pending[ticket] = (name, Ellipsis)
+            return ticket
+
+    def fill(self, ticket: int, data: Optional[bytes]) -> None:
+        """Provide the data for a reserved position (None drops it)."""
+        with self._lock:
+            name, _ = self._pending[ticket]
+            self._pending[ticket] = (name, data)
+            self._drain(force=False)
+
+    def abandon(self, ticket: int) -> None:
+        self.fill(ticket, None)
+
+    def _drain(self, force: bool) -> None:
+        while self._next_write < self._next_ticket:
+            name, data = self._pending.get(self._next_write, (None, Ellipsis))
+            if data is Ellipsis and not force:
+                return
+            self._pending.pop(self._next_write, None)
+            self._next_write += 1
+            if data is not None and data is not Ellipsis:
+                self._write(name, data)
+
+    def append(self, name: str, data: bytes) -> None:
+        """Write a record immediately (bypasses the reorder buffer)."""
+        with self._lock:
+            self._write(name, data)
+
+    def _write(self, name: str, data: bytes) -> None:
+        if self._data.closed:
+            raise ValueError(f"archive {self.path} is closed")
+        name_bytes = name.encode("utf-8")
+        header = RECORD_HEADER.pack(RECORD_MAGIC, len(name_bytes), len(data),
+                                    zlib.crc32(data, zlib.crc32(name_bytes)))
+        offset = self._data.tell()
+        self._data.write(header)
+        self._data.write(name_bytes)
+        self._data.write(data)
+        self._data.flush()  # record first, index second: the index never points past the data
+
+        record_len = RECORD_HEADER.size + len(name_bytes) + len(data)
+        self._index.write(INDEX_ENTRY.pack(offset, record_len, len(name_bytes)) + name_bytes)
+        self._index.flush()
+
+        self.count += 1
+        self.bytes_written += record_len
+
+    def close(self) -> None:
+        """Write whatever is still pending (skipping unfilled positions) and close."""
+        with self._lock:
+            if not self._data.closed:
+                self._drain(force=True)
+            for f in (self._data, self._index):
+                try:
+                    f.close()
+                except Exception:
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameArchiveReader:
+    """Random access to the frames of a session archive."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        if self._file.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a frame archive")
+        self._size = os.path.getsize(path)
+        self._offsets: Dict[str, Tuple[int, int]] = {}  # name -> (record offset, record length)
+        self._order: List[str] = []
+        self._load_index(path + INDEX_EXT)
+
+    def _add(self, name: str, offset: int, length: int) -> None:
+        if name not in self._offsets:
+            self._order.append(name)
+        self._offsets[name] = (offset, length)  # last write wins
+
+    def _load_index(self, index_path: str) -> None:
+        end = len(ARCHIVE_MAGIC)
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                raw = f.read()
+            pos = 0
+            while pos + INDEX_ENTRY.size <= len(raw):
+                offset, length, name_len = INDEX_ENTRY.unpack_from(raw, pos)
+                pos += INDEX_ENTRY.size
+                if pos + name_len > len(raw) or offset != end or offset + length > self._size:
+                    break  # torn or inconsistent entry: rescan from here
+                self._add(raw[pos:pos + name_len].decode("utf-8"), offset, length)
+                pos += name_len
+                end = offset + length
+
+        # Recover records the index does not know about (crash between data and index write).
+        for name, offset, length in self._scan(end):
+            self._add(name, offset, length)
+
+    def _scan(self, offset: int) -> Iterator[Tuple[str, int, int]]:
+        while offset + RECORD_HEADER.size <= self._size:
+            self._file.seek(offset)
+            magic, name_len, data_len, _ = RECORD_HEADER.unpack(self._file.read(RECORD_HEADER.size))
+            length = RECORD_HEADER.size + name_len + data_len
+            if magic != RECORD_MAGIC or offset + length > self._size:
+                return
+            name = self._file.read(name_len).decode("utf-8", errors="replace")
+            yield name, offset, length
+            offset += length
+
+    def names(self) -> List[str]:
+        return list(self._order)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._offsets
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def read(self, name: str) -> bytes:
+        """Return the encoded bytes of a member (raises KeyError / ValueError)."""
+        offset, length = self._offsets[name]
+        self._file.seek(offset)
+        record = self._file.read(length)
+        magic, name_len, data_len, crc = RECORD_HEADER.unpack_from(record)
+        body = record[RECORD_HEADER.size:]
+        if magic != RECORD_MAGIC or zlib.crc32(body) != crc:
+            raise ValueError(f"corrupted record {name!r} in {self.path}")
+        return body[name_len:name_len + data_len]
+
+    def open_image(self, name: str):
+        """Decode a member with PIL."""
+        import io
+
+        from PIL import Image
+
+        return Image.open(io.BytesIO(self.read(name)))
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def delete_archive(path: str) -> None:
+    for f in (path, path + INDEX_EXT):
+        if os.path.exists(f):
+            try:
+                os.remove(f)
+            except OSError as e:
+                print(f"Failed to delete {f}: {e}")
+
+
+"""
+Converters
+"""
+
+
+def _ref_parts(ref: str) -> Tuple[str, List[str]]:
+    sep = "\\" if "\\" in ref else "/"
+    return sep, ref.split(sep)
+
+
+def _read_jsonl(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _write_jsonl(path: str, entries: List[dict]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for entry in entries:
+            json.dump(entry, f, ensure_ascii=False)
+            f.write("\n")
+    os.replace(tmp, path)
+
+
+def pack_session(jsonl_path: str, keep: bool = False,
+                 recode: Optional[Callable[[str, bytes], Tuple[str, bytes]]] = None) -> int:
+    """Move the PNG screenshots of one session into its archive. Returns frames packed.
+
+    `recode(name, data)` returns the (member name, data) to store for a screenshot
+    file, e.g. re-encoded (see storage.py).
+    """
+    events_dir = os.path.dirname(jsonl_path)
+    archive_path = os.path.splitext(jsonl_path)[0] + ARCHIVE_EXT
+    entries = _read_jsonl(jsonl_path)
+
+    packed: Dict[str, str] = {}  # file name -> member name
+    with FrameArchiveWriter(archive_path) as writer:
+        for entry in entries:
+            ref = entry.get("screenshot") or ""
+            if split_ref(ref)[0] is not None:
+                continue  # already archived
+            sep, parts = _ref_parts(ref)
+            name = parts[-1]
+            file_path = os.path.join(events_dir, "screenshot", name)
+            if not os.path.exists(file_path):
+                continue
+            if name not in packed:
+                with open(file_path, "rb") as f:
+                    member, data = name, f.read()
+                if recode is not None:
+                    member, data = recode(name, data)
+                writer.append(member, data)
+                packed[name] = member
+            # events\screenshot\x.png -> events\<session>.frames::x.png
+            entry["screenshot"] = make_ref(sep.join(parts[:-2] + [os.path.basename(archive_path)]), packed[name])
+
+    _write_jsonl(jsonl_path, entries)
+    if not keep:
+        for name in packed:
+            os.remove(os.path.join(events_dir, "screenshot", name))
+    return len(packed)
+
+
+def unpack_session(jsonl_path: str, keep: bool = False) -> int:
+    """Extract an archived session back into PNG files. Returns frames extracted."""
+    events_dir = os.path.dirname(jsonl_path)
+    screenshot_dir = os.path.join(events_dir, "screenshot")
+    entries = _read_jsonl(jsonl_path)
+
+    archive_path = os.path.splitext(jsonl_path)[0] + ARCHIVE_EXT
+    if not os.path.exists(archive_path):
+        return 0
+
+    extracted = set()
+    os.makedirs(screenshot_dir, exist_ok=True)
+    with FrameArchiveReader(archive_path) as reader:
+        decoder = None
+        for entry in entries:
+            archive_ref, name = split_ref(entry.get("screenshot") or "")
+            if archive_ref is None:
+                continue
+            if name not in extracted and name in reader:
+                data = reader.read(name)
+                if data.startswith(DELTA_PREFIX):
+                    if decoder is None:
+                        from deltacodec import DeltaDecoder  # needs numpy/PIL; only for delta archives
+
+                        decoder = DeltaDecoder(reader)
+                    data = decoder.to_png(name)
+                with open(os.path.join(screenshot_dir, name), "wb") as f:
+                    f.write(data)
+                extracted.add(name)
+            sep, parts = _ref_parts(archive_ref)
+            entry["screenshot"] = sep.join(parts[:-1] + ["screenshot", name])
+
+    _write_jsonl(jsonl_path, entries)
+    if not keep:
+        delete_archive(archive_path)
+    return len(extracted)
+
+
+def main(argv: List[str]) -> int:
+    if not argv or argv[0] not in ("pack", "unpack"):
+        print(__doc__)
+        return 1
+    keep = "--keep" in argv
+    args = [a for a in argv[1:] if a != "--keep"]
+    events_dir = args[0] if args else "events"
+
+    from sessiondir import session_files
+
+    convert = pack_session if argv[0] == "pack" else unpack_session
+    for path in session_files(events_dir, ".jsonl"):
+        cnt = convert(path, keep=keep)
+        print(f"{argv[0]} {os.path.relpath(path, events_dir)}: {cnt} frames")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,140 @@
+"""Bounded encoder backlog with an overload policy.
+
+The recorder hands every new screenshot to the encoder pool without waiting for
+it. When encoding falls behind capture (4K screens, slow disks), queued tasks
+and their raw frames pile up without bound. `EncoderBacklog` counts the frames
+in flight and, once `limit` of them are pending, first waits up to
+`block_seconds` for one to finish and then applies the configured policy to the
+new frame:
+
+- "block":     keep waiting until a frame finishes (input keeps queueing in
+               ingest.InputQueue meanwhile).
+- "downscale": encode the frame at half resolution.
+- "fast":      encode the frame with the codec's fast variant (for PNG, zlib
+               level 1; see imagecodec.py).
+- "spool":     append the raw frame to a spool file, encoded when the session
+               ends (see spool.py).
+
+Degraded frames are still encoded, so no action loses its screenshot; past
+`HARD_LIMIT_FACTOR * limit` frames in flight every policy blocks, which bounds
+memory. Overload episodes and the backlog depth are logged.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from log import get_logger
+
+ENCODER_BACKLOG = 16  # frames in flight before the overload policy applies
+BACKLOG_POLICY = "downscale"
+BACKLOG_POLICIES = ("block", "downscale", "fast", "spool")
+BACKLOG_BLOCK_SECONDS = 0.05  # how long to wait for room before degrading
+HARD_LIMIT_FACTOR = 2
+
+NORMAL = "normal"
+
+
+class EncoderBacklog:
+    """Counts frames in flight to the encoder and decides how to handle new ones."""
+
+    def __init__(self, limit: int = ENCODER_BACKLOG, policy: str = BACKLOG_POLICY,
+                 block_seconds: float = BACKLOG_BLOCK_SECONDS):
+        if policy not in BACKLOG_POLICIES:
+            raise ValueError(f"unknown backlog policy {policy!r}, expected one of {BACKLOG_POLICIES}")
+        self.limit = max(1, int(limit))
+        self.policy = policy
+        self.block_seconds = block_seconds
+        self._logger = get_logger("recorder")
+        self._cond = threading.Condition()
+        self._overloaded = False
+        self._busy_since: Optional[float] = None
+        self._busy_seconds = 0.0
+
+        self.in_flight = 0
+        self.admitted = 0
+        self.max_depth = 0
+        self.total_depth = 0
+        self.blocked_ms = 0.0
+        self.max_blocked_ms = 0.0
+        self.episodes = 0
+        self.activations: Counter = Counter()
+
+    def admit(self, policy: Optional[str] = None) -> str:
+        """Make room for one frame; returns NORMAL or the policy to apply to it.
+
+        `policy` overrides the configured one (e.g. "block" to encode spooled frames).
+        Unless "spool" is returned, the caller must call `done()` once the frame
+        has been encoded (or failed).
+        """
+        counted = policy is None  # re-admitted spooled frames are not counted twice
+        policy = policy or self.policy
+        with self._cond:
+            mode = NORMAL
+            if self.in_flight >= self.limit:
+                started = time.perf_counter()
+                room = lambda: self.in_flight < self.limit  # noqa: E731
+                self._cond.wait_for(room, None if policy == "block" else self.block_seconds)
+                if not room():
+                    mode = policy
+                    if mode != "spool":
+                        # Degraded frames still take memory: bound them too.
+                        self._cond.wait_for(lambda: self.in_flight < self.limit * HARD_LIMIT_FACTOR)
+                self._blocked(time.perf_counter() - started)
+
+            if mode == NORMAL:
+                if self._overloaded and self.in_flight < self.limit // 2:
+                    self._overloaded = False
+                    self._logger.info("encoder backlog recovered (depth %d)", self.in_flight)
+            else:
+                self.activations[mode] += 1
+                if not self._overloaded:
+                    self._overloaded = True
+                    self.episodes += 1
+                    self._logger.warning("encoder backlog full (depth %d, limit %d): policy %s",
+                                         self.in_flight, self.limit, mode)
+
+            if mode != "spool":
+                if self.in_flight == 0:
+                    self._busy_since = time.perf_counter()
+                self.in_flight += 1
+            if counted:
+                self.admitted += 1
+                self.total_depth += self.in_flight
+            self.max_depth = max(self.max_depth, self.in_flight)
+            return mode
+
+    def done(self) -> None:
+        """A frame admitted earlier finished encoding (safe from pool callback threads)."""
+        with self._cond:
+            self.in_flight -= 1
+            if self.in_flight == 0 and self._busy_since is not None:
+                self._busy_seconds += time.perf_counter() - self._busy_since
+                self._busy_since = None
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no frame is in flight."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.in_flight <= 0, timeout)
+
+    def busy_seconds(self) -> float:
+        """Total time with at least one frame in flight so far."""
+        with self._cond:
+            ongoing = time.perf_counter() - self._busy_since if self._busy_since is not None else 0.0
+            return self._busy_seconds + ongoing
+
+    def _blocked(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        self.blocked_ms += ms
+        self.max_blocked_ms = max(self.max_blocked_ms, ms)
+
+    def summary(self) -> str:
+        mean = self.total_depth / self.admitted if self.admitted else 0.0
+        policies = ", ".join(f"{k} {v}" for k, v in sorted(self.activations.items())) or "none"
+        return (f"{self.admitted} frames, depth mean {mean:.1f} / max {self.max_depth} (limit {self.limit}), "
+                f"blocked {self.blocked_ms:.0f} ms (max {self.max_blocked_ms:.0f} ms), "
+                f"{self.episodes} overload episodes, degraded frames: {policies}")
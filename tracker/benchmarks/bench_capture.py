@@ -0,0 +1,96 @@
+"""Benchmark: capture -> recorder -> encoder throughput on the synthetic backend.
+
+For each resolution, measures the capture backend alone (latency per frame and
+tile hashing) and then the full recording path: frames are captured into the
+RecentScreen ring, turned into events and saved by a Recorder (change detection,
+shared-memory hand-off, PNG encoding in the worker pool, JSONL). Every synthetic
+frame differs from the previous one, so no screenshot is reused. Runs headless.
+With --policy, reports how many frames the encoder backlog policy degraded.
+With --spool finish, frames are only spooled while recording and encoded after
+the session; "ready" is the time from the session's end until all are written.
+
+    python benchmarks/bench_capture.py [--frames 60] [--sizes 1920x1080,2560x1440,3840x2160]
+                                       [--storage files|archive|delta] [--backend synthetic]
+                                       [--policy block|downscale|fast|spool] [--backlog 16]
+                                       [--spool off|finish] [--spool-compression none|zlib|lz4]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backlog import BACKLOG_POLICIES, BACKLOG_POLICY, ENCODER_BACKLOG  # noqa: E402
+from capturer import make_backend  # noqa: E402
+from recorder import SPOOL_MODE, SPOOL_MODES, Recorder  # noqa: E402
+from spool import SPOOL_COMPRESSION  # noqa: E402
+from tilehash import tile_hashes  # noqa: E402
+
+
+def bench_backend(spec, frames):
+    backend = make_backend(spec)
+    buffer = bytearray(backend.frame_nbytes())
+    hash_ms = []
+    for _ in range(frames):
+        size, _ = backend.capture_into(buffer)
+        started = time.perf_counter()
+        tile_hashes(buffer, size)
+        hash_ms.append((time.perf_counter() - started) * 1000.0)
+    return backend, statistics.median(hash_ms)
+
+
+def bench_pipeline(spec, frames, storage, policy, backlog, spool_mode, spool_compression):
+    directory = tempfile.mkdtemp(prefix="bench_capture_")
+    try:
+        recorder = Recorder(directory=directory, storage=storage, capture=make_backend(spec),
+                            backlog_policy=policy, backlog_limit=backlog, spool_mode=spool_mode,
+                            spool_compression=spool_compression)
+        recent_screen = recorder.recent_screen
+        recent_screen.stop()  # capture on this thread, as fast as the path allows
+        started = time.perf_counter()
+        for i in range(frames):
+            recent_screen.capture_now()
+            recorder.record_event(recorder.get_event(f"bench {i}"))
+        queued = time.perf_counter() - started
+        recorder.wait()
+        total = time.perf_counter() - started
+        return queued, total, recorder.backlog, recorder.spool
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--sizes", default="1920x1080,2560x1440,3840x2160")
+    parser.add_argument("--storage", default="files", choices=("files", "archive", "delta"))
+    parser.add_argument("--backend", default="synthetic", help="backend name, e.g. synthetic or gdi")
+    parser.add_argument("--policy", default=BACKLOG_POLICY, choices=BACKLOG_POLICIES)
+    parser.add_argument("--backlog", type=int, default=ENCODER_BACKLOG, help="frames in flight before the policy applies")
+    parser.add_argument("--spool", default=SPOOL_MODE, choices=SPOOL_MODES)
+    parser.add_argument("--spool-compression", default=SPOOL_COMPRESSION, choices=("none", "zlib", "lz4"))
+    args = parser.parse_args()
+
+    sizes = args.sizes.split(",") if args.backend == "synthetic" else [""]
+    for size in sizes:
+        spec = f"{args.backend}:{size}" if size else args.backend
+        backend, hash_ms = bench_backend(spec, args.frames)
+        queued, total, backlog, spool = bench_pipeline(spec, args.frames, args.storage, args.policy, args.backlog,
+                                                       args.spool, args.spool_compression)
+        w, h = backend.size()
+        degraded = sum(backlog.activations.values())
+        print(f"{w}x{h}: {backend.latency_summary()}, tile hash {hash_ms:.1f} ms | "
+              f"pipeline ({args.storage}) {args.frames / total:.1f} frames/s end to end, "
+              f"recorder thread {1000.0 * queued / args.frames:.1f} ms/frame, "
+              f"backlog max {backlog.max_depth}, {degraded} frames {args.policy if degraded else 'degraded'}")
+        if spool.frames:
+            print(f"  spool: {spool.summary()}, ready {total - queued:.2f} s after the session ended")
+
+
+if __name__ == "__main__":
+    main()
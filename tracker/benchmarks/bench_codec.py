@@ -0,0 +1,68 @@
+"""Benchmark: screenshot codecs on a recorded session.
+
+Encodes the screenshots of a session (default: the example session in
+postprocess/data/events_example) from raw BGRX frames with every codec of
+imagecodec.py, as the recorder's workers do, and reports the median encode and
+decode time and the mean bytes per frame. Lossless codecs are checked to
+round-trip exactly.
+
+    python benchmarks/bench_codec.py [session.jsonl] [--codecs png,png-fast,qoi] [--repeat 3]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_delta_codec import DEFAULT_SESSION, load_frames  # noqa: E402
+from imagecodec import CODECS, decode, get_codec, save_raw  # noqa: E402
+
+
+def bench_codec(codec, frames, repeat):
+    encode_ms, decode_ms, sizes = [], [], []
+    exact = True
+    for _, raw, size in frames:
+        for _ in range(repeat):
+            out = io.BytesIO()
+            started = time.perf_counter()
+            save_raw(raw, size, out, codec)
+            encode_ms.append((time.perf_counter() - started) * 1000.0)
+        data = out.getvalue()
+        sizes.append(len(data))
+        for _ in range(repeat):
+            started = time.perf_counter()
+            image = decode(data)
+            decode_ms.append((time.perf_counter() - started) * 1000.0)
+        if codec.lossless:
+            exact = exact and image.convert("RGB").tobytes("raw", "BGRX") == raw
+    return statistics.median(encode_ms), statistics.median(decode_ms), statistics.mean(sizes), exact
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("session", nargs="?", default=DEFAULT_SESSION)
+    parser.add_argument("--codecs", default=",".join(CODECS))
+    parser.add_argument("--repeat", type=int, default=3, help="encodes/decodes timed per frame")
+    args = parser.parse_args()
+
+    frames = load_frames(args.session)
+    if not frames:
+        print(f"no screenshots found for {args.session}")
+        return
+    w, h = frames[0][2]
+    print(f"{len(frames)} frames of {w}x{h} from {os.path.basename(args.session)} "
+          f"(raw {w * h * 4 / 1024:.0f} KB each)")
+    print(f"{'codec':20s} {'encode ms':>10s} {'decode ms':>10s} {'KB/frame':>10s}  lossless")
+    for name in args.codecs.split(","):
+        codec = get_codec(name)
+        encode_ms, decode_ms, size, exact = bench_codec(codec, frames, args.repeat)
+        lossless = ("exact" if exact else "MISMATCH") if codec.lossless else "no"
+        print(f"{name:20s} {encode_ms:10.1f} {decode_ms:10.1f} {size / 1024:10.1f}  {lossless}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark: keyframe + delta storage vs one PNG per event.
+
+Replays the screenshots of a recorded session (default: the example session in
+postprocess/data/events_example) through the delta codec and reports bytes per
+event and random-access decode latency against plain PNG files.
+
+    python benchmarks/bench_delta_codec.py [session.jsonl] [--keyframe-interval N]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from archive import FrameArchiveReader, FrameArchiveWriter  # noqa: E402
+from deltacodec import KEYFRAME_INTERVAL, DeltaDecoder, DeltaEncoder, encode_delta, encode_png  # noqa: E402
+
+DEFAULT_SESSION = os.path.join(os.path.dirname(__file__), "..", "..", "postprocess", "data", "events_example",
+                               "free_task_20241126_161517.jsonl")
+
+
+def load_frames(jsonl_path):
+    """Raw BGRX frames of a session, in event order."""
+    session_dir = os.path.dirname(jsonl_path)
+    frames = []
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            path = os.path.join(session_dir, entry["screenshot"].replace("\\", "/"))
+            if not os.path.exists(path):
+                continue
+            with Image.open(path) as img:
+                rgb = img.convert("RGB")
+                frames.append((os.path.basename(path), rgb.tobytes("raw", "BGRX"), rgb.size))
+    return frames
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("session", nargs="?", default=DEFAULT_SESSION)
+    parser.add_argument("--keyframe-interval", type=int, default=KEYFRAME_INTERVAL)
+    parser.add_argument("--reads", type=int, default=200, help="random-access decodes to time")
+    args = parser.parse_args()
+
+    frames = load_frames(args.session)
+    if not frames:
+        print(f"no screenshots found for {args.session}")
+        return 1
+    print(f"session: {os.path.abspath(args.session)}")
+    print(f"events: {len(frames)}, resolution: {frames[0][2][0]}x{frames[0][2][1]}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Baseline: one PNG per event, as written by save_screenshot.
+        png_sizes, png_encode = [], []
+        for name, bits, size in frames:
+            started = time.perf_counter()
+            data = encode_png(bits, size)
+            png_encode.append(time.perf_counter() - started)
+            png_sizes.append(len(data))
+            with open(os.path.join(tmp, name), "wb") as f:
+                f.write(data)
+
+        # Keyframe + delta archive.
+        archive_path = os.path.join(tmp, "session.frames")
+        encoder = DeltaEncoder(keyframe_interval=args.keyframe_interval)
+        delta_sizes, delta_encode, keyframes = [], [], 0
+        with FrameArchiveWriter(archive_path) as writer:
+            for name, bits, size in frames:
+                started = time.perf_counter()
+                plan = encoder.plan(name, bits, size)
+                data = encode_png(bits, size) if plan.keyframe else encode_delta(plan.base, plan.rects)
+                delta_encode.append(time.perf_counter() - started)
+                keyframes += plan.keyframe
+                delta_sizes.append(len(data))
+                writer.append(name, data)
+
+        # Random-access decode latency.
+        rng = random.Random(0)
+        picks = [rng.randrange(len(frames)) for _ in range(args.reads)]
+
+        png_decode = []
+        for i in picks:
+            started = time.perf_counter()
+            with Image.open(os.path.join(tmp, frames[i][0])) as img:
+                img.load()
+            png_decode.append(time.perf_counter() - started)
+
+        delta_decode = []
+        with FrameArchiveReader(archive_path) as reader:
+            for i in picks:
+                decoder = DeltaDecoder(reader)  # fresh decoder: no sequential cache
+                started = time.perf_counter()
+                decoder.decode_index(i)
+                delta_decode.append(time.perf_counter() - started)
+
+            # Check reconstruction is lossless.
+            decoder = DeltaDecoder(reader)
+            for i, (name, bits, size) in enumerate(frames):
+                assert decoder.decode_index(i).tobytes() == Image.frombuffer(
+                    "RGB", size, bits, "raw", "BGRX", 0, 1).tobytes(), f"frame {i} differs"
+
+        archive_bytes = os.path.getsize(archive_path) + os.path.getsize(archive_path + ".idx")
+
+    def row(label, sizes, total, enc, dec):
+        print(f"{label:<14}{statistics.mean(sizes) / 1024:>12.1f}{total / 1024:>12.1f}"
+              f"{statistics.mean(enc) * 1000:>12.1f}{statistics.mean(dec) * 1000:>12.1f}"
+              f"{percentile(dec, 0.95) * 1000:>12.1f}")
+
+    print(f"keyframes: {keyframes}/{len(frames)} (interval {args.keyframe_interval})")
+    print(f"{'':<14}{'KB/event':>12}{'total KB':>12}{'enc ms':>12}{'dec ms':>12}{'dec p95':>12}")
+    row("png", png_sizes, sum(png_sizes), png_encode, png_decode)
+    row("delta", delta_sizes, archive_bytes, delta_encode, delta_decode)
+    print(f"size ratio delta/png: {archive_bytes / sum(png_sizes):.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
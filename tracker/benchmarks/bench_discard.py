@@ -0,0 +1,84 @@
+"""Benchmark: discarding a session, flat layout vs per-session directory.
+
+Creates sessions of N screenshot files (`--kb` each) next to `--history` files
+of earlier sessions, then discards them the previous way (delete the session's
+screenshots one by one from the shared `screenshot/` directory, then its JSONL)
+and the sessiondir.py way: one rename into the trash directory, with the tree
+removed on a background thread. Reports the time the discarding thread waits,
+and the time until the tree is gone.
+
+    python benchmarks/bench_discard.py [--screenshots 500 5000] [--history 20000] [--kb 50]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fs import delete_file  # noqa: E402
+from sessiondir import SessionDir  # noqa: E402
+
+
+def write_files(directory, names, payload):
+    os.makedirs(directory, exist_ok=True)
+    for name in names:
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(payload)
+
+
+def flat_discard(root, count, payload):
+    names = [f"20261018_120000_{i}.png" for i in range(count)]
+    write_files(os.path.join(root, "screenshot"), names, payload)
+    jsonl = os.path.join(root, "events_20261018_120000.jsonl")
+    with open(jsonl, "wb") as f:
+        f.write(b"{}\n" * count)
+    started = time.perf_counter()
+    delete_file(jsonl)
+    for name in names:
+        delete_file(os.path.join(root, "screenshot", name))
+    return time.perf_counter() - started
+
+
+def session_discard(root, count, payload):
+    session = SessionDir(root, "events_20261018_120000")
+    write_files(os.path.join(session.path, "screenshot"), [f"20261018_120000_{i}.png" for i in range(count)], payload)
+    with open(session.file(".jsonl"), "wb") as f:
+        f.write(b"{}\n" * count)
+    started = time.perf_counter()
+    session.discard()
+    returned = time.perf_counter() - started
+    while os.path.exists(session.path):
+        time.sleep(0.001)
+    return returned, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--screenshots", type=int, nargs="+", default=[500, 5000], help="files per session")
+    parser.add_argument("--history", type=int, default=20000, help="screenshots of earlier sessions")
+    parser.add_argument("--kb", type=int, default=50, help="size of each screenshot")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.kb * 1024)
+    root = tempfile.mkdtemp(prefix="bench_discard_")
+    try:
+        # earlier sessions: in the shared directory / in their own directories
+        write_files(os.path.join(root, "flat", "screenshot"), [f"old_{i}.png" for i in range(args.history)], b"x")
+        write_files(os.path.join(root, "dirs", "events_old", "screenshot"),
+                    [f"old_{i}.png" for i in range(args.history)], b"x")
+        print(f"{args.history} screenshots of earlier sessions, {args.kb} KB per screenshot")
+        for count in args.screenshots:
+            flat = flat_discard(os.path.join(root, "flat"), count, payload)
+            returned, gone = session_discard(os.path.join(root, "dirs"), count, payload)
+            print(f"{count:6d} screenshots  one by one {flat * 1000:8.1f} ms  "
+                  f"session directory {returned * 1000:6.2f} ms (removed after {gone * 1000:.1f} ms)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark: encoder executors (process / thread / inline) on synthetic frames.
+
+For each executor, records `--frames` synthetic frames through a Recorder with
+its own EncoderService and reports events per second end to end (until every
+frame is encoded), the time the recording thread spends per event (median,
+p99, max: this is what delays input handling) and the peak RSS of the tracker
+process plus its worker processes. The backlog policy is "block" so that every
+frame is encoded at full quality, and frames go to the encoder as they are
+saved (spool mode "off"). Runs headless.
+
+    python benchmarks/bench_encoder.py [--frames 60] [--size 1920x1080]
+                                       [--executors process,thread,inline] [--workers N]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capturer import make_backend  # noqa: E402
+from encoder import EXECUTORS, EncoderService  # noqa: E402
+from recorder import Recorder  # noqa: E402
+
+try:
+    import psutil
+except ImportError:  # RSS is reported as n/a
+    psutil = None
+
+
+class PeakRss:
+    """Samples the RSS of this process and its children on a background thread."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        if psutil is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        me = psutil.Process()
+        while not self._stop.is_set():
+            total = 0
+            for proc in [me] + me.children(recursive=True):
+                try:
+                    total += proc.memory_info().rss
+                except psutil.Error:
+                    pass
+            self.peak = max(self.peak, total)
+            self._stop.wait(self.interval)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+def bench(executor, spec, frames, workers):
+    directory = tempfile.mkdtemp(prefix="bench_encoder_")
+    try:
+        with PeakRss() as rss:
+            service = EncoderService(executor, workers)
+            service.wait_warm()
+            recorder = Recorder(directory=directory, capture=make_backend(spec), encoder=service,
+                                backlog_policy="block", spool_mode="off")
+            recent_screen = recorder.recent_screen
+            recent_screen.stop()
+            record_ms = []
+            started = time.perf_counter()
+            for i in range(frames):
+                recent_screen.capture_now()
+                event = recorder.get_event(f"bench {i}")
+                t0 = time.perf_counter()
+                recorder.record_event(event)
+                record_ms.append((time.perf_counter() - t0) * 1000.0)
+            recorder.wait()
+            total = time.perf_counter() - started
+            service.close()
+        return frames / total, record_ms, rss.peak
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--executors", default=",".join(EXECUTORS))
+    parser.add_argument("--workers", type=int, default=None, help="pool size (default: CPU count)")
+    args = parser.parse_args()
+
+    print(f"{args.frames} frames at {args.size}, {args.workers or os.cpu_count()} workers")
+    for executor in args.executors.split(","):
+        rate, record_ms, peak = bench(executor, f"synthetic:{args.size}", args.frames, args.workers)
+        rss = f"{peak / (1024 * 1024):.0f} MB" if peak else "n/a"
+        print(f"{executor:8s} {rate:6.1f} events/s  recording thread per event: "
+              f"p50 {statistics.median(record_ms):.1f} ms  p99 {percentile(record_ms, 0.99):.1f} ms  "
+              f"max {max(record_ms):.1f} ms  peak RSS {rss}")
+
+
+if __name__ == "__main__":
+    main()
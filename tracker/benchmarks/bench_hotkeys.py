@@ -0,0 +1,99 @@
+"""Benchmark: hotkey matching with the HOT_KEY list vs the ChordMatcher trie.
+
+Replays a synthetic key storm (mostly typing, with a chord every few keys and
+some Ctrl+<char> combinations) through the previous monitor.py path (held-key
+stack compared against a list of two-key lists, plus the control-character
+check of get_ctrl_hotkey) and through `hotkeys.ChordMatcher`. `--extra` adds
+that many synthetic two-key chords to both, to show how the cost grows with the
+number of configured hotkeys. Reports the time per key event and checks that
+both paths recognize the same chords.
+
+    python benchmarks/bench_hotkeys.py [--events 200000] [--extra 0 100 1000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hotkeys import DEFAULT_HOTKEYS, WILDCARD, ChordMatcher  # noqa: E402
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz "
+
+
+class ListMatcher:
+    """The previous monitor.py path: HotKeyBuffer + `in HOT_KEY` + get_ctrl_hotkey."""
+
+    def __init__(self, chords):
+        self.hot_key = [list(chord) for chord in chords if WILDCARD not in chord]
+        self.buffer = []
+
+    def press(self, name):
+        self.buffer.append(name)
+        if len(name) == 1 and ord(name) <= 31:
+            return ("Ctrl", chr(ord("@") + ord(name)))
+        if self.buffer in self.hot_key:
+            return tuple(self.buffer)
+        return None
+
+    def release(self, name):
+        if len(self.buffer) > 0:
+            self.buffer.pop()
+
+
+def key_storm(count, seed=1):
+    """(press, name) events: typing with a two-key chord or a Ctrl+<char> every ~20 keys."""
+    rng = random.Random(seed)
+    chords = [chord for chord in DEFAULT_HOTKEYS if WILDCARD not in chord]
+    events = []
+    while len(events) < count:
+        roll = rng.random()
+        if roll < 0.03:
+            chord = rng.choice(chords)
+        elif roll < 0.05:
+            chord = ["ctrl", chr(ord(rng.choice("acvxzs")) - ord("a") + 1)]  # the control character
+        else:
+            chord = [rng.choice(LETTERS)]
+        events.extend((True, name) for name in chord)
+        events.extend((False, name) for name in reversed(chord))
+    return events
+
+
+def run(matcher, events):
+    matched = 0
+    started = time.perf_counter()
+    for pressed, name in events:
+        if pressed:
+            if matcher.press(name) is not None:
+                matched += 1
+        else:
+            matcher.release(name)
+    return time.perf_counter() - started, matched
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200000, help="key events (presses and releases)")
+    parser.add_argument("--extra", type=int, nargs="+", default=[0, 100, 1000],
+                        help="synthetic chords added to the default ones")
+    args = parser.parse_args()
+
+    events = key_storm(args.events)
+    print(f"{len(events)} key events, {sum(1 for pressed, _ in events if pressed)} presses")
+    for extra in args.extra:
+        chords = DEFAULT_HOTKEYS + [["alt", f"x{i}"] for i in range(extra)]
+        results = {}
+        for label, matcher in (("HOT_KEY list", ListMatcher(chords)), ("ChordMatcher", ChordMatcher(chords))):
+            elapsed, matched = run(matcher, events)
+            results[label] = matched
+            print(f"{len(chords):5d} chords  {label:13s} {elapsed * 1e9 / len(events):8.0f} ns/event  "
+                  f"{matched} chords matched")
+        if len(set(results.values())) > 1:
+            print("  warning: the two paths matched a different number of chords")
+
+
+if __name__ == "__main__":
+    main()
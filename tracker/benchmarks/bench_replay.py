@@ -0,0 +1,68 @@
+"""Benchmark: Monitor throughput and per-event latency on a replayed input stream.
+
+Generates a synthetic session (typing at 15 keys/s, clicks, drags, scrolling,
+hotkeys) or loads a recorded one, replays it through replay.py into a temporary
+session directory and reports input events processed per second and the
+end-to-end latency of each event (listener callback to state machine done).
+Runs headless; no desktop or input hooks are needed. The runs share one encoder
+service like the tracker's sessions do (--private-encoder: one per run); session
+start and stop times and the time Recorder.save() takes per recorded action
+(on the input-handling thread) are reported too.
+
+    python benchmarks/bench_replay.py [input.jsonl] [--seconds 120] [--speed 0] [--runs 3]
+                                      [--private-encoder]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encoder import EncoderService  # noqa: E402
+from replay import generate_events, load_events, replay  # noqa: E402
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", nargs="?", help="recorded input stream (default: generated)")
+    parser.add_argument("--seconds", type=float, default=120.0, help="length of the generated session")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = real time, 0 = as fast as possible")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--private-encoder", action="store_true", help="start an encoder pool per run")
+    args = parser.parse_args()
+
+    events = load_events(args.input) if args.input else generate_events(args.seconds)
+    span = events[-1]["t"] if events else 0.0
+    print(f"{len(events)} input events over {span:.0f}s of session time, speed {args.speed or 'max'}")
+
+    encoder = None if args.private_encoder else EncoderService()
+    for run in range(args.runs):
+        directory = tempfile.mkdtemp(prefix="bench_replay_")
+        try:
+            result = replay(events, directory, args.speed, encoder=encoder)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        lat = result.latencies_ms
+        print(f"run {run + 1}: {result.events / result.seconds:8.0f} events/s "
+              f"({result.events} events -> {result.recorded} actions in {result.seconds:.2f}s)  "
+              f"latency p50 {statistics.median(lat) if lat else 0.0:.2f} ms  p95 {percentile(lat, 0.95):.2f} ms  "
+              f"p99 {percentile(lat, 0.99):.2f} ms  max {max(lat) if lat else 0.0:.2f} ms  "
+              f"session start {result.start_ms:.0f} ms, stop {result.stop_ms:.0f} ms")
+        save = result.save_ms
+        print(f"       save per action p50 {statistics.median(save) if save else 0.0:.2f} ms  "
+              f"p99 {percentile(save, 0.99):.2f} ms  max {max(save) if save else 0.0:.2f} ms")
+    if encoder is not None:
+        encoder.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark: debounce timers with threading.Timer vs the shared Scheduler.
+
+Simulates typing at 15 keys/s in bursts; every key re-arms a debounce timer (as
+`monitor.Timer.reset()` does) that fires after a short pause. Reports threads
+created and the lateness of the fired callbacks for both implementations.
+
+    python benchmarks/bench_scheduler.py [--seconds 10] [--rate 15] [--debounce 0.2]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import Scheduler  # noqa: E402
+
+_started = [0]
+_original_start = threading.Thread.start
+
+
+def _counting_start(self, *args, **kwargs):
+    _started[0] += 1
+    return _original_start(self, *args, **kwargs)
+
+
+class ThreadTimerDebounce:
+    """The previous monitor.Timer: cancel and start a new threading.Timer per reset."""
+
+    def __init__(self, delay, callback):
+        self.delay = delay
+        self.callback = callback
+        self.inner = None
+
+    def reset(self):
+        if self.inner:
+            self.inner.cancel()
+        self.inner = threading.Timer(self.delay, self.callback)
+        self.inner.start()
+
+    def close(self):
+        if self.inner:
+            self.inner.cancel()
+
+
+class SchedulerDebounce:
+    def __init__(self, delay, callback):
+        self.delay = delay
+        self.scheduler = Scheduler("BenchScheduler")
+        self.call = self.scheduler.schedule(None, callback)
+
+    def reset(self):
+        self.call.reschedule(self.delay)
+
+    def close(self):
+        self.scheduler.stop()
+
+
+def run(kind, seconds, rate, debounce):
+    armed_at = [0.0]
+    late_ms = []
+
+    def fired():
+        late_ms.append((time.perf_counter() - armed_at[0] - debounce) * 1000.0)
+
+    threading.Thread.start = _counting_start
+    _started[0] = 0
+    try:
+        debouncer = kind(debounce, fired)
+        keys = 0
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            # one second of typing, then a pause long enough for the timer to fire
+            for _ in range(int(rate)):
+                armed_at[0] = time.perf_counter()
+                debouncer.reset()
+                keys += 1
+                time.sleep(1.0 / rate)
+            time.sleep(debounce * 2)
+        debouncer.close()
+        threads = _started[0]
+    finally:
+        threading.Thread.start = _original_start
+    return keys, threads, late_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rate", type=float, default=15.0, help="keys per second")
+    parser.add_argument("--debounce", type=float, default=0.2, help="timer delay in seconds")
+    args = parser.parse_args()
+
+    print(f"{args.rate:.0f} keys/s, debounce {args.debounce * 1000:.0f} ms, {args.seconds:.0f} s")
+    for label, kind in (("threading.Timer", ThreadTimerDebounce), ("Scheduler", SchedulerDebounce)):
+        keys, threads, late = run(kind, args.seconds, args.rate, args.debounce)
+        late.sort()
+        p99 = late[min(len(late) - 1, int(len(late) * 0.99))] if late else 0.0
+        print(f"{label:16s} keys {keys:5d}  threads started {threads:5d}  fired {len(late):3d}  "
+              f"lateness median {statistics.median(late) if late else 0.0:.2f} ms  p99 {p99:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
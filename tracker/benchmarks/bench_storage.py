@@ -0,0 +1,103 @@
+"""Benchmark: storage accounting per save, and compaction of finished sessions.
+
+Builds an events folder of `--sessions` finished sessions with `--files`
+screenshot files each (manifests as sessiondir.py writes them), then measures
+what a quota check costs on every `Recorder.save`: `StorageManager.update()` +
+`state()` (incremental) versus walking the folder and asking the volume for its
+free space on every save. With `--screenshots DIR` it also compacts a session
+made of the PNGs in DIR (packed into the archive, re-encoded with `--codec`)
+and reports the bytes saved and the time per frame.
+
+    python benchmarks/bench_storage.py [--sessions 200] [--files 100] [--saves 2000]
+        [--screenshots ../postprocess/data/events_example/screenshot] [--codec webp-lossless]
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sessiondir import directory_bytes, write_manifest  # noqa: E402
+from storage import StorageManager  # noqa: E402
+
+
+def build_folder(root, sessions, files):
+    for s in range(sessions):
+        name = f"task{s}_20261018_120000"
+        directory = os.path.join(root, name, "screenshot")
+        os.makedirs(directory)
+        for i in range(files):
+            with open(os.path.join(directory, f"20261018_120000_{i}.png"), "wb") as f:
+                f.write(b"x" * 1024)
+        write_manifest(os.path.dirname(directory), name, {})
+
+
+def incremental(root, saves):
+    manager = StorageManager(root, background=False)
+    manager.begin("recording")
+    started = time.perf_counter()
+    for i in range(saves):
+        manager.update("recording", i * 300_000)
+        manager.state()
+    return (time.perf_counter() - started) / saves
+
+
+def walking(root, saves):
+    started = time.perf_counter()
+    for _ in range(saves):
+        directory_bytes(root)
+        shutil.disk_usage(root)
+    return (time.perf_counter() - started) / saves
+
+
+def compaction(root, screenshots, codec):
+    name = "free_task_20261018_120000"
+    directory = os.path.join(root, name)
+    os.makedirs(os.path.join(directory, "screenshot"))
+    with open(os.path.join(directory, name + ".jsonl"), "w", encoding="utf-8") as f:
+        for path in screenshots:
+            shutil.copy(path, os.path.join(directory, "screenshot"))
+            f.write(json.dumps({"screenshot": "screenshot\\" + os.path.basename(path)}) + "\n")
+    write_manifest(directory, name, {})
+    manager = StorageManager(root, compact_codec=codec, background=False)
+    before = manager.used()
+    started = time.perf_counter()
+    saved = manager.compact(directory, interruptible=False)
+    elapsed = time.perf_counter() - started
+    return before, saved, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--files", type=int, default=100, help="screenshot files per session")
+    parser.add_argument("--saves", type=int, default=2000)
+    parser.add_argument("--screenshots", help="folder of PNG screenshots to compact")
+    parser.add_argument("--codec", default="webp-lossless", help="compaction codec")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_storage_")
+    try:
+        build_folder(os.path.join(root, "events"), args.sessions, args.files)
+        fast = incremental(os.path.join(root, "events"), args.saves)
+        slow = walking(os.path.join(root, "events"), max(1, args.saves // 100))
+        print(f"{args.sessions} sessions x {args.files} files: quota check per save "
+              f"{fast * 1e6:8.2f} us incremental vs {slow * 1000:8.1f} ms walking the folder")
+
+        if args.screenshots:
+            paths = sorted(p for p in glob.glob(os.path.join(args.screenshots, "*.png")) if "_marked" not in p)
+            before, saved, elapsed = compaction(os.path.join(root, "compact"), paths, args.codec)
+            print(f"compaction of {len(paths)} screenshots: {before / 1024:.0f} KB -> {(before - saved) / 1024:.0f} KB "
+                  f"({saved / max(before, 1):.0%} saved), {elapsed / max(len(paths), 1) * 1000:.0f} ms per frame")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
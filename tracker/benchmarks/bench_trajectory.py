@@ -0,0 +1,143 @@
+"""Benchmark: online trajectory simplification on synthetic pointer movement.
+
+Generates pointer paths between random click targets (minimum-jerk motion along
+a slightly curved line with sensor noise, and hover pauses with jitter),
+sampled at the mouse report rate, and feeds them through
+`trajectory.TrajectoryBuffer` as the listener thread would, taking the path at
+every click. Reports points in versus points kept, the CPU time per move, the
+largest distance of a raw move from the simplified path, the packed size versus
+one JSON object per move, and how many points offline Ramer-Douglas-Peucker
+keeps at the same tolerance.
+
+    python benchmarks/bench_trajectory.py [--clicks 300] [--rate 125 1000] [--tolerance 3]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trajectory import TRAJECTORY_TOLERANCE, TrajectoryBuffer, decode  # noqa: E402
+
+SCREEN = (1920, 1080)
+
+
+def synthetic_paths(clicks, rate, seed=0):
+    """One list of (x, y, ns) moves per click, the last move at the click target."""
+    rng = random.Random(seed)
+    step_ns = int(1e9 / rate)
+    t = 0
+    x, y = SCREEN[0] / 2, SCREEN[1] / 2
+    paths = []
+    for _ in range(clicks):
+        moves = []
+        tx, ty = rng.uniform(0, SCREEN[0]), rng.uniform(0, SCREEN[1])
+        duration = 0.25 + math.hypot(tx - x, ty - y) / 2500.0  # s, roughly Fitts-like
+        bend = rng.uniform(-0.15, 0.15)  # sideways offset of the arc, relative to its length
+        samples = max(2, int(duration * rate))
+        for i in range(1, samples + 1):
+            s = i / samples
+            s = 10 * s ** 3 - 15 * s ** 4 + 6 * s ** 5  # minimum-jerk progress
+            arc = bend * math.sin(math.pi * s)
+            px = x + (tx - x) * s - (ty - y) * arc + rng.gauss(0, 0.4)
+            py = y + (ty - y) * s + (tx - x) * arc + rng.gauss(0, 0.4)
+            t += step_ns
+            moves.append((int(round(px)), int(round(py)), t))
+        if rng.random() < 0.3:
+            # hover: the pointer rests, then drifts a few pixels
+            t += int(rng.uniform(0.3, 1.0) * 1e9)
+            for _ in range(rng.randint(3, 20)):
+                t += step_ns
+                moves.append((int(round(tx + rng.gauss(0, 1.5))), int(round(ty + rng.gauss(0, 1.5))), t))
+        x, y = tx, ty
+        moves.append((int(round(tx)), int(round(ty)), t))
+        paths.append(moves)
+        t += int(rng.uniform(0.1, 0.5) * 1e9)  # click and think
+    return paths
+
+
+def deviation(raw, kept):
+    """Largest distance of a raw move from the kept polyline (pixels)."""
+    points = np.asarray([(x, y) for x, y, _ in raw], dtype=np.float64)
+    poly = np.asarray([(x, y) for x, y, _ in kept], dtype=np.float64)
+    if len(poly) == 1:
+        return float(np.max(np.hypot(*(points - poly[0]).T)))
+    a, b = poly[:-1], poly[1:]
+    ab = b - a
+    length2 = np.maximum((ab ** 2).sum(axis=1), 1e-9)
+    ap = points[:, None, :] - a[None, :, :]
+    s = np.clip((ap * ab[None]).sum(axis=2) / length2[None], 0.0, 1.0)
+    nearest = a[None] + s[..., None] * ab[None]
+    return float(np.min(np.hypot(*(points[:, None, :] - nearest).transpose(2, 0, 1)), axis=1).max())
+
+
+def rdp_count(points, tolerance):
+    """Points kept by offline Ramer-Douglas-Peucker (iterative)."""
+    xy = np.asarray([(x, y) for x, y, _ in points], dtype=np.float64)
+    keep = np.zeros(len(xy), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(xy) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        a, b = xy[first], xy[last]
+        ab = b - a
+        norm = math.hypot(*ab)
+        inner = xy[first + 1:last] - a
+        if norm == 0:
+            dist = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            dist = np.abs(inner[:, 0] * ab[1] - inner[:, 1] * ab[0]) / norm
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            keep[first + 1 + i] = True
+            stack.append((first, first + 1 + i))
+            stack.append((first + 1 + i, last))
+    return int(keep.sum())
+
+
+def run(paths, tolerance):
+    buffer = TrajectoryBuffer(tolerance=tolerance)
+    taken = []
+    cpu_ns = 0
+    for moves in paths:
+        started = time.thread_time_ns()
+        for x, y, ns in moves:
+            buffer.add(x, y, ns)
+        trajectory = buffer.take(moves[-1][0], moves[-1][1], moves[-1][2])
+        cpu_ns += time.thread_time_ns() - started
+        taken.append(trajectory)
+    return buffer, taken, cpu_ns
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clicks", type=int, default=300)
+    parser.add_argument("--rate", type=int, nargs="+", default=[125, 1000], help="pointer report rates (Hz)")
+    parser.add_argument("--tolerance", type=float, default=TRAJECTORY_TOLERANCE, help="pixels")
+    args = parser.parse_args()
+
+    for rate in args.rate:
+        paths = synthetic_paths(args.clicks, rate)
+        buffer, taken, cpu_ns = run(paths, args.tolerance)
+        moves = sum(len(p) for p in paths)
+        kept = sum(t.points for t in taken)
+        worst = max(deviation(p, decode(t.to_json(p[-1][2]))) for p, t in zip(paths, taken))
+        packed = sum(len(json.dumps(t.to_json(p[-1][2]))) for p, t in zip(paths, taken))
+        naive = sum(len(json.dumps({"x": x, "y": y, "ns": ns})) + 1 for p in paths for x, y, ns in p)
+        rdp = sum(rdp_count(p, args.tolerance) for p in paths)
+        print(f"{rate:5d} Hz  {args.clicks} clicks  moves {moves:7d}  kept {kept:6d} ({moves / kept:5.1f}:1, "
+              f"offline RDP {rdp})  {cpu_ns / moves:6.0f} ns/move  max deviation {worst:4.1f} px  "
+              f"{packed / 1024:6.1f} KB packed vs {naive / 1024:7.1f} KB per-move JSON")
+
+
+if __name__ == "__main__":
+    main()
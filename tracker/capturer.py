@@ -8,56 +8,59 @@ Robustness improvements (2026-02-27):
 - Make the background refresh thread resilient (never silently dies on exceptions).
 - Add a watchdog in `get()` to recover if the refresh thread stalls.
 
+Frame history (2026-10):
+- RecentScreen keeps a fixed-capacity ring of the last N frames in preallocated
+  buffers, so an input event can be paired with the newest frame captured
+  strictly *before* it (`get_at(ts)`) instead of whatever was captured last.
+  Frames are stamped when the grab completes.
+- The refresh rate adapts to input: CAPTURE_MIN_FPS while the user is idle,
+  CAPTURE_MAX_FPS (plus an immediate capture) as soon as input arrives.
+  Achieved FPS and capture CPU time are logged periodically.
+- Every captured frame gets a per-tile hash grid (tilehash.py) so the recorder can
+  detect unchanged screens without comparing pixels.
+- Capture backends (CaptureBackend): ScreenCapturer is the GDI backend;
+  SyntheticBackend renders deterministic moving content at any resolution, so
+  the capture -> recorder -> encoder path runs and can be profiled without a
+  desktop (set PC_TRACKER_CAPTURE=synthetic[:WxH], see `make_backend()`).
+  Backends capture into a caller-provided buffer and track their latency. The
+  Windows modules are only needed by ScreenCapturer, so this module also imports
+  on machines without a desktop.
+
 The original repo used a single global `screen_size` computed once at import time.
 That breaks after sleep / RDP / docking / DPI changes, and can cause decode failures.
 """
 
 from __future__ import annotations
 
+import ctypes
 import logging
 import os
 import threading
 import time
 from dataclasses import dataclass
-from typing import Optional, Tuple, Union
+from typing import Any, List, Optional, Tuple, Union
+
+try:
+    import pyautogui
+    import win32con
+    import win32gui
+    import win32ui
+except Exception:  # no Windows desktop (e.g. headless replay); only injected captures work
+    pyautogui = win32con = win32gui = win32ui = None
 
-import pyautogui
-import win32con
-import win32gui
-import win32ui
+import numpy as np
+
+from log import get_logger
+from tilehash import tile_hashes
 
 # Backward-compat: keep a global screen_size for any legacy code that imports it.
 # We keep it updated on each successful capture.
-screen_size = pyautogui.size()
+screen_size = pyautogui.size() if pyautogui is not None else (0, 0)
 
 
 def _get_logger() -> logging.Logger:
-    """Create/reuse a module logger that writes to a small rotating file."""
-    logger = logging.getLogger("pc_tracker.capturer")
-    if logger.handlers:
-        return logger
-
-    logger.setLevel(logging.INFO)
-
-    # Try to log to a file in the working directory.
-    # If it fails (e.g., permissions), fall back to stderr.
-    try:
-        from logging.handlers import RotatingFileHandler
-
-        log_path = os.environ.get("PC_TRACKER_LOG", os.path.join(os.getcwd(), "pc_tracker.log"))
-        handler = RotatingFileHandler(log_path, maxBytes=2_000_000, backupCount=3, encoding="utf-8")
-        fmt = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
-        handler.setFormatter(fmt)
-        logger.addHandler(handler)
-    except Exception:
-        handler = logging.StreamHandler()
-        fmt = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
-        handler.setFormatter(fmt)
-        logger.addHandler(handler)
-
-    # Avoid double logging via root
-    logger.propagate = False
-    return logger
+    """Module logger; writes to the shared rotating `pc_tracker.log` (see log.py)."""
+    return get_logger("capturer")
 
 
 @dataclass(frozen=True)
@@ -67,12 +70,95 @@ class ScreenFrame:
     bits: bytes
     size: Tuple[int, int]
     captured_at: float
+    tile_hashes: Any = None  # (rows, cols) uint64 grid from tilehash.tile_hashes
+    seq: int = -1  # capture sequence number within a RecentScreen (-1: unknown)
+    captured_ns: int = 0  # time.perf_counter_ns() at capture (0: unknown), comparable with event input_ns
+
+
+# Capture rate bounds (frames per second). The refresh thread runs at the max rate
+# while input was seen within ACTIVE_WINDOW_SECONDS and drops to the min rate otherwise.
+CAPTURE_MIN_FPS = 1.0
+CAPTURE_MAX_FPS = 10.0
+ACTIVE_WINDOW_SECONDS = 3.0
+CAPTURE_STATS_INTERVAL = 300.0  # seconds between capture stats log lines
+
+CAPTURE_BACKEND_ENV = "PC_TRACKER_CAPTURE"  # capture backend spec, see make_backend()
+SYNTHETIC_SIZE = (1920, 1080)
+
+# Number of frames kept by RecentScreen. At CAPTURE_MAX_FPS (while input is active) this
+# covers the last ~0.6s, at the CAPTURE_MIN_FPS idle rate ~6s: enough to find a pre-input
+# frame even if an event is handled late.
+FRAME_HISTORY = 6
+
+
+class CaptureBackend:
+    """Source of raw BGRX frames.
+
+    Subclasses implement `size()` and `_grab_into(buffer)`; `capture_into()` adds the
+    timestamp and latency bookkeeping. `clock` stamps the frames (time.time() by
+    default; the replay harness passes its virtual clock).
+    """
+
+    name = "backend"
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.captures = 0
+        self.last_ms = 0.0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def size(self) -> Tuple[int, int]:
+        """Current frame size (w, h)."""
+        raise NotImplementedError
+
+    def _grab_into(self, buffer: bytearray) -> Tuple[int, int]:
+        """Write one frame to the start of `buffer`; return its size."""
+        raise NotImplementedError
 
+    def frame_nbytes(self) -> int:
+        """Bytes needed for one BGRX frame at the current size."""
+        w, h = self.size()
+        return w * h * 4
 
-class ScreenCapturer:
-    """Captures the current desktop as raw BGRX bytes."""
+    def capture_into(self, buffer: bytearray) -> Tuple[Tuple[int, int], float]:
+        """Capture a frame directly into `buffer`.
 
-    def __init__(self):
+        `buffer` must hold at least w*h*4 bytes (see `frame_nbytes()`); the frame is
+        written to its start. Returns ((w, h), captured_at); `captured_at` is taken
+        once the grab has returned, so a frame stamped before an input cannot show
+        the screen after it.
+        """
+        started = time.perf_counter()
+        size = self._grab_into(buffer)
+        captured_at = self.clock()
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        self.captures += 1
+        self.last_ms = elapsed_ms
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        return size, captured_at
+
+    def capture(self) -> ScreenFrame:
+        """Capture a frame into a new buffer."""
+        buffer = bytearray(self.frame_nbytes())
+        size, captured_at = self.capture_into(buffer)
+        return ScreenFrame(bits=bytes(buffer[:size[0] * size[1] * 4]), size=size, captured_at=captured_at)
+
+    def latency_summary(self) -> str:
+        avg = self.total_ms / self.captures if self.captures else 0.0
+        return f"{self.name} capture {avg:.1f} ms avg / {self.max_ms:.1f} ms max over {self.captures} frames"
+
+
+class ScreenCapturer(CaptureBackend):
+    """GDI backend: captures the current desktop (BitBlt) as raw BGRX bytes."""
+
+    name = "gdi"
+
+    def __init__(self, clock=time.time):
+        if win32gui is None:
+            raise RuntimeError("ScreenCapturer needs pywin32 and pyautogui (Windows desktop)")
+        super().__init__(clock)
         self.hwindow = win32gui.GetDesktopWindow()
         self._logger = _get_logger()
 
@@ -82,6 +168,19 @@ class ScreenCapturer:
         Returns:
             ScreenFrame(bits=BGRX bytes, size=(w,h), captured_at=timestamp)
         """
+        bits, size = self._grab(None)
+        captured_at = self.clock()
+        return ScreenFrame(bits=bits, size=size, captured_at=captured_at)
+
+    def size(self) -> Tuple[int, int]:
+        w, h = pyautogui.size()
+        return w, h
+
+    def _grab_into(self, buffer: bytearray) -> Tuple[int, int]:
+        _, size = self._grab(buffer)
+        return size
+
+    def _grab(self, buffer: Optional[bytearray]):
         # Recompute each time for robustness.
         w, h = pyautogui.size()
 
@@ -105,13 +204,25 @@ class ScreenCapturer:
             # Bit block transfer from screen into memory bitmap.
             mem_dc.BitBlt((0, 0), (w, h), img_dc, (0, 0), win32con.SRCCOPY)
 
-            bits = bmp.GetBitmapBits(True)
+            nbytes = w * h * 4
+            if buffer is None:
+                bits = bmp.GetBitmapBits(True)
+            else:
+                if len(buffer) < nbytes:
+                    raise ValueError(f"capture buffer too small: {len(buffer)} < {nbytes}")
+                # Copy straight into the caller's buffer (no intermediate bytes object).
+                c_buf = (ctypes.c_char * nbytes).from_buffer(buffer)
+                copied = ctypes.windll.gdi32.GetBitmapBits(ctypes.c_void_p(bmp.GetHandle()), nbytes, c_buf)
+                del c_buf  # release the export so the bytearray stays resizable
+                if copied != nbytes:
+                    raise RuntimeError(f"GetBitmapBits copied {copied} of {nbytes} bytes")
+                bits = None
 
             # Update legacy global.
             global screen_size
             screen_size = (w, h)
 
-            return ScreenFrame(bits=bits, size=(w, h), captured_at=time.time())
+            return bits, (w, h)
 
         finally:
             # Release resources in the correct order.
@@ -140,52 +251,280 @@ class ScreenCapturer:
                 pass
 
 
-capturer = ScreenCapturer()
+def _bounce(value: int, span: int) -> int:
+    """Position moving back and forth over [0, span]."""
+    if span <= 0:
+        return 0
+    value %= 2 * span
+    return value if value <= span else 2 * span - value
+
+
+class SyntheticBackend(CaptureBackend):
+    """Headless backend rendering deterministic moving content.
+
+    Frame k shows a static gradient with a grid, a box bouncing across the screen,
+    a row of "typed" blocks growing by one block per frame and a status bar whose
+    colour changes. Frames depend only on k, so runs are reproducible, and every
+    frame differs from the previous one in a few regions like a busy desktop.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, size: Tuple[int, int] = SYNTHETIC_SIZE, clock=time.time):
+        super().__init__(clock)
+        self._size = (int(size[0]), int(size[1]))
+        self.frame_index = 0
+        self._background = self._render_background()
+
+    def size(self) -> Tuple[int, int]:
+        return self._size
+
+    def _render_background(self) -> np.ndarray:
+        w, h = self._size
+        background = np.zeros((h, w, 4), dtype=np.uint8)
+        background[..., 0] = (np.arange(w, dtype=np.uint32) * 255 // max(1, w - 1))[None, :]
+        background[..., 1] = (np.arange(h, dtype=np.uint32) * 255 // max(1, h - 1))[:, None]
+        background[..., 2] = 128
+        background[::64, :, :3] = 255
+        background[:, ::64, :3] = 255
+        return background
+
+    def _grab_into(self, buffer: bytearray) -> Tuple[int, int]:
+        w, h = self._size
+        nbytes = w * h * 4
+        if len(buffer) < nbytes:
+            raise ValueError(f"capture buffer too small: {len(buffer)} < {nbytes}")
+        frame = np.frombuffer(buffer, dtype=np.uint8, count=nbytes).reshape(h, w, 4)
+        np.copyto(frame, self._background)
+
+        k = self.frame_index
+        self.frame_index += 1
+
+        box_w, box_h = max(8, w // 8), max(8, h // 8)
+        x, y = _bounce(k * 7, w - box_w), _bounce(k * 5, h - box_h)
+        frame[y:y + box_h, x:x + box_w, :3] = (200, 90, 40)
+
+        cols = max(1, (w - 32) // 12)
+        row = (k // cols) % max(1, (h - 64) // 20)
+        frame[16 + row * 20:30 + row * 20, 16:16 + (k % cols + 1) * 12, :3] = 20
+
+        frame[max(0, h - 24):, :, :3] = (k * 13) % 256
+        return w, h
+
+
+def make_backend(spec: Optional[str] = None, clock=time.time) -> CaptureBackend:
+    """Create a backend from a spec: "gdi", "synthetic" or "synthetic:WxH".
+
+    Defaults to $PC_TRACKER_CAPTURE, then "gdi".
+    """
+    spec = (spec or os.environ.get(CAPTURE_BACKEND_ENV) or "gdi").strip().lower()
+    name, _, arg = spec.partition(":")
+    if name == "gdi":
+        return ScreenCapturer(clock)
+    if name == "synthetic":
+        size = SYNTHETIC_SIZE
+        if arg:
+            w, h = arg.split("x")
+            size = (int(w), int(h))
+        return SyntheticBackend(size, clock)
+    raise ValueError(f"unknown capture backend {spec!r}")
+
+
+class FrameRing:
+    """Fixed-capacity ring of recent frames backed by preallocated buffers.
+
+    The writer fills one slot at a time (`begin_write()` / `commit()`); readers look
+    frames up by timestamp. A slot is unpublished while it is being written, so a
+    reader never copies a half-written frame. Buffers are reused across captures and
+    only reallocated when the screen resolution grows.
+    """
+
+    def __init__(self, capacity: int = FRAME_HISTORY):
+        self.capacity = max(2, int(capacity))
+        self._buffers: List[bytearray] = [bytearray() for _ in range(self.capacity)]
+        self._sizes: List[Tuple[int, int]] = [(0, 0)] * self.capacity
+        self._times: List[Optional[float]] = [None] * self.capacity
+        self._hashes: List[Any] = [None] * self.capacity
+        self._seqs: List[int] = [-1] * self.capacity
+        self._ns: List[int] = [0] * self.capacity
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def begin_write(self, nbytes: int) -> Tuple[int, bytearray]:
+        """Reserve the oldest slot for writing and return (slot, buffer)."""
+        with self._lock:
+            slot = self._next
+            self._times[slot] = None  # unpublish while writing
+        buf = self._buffers[slot]
+        if len(buf) < nbytes:
+            buf = bytearray(nbytes)
+            self._buffers[slot] = buf
+        return slot, buf
+
+    def commit(self, slot: int, size: Tuple[int, int], captured_at: float, hashes=None, seq: int = -1,
+               captured_ns: int = 0) -> None:
+        """Publish a slot filled after `begin_write()`."""
+        with self._lock:
+            self._sizes[slot] = size
+            self._hashes[slot] = hashes
+            self._seqs[slot] = seq
+            self._ns[slot] = captured_ns
+            self._times[slot] = captured_at
+            self._next = (slot + 1) % self.capacity
+
+    def push(self, frame: ScreenFrame) -> None:
+        """Copy an already captured frame into the ring."""
+        slot, buf = self.begin_write(len(frame.bits))
+        buf[:len(frame.bits)] = frame.bits
+        self.commit(slot, frame.size, frame.captured_at, frame.tile_hashes, frame.seq, frame.captured_ns)
+
+    def _copy(self, slot: int, known=None) -> ScreenFrame:
+        """Frame of a slot; pixels are not copied (bits=None) if its seq is in `known`."""
+        w, h = self._sizes[slot]
+        seq = self._seqs[slot]
+        skip = known is not None and seq >= 0 and seq in known
+        return ScreenFrame(bits=None if skip else bytes(self._buffers[slot][:w * h * 4]), size=(w, h),
+                           captured_at=self._times[slot], tile_hashes=self._hashes[slot], seq=seq,
+                           captured_ns=self._ns[slot])
+
+    def latest(self) -> Optional[ScreenFrame]:
+        with self._lock:
+            slot = self._newest_slot(lambda t: True)
+            return self._copy(slot) if slot is not None else None
+
+    def get_at(self, ts: float, known=None) -> Optional[ScreenFrame]:
+        """Return the newest frame captured strictly before `ts`.
+
+        If every cached frame is newer than `ts` (e.g. the event was handled very
+        late), the oldest cached frame is returned as the closest match. Frames whose
+        seq is in `known` (a container, e.g. frame_store.FrameStore's entries) are
+        returned without pixels.
+        """
+        with self._lock:
+            slot = self._newest_slot(lambda t: t < ts)
+            if slot is None:
+                slot = self._oldest_slot()
+            return self._copy(slot, known) if slot is not None else None
+
+    def hashes_at(self, ts: float):
+        """Tile hashes and size of the frame `get_at(ts)` would return, without copying pixels."""
+        with self._lock:
+            slot = self._newest_slot(lambda t: t < ts)
+            if slot is None:
+                slot = self._oldest_slot()
+            return (self._hashes[slot], self._sizes[slot]) if slot is not None else (None, (0, 0))
+
+    def _newest_slot(self, accept) -> Optional[int]:
+        for i in range(1, self.capacity + 1):
+            slot = (self._next - i) % self.capacity
+            t = self._times[slot]
+            if t is not None and accept(t):
+                return slot
+        return None
+
+    def _oldest_slot(self) -> Optional[int]:
+        for i in range(self.capacity):
+            slot = (self._next + i) % self.capacity
+            if self._times[slot] is not None:
+                return slot
+        return None
 
 
 class RecentScreen:
-    """Keeps a recent screenshot in memory and refreshes it in a background thread."""
+    """Keeps the recent screenshots in memory and refreshes them in a background thread."""
 
     def __init__(
         self,
-        capture_interval: float = 0.1,
+        min_fps: float = CAPTURE_MIN_FPS,
+        max_fps: float = CAPTURE_MAX_FPS,
+        active_window: float = ACTIVE_WINDOW_SECONDS,
         stale_after_seconds: float = 5.0,
+        history: int = FRAME_HISTORY,
+        capture=None,
     ):
-        self.capture_interval = float(capture_interval)
+        """`capture`: a CaptureBackend, by default `make_backend()` (the desktop)."""
+        self._capturer = capture if capture is not None else make_backend()
+        self.max_fps = float(max_fps)
+        self.min_fps = min(float(min_fps), self.max_fps)
+        self.active_window = float(active_window)
         self.stale_after_seconds = float(stale_after_seconds)
 
         self._logger = _get_logger()
         self._lock = threading.Lock()
         self._stop_event = threading.Event()
+        self._wake_event = threading.Event()  # set by input to trigger an immediate capture
+        self._ring = FrameRing(history)
+        self._last_error: Optional[str] = None
+        self._last_input = 0.0  # time.monotonic() of the latest input
+        self._active = False  # whether the refresh thread currently runs at max_fps
+        self._seq = 0  # capture sequence number of the next frame
 
         # Seed with an initial frame (best-effort).
         try:
-            frame = capturer.capture()
+            self._capture_once()
         except Exception:
             self._logger.exception("Initial screen capture failed; will retry in background")
-            # Use an empty placeholder; get() will retry.
-            frame = None
-
-        self._frame: Optional[ScreenFrame] = frame
-        self._last_error: Optional[str] = None
 
         self._refresh_thread = threading.Thread(target=self._refresh_loop, name="RecentScreenRefresh")
         self._refresh_thread.daemon = True
         self._refresh_thread.start()
 
     def stop(self) -> None:
-        """Stop the background capture thread."""
+        """Stop the background capture thread and wait for it to finish its capture."""
         self._stop_event.set()
+        self._wake_event.set()
+        if self._refresh_thread is not threading.current_thread():
+            self._refresh_thread.join(timeout=5.0)
+
+    def capture_now(self) -> None:
+        """Capture a frame on the caller's thread.
+
+        Only once the refresh thread is stopped (the ring has a single writer); the
+        replay harness uses this to capture on its virtual clock.
+        """
+        if not self._stop_event.is_set():
+            raise RuntimeError("capture_now() needs the refresh thread stopped")
+        self._capture_once()
+
+    def notify_input(self) -> None:
+        """Tell the scheduler that user input just arrived.
+
+        Called from input listener callbacks, so it only stores a timestamp and, when
+        the loop is idling at the slow rate, wakes it for an immediate capture.
+        """
+        self._last_input = time.monotonic()
+        if not self._active:
+            self._wake_event.set()
+
+    def _capture_once(self) -> None:
+        slot, buf = self._ring.begin_write(self._capturer.frame_nbytes())
+        size, captured_at = self._capturer.capture_into(buf)
+        captured_ns = time.perf_counter_ns()
+        try:
+            hashes = tile_hashes(buf, size)
+        except Exception:
+            self._logger.exception("tile hashing failed")
+            hashes = None
+        self._ring.commit(slot, size, captured_at, hashes, self._seq, captured_ns)
+        self._seq += 1
+
+    def _next_interval(self) -> float:
+        self._active = time.monotonic() - self._last_input < self.active_window
+        return 1.0 / (self.max_fps if self._active else self.min_fps)
 
     def _refresh_loop(self) -> None:
         """Background capture loop (never exits on transient errors)."""
-        global capturer
+        stats_started = time.monotonic()
+        stats_cpu = time.thread_time()
+        stats_frames = 0
 
         while not self._stop_event.is_set():
+            started = time.monotonic()
+            self._wake_event.clear()
             try:
-                frame = capturer.capture()
+                self._capture_once()
+                stats_frames += 1
                 with self._lock:
-                    self._frame = frame
                     self._last_error = None
             except Exception as e:
                 # Do NOT let the thread die; sleep and retry.
@@ -195,15 +534,38 @@ class RecentScreen:
                 self._logger.exception("%s", msg)
 
                 # Recreate capturer in case DC/session objects got invalid after sleep/lock.
-                try:
-                    capturer = ScreenCapturer()
-                except Exception:
-                    self._logger.exception("Failed to recreate ScreenCapturer")
+                if isinstance(self._capturer, ScreenCapturer):
+                    try:
+                        self._capturer = ScreenCapturer(self._capturer.clock)
+                    except Exception:
+                        self._logger.exception("Failed to recreate ScreenCapturer")
 
                 time.sleep(1.0)
                 continue
 
-            time.sleep(self.capture_interval)
+            elapsed = time.monotonic() - stats_started
+            if elapsed >= CAPTURE_STATS_INTERVAL:
+                cpu = time.thread_time() - stats_cpu
+                self._logger.info(
+                    "capture stats: %.2f fps over %.0fs, cpu %.2fs (%.1f%%), rate %s-%s fps, %s",
+                    stats_frames / elapsed, elapsed, cpu, 100.0 * cpu / elapsed, self.min_fps, self.max_fps,
+                    self._capturer.latency_summary(),
+                )
+                stats_started = time.monotonic()
+                stats_cpu = time.thread_time()
+                stats_frames = 0
+
+            # Sleep until the next scheduled capture, or until input wakes us up.
+            remaining = self._next_interval() - (time.monotonic() - started)
+            if remaining > 0:
+                self._wake_event.wait(remaining)
+
+    @staticmethod
+    def _return(frame: Optional[ScreenFrame], with_size: bool):
+        if frame is None:
+            # No frame available yet.
+            return (b"", (0, 0)) if with_size else b""
+        return (frame.bits, frame.size) if with_size else frame.bits
 
     def get(self, with_size: bool = False):
         """Return the most recent screenshot without blocking input callbacks.
@@ -216,21 +578,28 @@ class RecentScreen:
         Long-run robustness is still handled by the background refresh thread, which
         retries forever and recreates the capturer after failures.
         """
-        now = time.time()
+        # Even if stale, returning the last cached frame is better than blocking
+        # the input listener with a direct capture.
+        return self._return(self._ring.latest(), with_size)
 
-        with self._lock:
-            frame = self._frame
+    def get_frame_at(self, ts: float, known=None) -> Optional[ScreenFrame]:
+        """Like `get_at`, but return the whole ScreenFrame (or None if nothing was captured yet).
 
-        def _return(frame_obj: ScreenFrame):
-            return (frame_obj.bits, frame_obj.size) if with_size else frame_obj.bits
+        See FrameRing.get_at for `known`.
+        """
+        return self._ring.get_at(ts, known)
+
+    def get_at(self, ts: float, with_size: bool = False):
+        """Return the newest screenshot captured strictly before timestamp `ts`.
 
-        if frame is not None:
-            # Even if stale, returning the last cached frame is better than blocking
-            # the input listener with a direct capture.
-            return _return(frame)
+        Input callbacks pass the time the event arrived, so the observation shows
+        the screen as the user saw it *before* acting rather than the UI's reaction.
+        """
+        return self._return(self._ring.get_at(ts), with_size)
 
-        # No frame available yet.
-        return (b"", (0, 0)) if with_size else b""
+    def get_hashes_at(self, ts: float):
+        """Return (tile hash grid or None, size) of the frame shown before `ts`."""
+        return self._ring.hashes_at(ts)
 
     @property
     def last_error(self) -> Optional[str]:
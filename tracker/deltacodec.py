@@ -0,0 +1,226 @@
+"""Keyframe + delta screenshot codec.
+
+Consecutive screenshots of a task usually differ only in small regions (a menu
+opening, a character typed). In "delta" storage mode the recorder writes a full
+PNG keyframe every KEYFRAME_INTERVAL frames and, in between, only the rectangles
+that changed relative to the previous frame. Records live in a session frame
+archive (archive.py) under the usual screenshot names:
+
+- keyframe: a plain PNG file
+- delta:    DELTA_MAGIC, a JSON header {"base": <previous member>, "rects":
+            [[x, y, w, h, png length], ...]}, then the PNGs of the rectangles
+
+`DeltaDecoder` reconstructs any member at random access by walking back to the
+nearest keyframe (at most KEYFRAME_INTERVAL - 1 deltas), caching the last frame
+so sequential reads only apply one delta each.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import struct
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+KEYFRAME_INTERVAL = 30
+DELTA_TILE = 32  # granularity of change detection, in pixels
+MAX_DELTA_AREA = 0.5  # write a keyframe instead when more than this fraction of the frame changed
+
+DELTA_MAGIC = b"PCTDLT1\n"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_HEADER_LEN = struct.Struct("<I")
+
+Rect = Tuple[int, int, int, int]  # x, y, w, h
+
+
+@dataclass
+class DeltaPlan:
+    """What the encoder decided for one frame."""
+
+    keyframe: bool
+    base: Optional[str] = None  # previous member, for deltas
+    rects: List[Tuple[Rect, bytes]] = field(default_factory=list)  # (rect, raw BGRX crop)
+
+
+def changed_rects(prev: np.ndarray, cur: np.ndarray, tile: int = DELTA_TILE) -> List[Rect]:
+    """Rectangles (x, y, w, h) covering every pixel that differs between two (h, w, 4) frames.
+
+    Changed tiles are merged into horizontal runs per tile row, and runs spanning the
+    same columns in consecutive rows are merged into one rectangle.
+    """
+    h, w = cur.shape[:2]
+    rows, cols = -(-h // tile), -(-w // tile)
+    diff = np.any(prev != cur, axis=2)
+    pad = np.zeros((rows * tile, cols * tile), dtype=bool)
+    pad[:h, :w] = diff
+    mask = pad.reshape(rows, tile, cols, tile).any(axis=(1, 3))
+
+    rects: List[Rect] = []
+    open_runs = {}  # (c0, c1) -> index into rects, for runs touching the previous row
+    for r in range(rows):
+        runs = []
+        line = mask[r]
+        c = 0
+        while c < cols:
+            if line[c]:
+                start = c
+                while c < cols and line[c]:
+                    c += 1
+                runs.append((start, c))
+            else:
+                c += 1
+
+        next_open = {}
+        for c0, c1 in runs:
+            x, y = c0 * tile, r * tile
+            rw, rh = min(w, c1 * tile) - x, min(h, (r + 1) * tile) - y
+            if (c0, c1) in open_runs:
+                i = open_runs[(c0, c1)]
+                px, py, pw, ph = rects[i]
+                rects[i] = (px, py, pw, ph + rh)
+            else:
+                i = len(rects)
+                rects.append((x, y, rw, rh))
+            next_open[(c0, c1)] = i
+        open_runs = next_open
+    return rects
+
+
+class DeltaEncoder:
+    """Decides keyframe vs delta for each saved frame (runs on the recorder thread).
+
+    Only the cheap part lives here (pixel diff and cropping); PNG encoding of the
+    plan happens in `encode_plan`, which can run in a worker process.
+    """
+
+    def __init__(self, keyframe_interval: int = KEYFRAME_INTERVAL, tile: int = DELTA_TILE):
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.tile = int(tile)
+        self._prev: Optional[np.ndarray] = None
+        self._prev_name: Optional[str] = None
+        self._since_keyframe = 0
+        self._restart = False
+
+    def restart(self) -> None:
+        """Make the next frame a keyframe (the previous one could not be stored).
+
+        May be called from the encoder's result thread."""
+        self._restart = True
+
+    def plan(self, name: str, bits, size: Tuple[int, int]) -> DeltaPlan:
+        w, h = size
+        cur = np.frombuffer(bits, dtype=np.uint8, count=w * h * 4).reshape(h, w, 4)
+
+        keyframe = (
+            self._restart
+            or self._prev is None
+            or self._prev.shape != cur.shape
+            or self._since_keyframe + 1 >= self.keyframe_interval
+        )
+        plan = DeltaPlan(keyframe=True)
+        if not keyframe:
+            rects = changed_rects(self._prev, cur, self.tile)
+            area = sum(rw * rh for _, _, rw, rh in rects)
+            if area <= MAX_DELTA_AREA * w * h:
+                plan = DeltaPlan(
+                    keyframe=False,
+                    base=self._prev_name,
+                    rects=[((x, y, rw, rh), cur[y:y + rh, x:x + rw].tobytes()) for x, y, rw, rh in rects],
+                )
+
+        if plan.keyframe:
+            self._restart = False
+        self._since_keyframe = 0 if plan.keyframe else self._since_keyframe + 1
+        self._prev = cur.copy()  # `bits` may be a reused buffer
+        self._prev_name = name
+        return plan
+
+
+def encode_png(bits, size: Tuple[int, int], compress_level: int = 6) -> bytes:
+    image = Image.frombuffer("RGB", size, bits, "raw", "BGRX", 0, 1)
+    out = io.BytesIO()
+    image.save(out, format="PNG", compress_level=compress_level)
+    return out.getvalue()
+
+
+def encode_delta(base: str, rects: List[Tuple[Rect, bytes]]) -> bytes:
+    """Serialize a delta record: header + one PNG per changed rectangle."""
+    blobs = [encode_png(crop, (rw, rh)) for (_, _, rw, rh), crop in rects]
+    header = json.dumps({
+        "base": base,
+        "rects": [[x, y, rw, rh, len(blob)] for ((x, y, rw, rh), _), blob in zip(rects, blobs)],
+    }).encode("utf-8")
+    return b"".join([DELTA_MAGIC, _HEADER_LEN.pack(len(header)), header] + blobs)
+
+
+def is_delta(data: bytes) -> bool:
+    return data[:len(DELTA_MAGIC)] == DELTA_MAGIC
+
+
+def parse_delta(data: bytes):
+    """Return (base name, [(x, y, png bytes), ...]) of a delta record."""
+    pos = len(DELTA_MAGIC)
+    (header_len,) = _HEADER_LEN.unpack_from(data, pos)
+    pos += _HEADER_LEN.size
+    header = json.loads(data[pos:pos + header_len].decode("utf-8"))
+    pos += header_len
+    patches = []
+    for x, y, _, _, length in header["rects"]:
+        patches.append((x, y, data[pos:pos + length]))
+        pos += length
+    return header["base"], patches
+
+
+class DeltaDecoder:
+    """Reconstructs frames of a keyframe + delta archive (see archive.FrameArchiveReader)."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self._cached_name: Optional[str] = None
+        self._cached: Optional[Image.Image] = None
+
+    def decode(self, name: str) -> Image.Image:
+        """Return the full RGB frame stored under `name`.
+
+        Raises ValueError if a delta's base frame is not in the archive.
+        """
+        chain = []
+        while name != self._cached_name:
+            if chain and name not in self.reader:
+                raise ValueError(f"delta frame {chain[-1][0]!r} in {self.reader.path}: "
+                                 f"its base frame {name!r} is missing from the archive")
+            data = self.reader.read(name)
+            if not is_delta(data):
+                image = Image.open(io.BytesIO(data)).convert("RGB")
+                break
+            base, patches = parse_delta(data)
+            chain.append((name, patches))
+            name = base
+        else:
+            image = self._cached.copy()
+
+        for member, patches in reversed(chain):
+            for x, y, png in patches:
+                with Image.open(io.BytesIO(png)) as patch:
+                    image.paste(patch.convert("RGB"), (x, y))
+            name = member
+
+        self._cached_name, self._cached = name, image
+        return image.copy()
+
+    def decode_index(self, index: int) -> Image.Image:
+        """Random access by position in the archive (recording order)."""
+        return self.decode(self.reader.names()[index])
+
+    def to_png(self, name: str) -> bytes:
+        """Member as standalone PNG bytes (keyframes are returned as stored)."""
+        data = self.reader.read(name)
+        if not is_delta(data):
+            return data
+        out = io.BytesIO()
+        self.decode(name).save(out, format="PNG")
+        return out.getvalue()
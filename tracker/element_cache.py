@@ -0,0 +1,100 @@
+"""Cache of UI element info for repeated clicks.
+
+Annotators click the same toolbar buttons and list items over and over, and each
+click costs a full UIA `desktop.from_point` walk. Entries are keyed by foreground
+window handle and click point and store the element info together with
+
+- the window rectangle, so a moved or resized window invalidates them, and
+- the tile hashes (tilehash.py) covering the element's rectangle in the frame shown
+  before the click, so any visible change of the element's region invalidates them.
+
+A hit returns a copy of the cached `{name, coordinates}` without touching UIA.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from tilehash import region_key
+
+ELEMENT_CACHE_SIZE = 512
+
+WindowProbe = Callable[[], Optional[Tuple[int, Tuple[int, int, int, int]]]]  # -> (hwnd, window rect)
+HashProbe = Callable[[float], Tuple[object, Tuple[int, int]]]  # ts -> (tile hash grid, frame size)
+
+
+class ElementCache:
+    """LRU cache in front of an element lookup `resolve(x, y)`."""
+
+    def __init__(self, window_probe: WindowProbe, hash_probe: Optional[HashProbe] = None,
+                 max_entries: int = ELEMENT_CACHE_SIZE):
+        self.window_probe = window_probe
+        self.hash_probe = hash_probe
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[Tuple[int, int, int], Tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0  # misses caused by a stale entry
+        self.miss_ms = 0.0
+
+    def lookup(self, x: int, y: int, at: Optional[float], resolve: Callable[[int, int], Optional[Dict]]):
+        """Element info at (x, y) for a click at time `at` (time.time()), cached when possible."""
+        try:
+            window = self.window_probe()
+        except Exception:
+            window = None
+        hashes = None
+        if self.hash_probe is not None and at is not None:
+            hashes, _ = self.hash_probe(at)
+
+        key = (window[0], x, y) if window is not None else None
+        with self._lock:
+            entry = self._entries.get(key) if key is not None else None
+            if entry is not None:
+                window_rect, region, info = entry
+                if window_rect == window[1] and self._region_matches(region, hashes, info):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return _copy(info)
+                del self._entries[key]
+                self.invalidated += 1
+
+        started = time.perf_counter()
+        info = resolve(x, y)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+        with self._lock:
+            self.misses += 1
+            self.miss_ms += elapsed_ms
+            if key is not None and info is not None:
+                self._entries[key] = (window[1], region_key(hashes, info["coordinates"]), _copy(info))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return info
+
+    def _region_matches(self, region: Optional[bytes], hashes, info: Dict) -> bool:
+        if self.hash_probe is None:
+            return True  # window check only
+        # Without hashes on either side the region cannot be verified: treat as changed.
+        return region is not None and region == region_key(hashes, info["coordinates"])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def summary(self) -> str:
+        with self._lock:
+            total = self.hits + self.misses
+            avg_ms = self.miss_ms / self.misses if self.misses else 0.0
+            return (f"element cache: {self.hits}/{total} hits ({100.0 * self.hits / total if total else 0.0:.1f}%), "
+                    f"{self.invalidated} invalidated, saved ~{self.hits * avg_ms:.0f} ms "
+                    f"(lookup avg {avg_ms:.1f} ms)")
+
+
+def _copy(info: Dict) -> Dict:
+    return {"name": info["name"], "coordinates": dict(info["coordinates"])}
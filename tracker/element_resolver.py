@@ -0,0 +1,153 @@
+"""Asynchronous UI Automation element lookup.
+
+`desktop.from_point` can take hundreds of milliseconds on heavy applications.
+Doing it inside the pynput mouse callback delays later clicks/releases and breaks
+double-click detection, so clicks are recorded immediately with a
+`PendingElement` and a dedicated resolver thread fills it in.
+
+Timeout policy: every request has a deadline of `timeout` seconds after the
+click. The recorder waits at most until that deadline when it flushes the event
+(usually the element is long resolved by then); after it, the event is saved
+with element "Unknown" and no rect. Requests still queued past their deadline
+are skipped instead of queried, so a slow application cannot build a backlog.
+
+With an `ElementCache` (element_cache.py), repeated clicks on an unchanged
+region are answered without querying UIA at all.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from element_cache import ElementCache
+from log import get_logger
+
+ELEMENT_TIMEOUT = 2.0  # seconds after the click before its element is given up
+
+
+class PendingElement:
+    """Element info of a click, filled in asynchronously by ElementResolver."""
+
+    def __init__(self, x: int, y: int, deadline: float, stats: "ResolverStats"):
+        self.x = x
+        self.y = y
+        self.clicked_at = time.time()  # overridden by submit() with the click time
+        self.deadline = deadline  # time.monotonic()
+        self._stats = stats
+        self._done = threading.Event()
+        self._info: Optional[Dict] = None
+        self._timed_out = False
+
+    def set(self, info: Optional[Dict]) -> None:
+        self._info = info
+        self._done.set()
+
+    def result(self) -> Optional[Dict]:
+        """Block until resolved or the deadline passes; returns the info dict or None."""
+        if not self._done.wait(max(0.0, self.deadline - time.monotonic())):
+            if not self._timed_out:
+                self._timed_out = True
+                self._stats.count("timed_out")
+            return None
+        return self._info
+
+    @property
+    def name(self) -> str:
+        info = self.result()
+        return info["name"] if info else ""
+
+    @property
+    def coordinates(self) -> Optional[Dict]:
+        info = self.result()
+        return info["coordinates"] if info else None
+
+
+class ResolverStats:
+    """Thread-safe counters for resolution latency."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {"resolved": 0, "failed": 0, "skipped": 0, "timed_out": 0}
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] += 1
+
+    def record(self, latency_ms: float, ok: bool) -> None:
+        with self._lock:
+            self.counters["resolved" if ok else "failed"] += 1
+            self.total_ms += latency_ms
+            self.max_ms = max(self.max_ms, latency_ms)
+
+    def summary(self) -> str:
+        with self._lock:
+            done = self.counters["resolved"] + self.counters["failed"]
+            avg = self.total_ms / done if done else 0.0
+            return (f"resolved {self.counters['resolved']}, failed {self.counters['failed']}, "
+                    f"skipped {self.counters['skipped']}, timed out {self.counters['timed_out']}, "
+                    f"latency avg {avg:.1f} ms / max {self.max_ms:.1f} ms")
+
+
+class ElementResolver:
+    """Runs `lookup(x, y)` for clicks on a dedicated thread."""
+
+    def __init__(self, lookup: Callable[[int, int], Optional[Dict]], timeout: float = ELEMENT_TIMEOUT,
+                 cache: Optional[ElementCache] = None):
+        self.lookup = lookup
+        self.timeout = float(timeout)
+        self.cache = cache
+        self.stats = ResolverStats()
+        self._logger = get_logger("elements")
+        self._queue: "queue.Queue[Optional[PendingElement]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ElementResolver", daemon=True)
+        self._thread.start()
+
+    def submit(self, x: int, y: int, clicked_at: Optional[float] = None) -> PendingElement:
+        """Queue a lookup; returns immediately (safe to call from listener callbacks)."""
+        pending = PendingElement(x, y, time.monotonic() + self.timeout, self.stats)
+        if clicked_at is not None:
+            pending.clicked_at = clicked_at
+        self._queue.put(pending)
+        return pending
+
+    def stop(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=self.timeout)
+        self._logger.info("element resolver: %s", self.stats.summary())
+        if self.cache is not None:
+            self._logger.info("%s", self.cache.summary())
+
+    def _run(self) -> None:
+        try:
+            # UIA is COM based; give this thread its own (multithreaded) apartment.
+            import comtypes
+
+            comtypes.CoInitializeEx(comtypes.COINIT_MULTITHREADED)
+        except Exception:
+            pass
+
+        while True:
+            pending = self._queue.get()
+            if pending is None:
+                return
+            if time.monotonic() > pending.deadline:
+                self.stats.count("skipped")
+                pending.set(None)
+                continue
+
+            started = time.perf_counter()
+            try:
+                if self.cache is not None:
+                    info = self.cache.lookup(pending.x, pending.y, pending.clicked_at, self.lookup)
+                else:
+                    info = self.lookup(pending.x, pending.y)
+            except Exception:
+                self._logger.exception("element lookup failed at (%s, %s)", pending.x, pending.y)
+                info = None
+            self.stats.record((time.perf_counter() - started) * 1000.0, info is not None)
+            pending.set(info)
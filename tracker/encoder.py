@@ -0,0 +1,264 @@
+"""Long-lived screenshot encoder service.
+
+Each recording session used to spawn its own process pool and tear it down in
+`Recorder.wait()`; with the "spawn" start method (and under PyInstaller) every
+worker re-imports PIL and the tracker modules, so starting and finishing a task
+cost seconds. `EncoderService` owns one pool for the life of the tracker, warmed
+up once; a recorder attaches an `EncoderSession`, submits its frames through
+it and, at the end of the session, waits on the session's completion barrier
+(its own tasks only) before detaching.
+
+A Recorder created without a service starts a private one and closes it in
+`wait()`, as before.
+
+Executors:
+
+- "process": a spawn-context process pool; frames reach the workers through
+  shared memory (frame_arena.py).
+- "thread":  a thread pool in the tracker process. PIL releases the GIL while
+  zlib compresses, so this often keeps up with processes, without IPC.
+- "inline":  encode synchronously in the caller (baseline / debugging).
+
+Process and thread workers run at ENCODER_PRIORITY ("below_normal" by default)
+so that encoding yields the CPU to the user's foreground work; sessions count
+the CPU time their tasks used (`EncoderSession.cpu_seconds`).
+"""
+
+from __future__ import annotations
+
+import ctypes
+import importlib
+import itertools
+import multiprocessing
+import multiprocessing.pool
+import os
+import sys
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from log import get_logger
+
+WARM_MODULES = ("recorder",)  # imported by every worker before the first frame arrives
+EXECUTORS = ("process", "thread", "inline")
+ENCODER_PRIORITY = "below_normal"
+PRIORITIES = ("normal", "below_normal")
+WORKER_NICE = 10  # POSIX niceness for "below_normal"
+
+_BELOW_NORMAL_PRIORITY_CLASS = 0x4000
+_THREAD_PRIORITY_BELOW_NORMAL = -1
+
+
+def warm_up(modules: Iterable[str]) -> None:
+    """Import `modules` in a worker process."""
+    for module in modules:
+        importlib.import_module(module)
+
+
+def set_worker_priority(priority: str, thread: bool = False) -> None:
+    """Pool initializer: lower the priority of this worker process (or, with `thread`,
+    of this worker thread). Best effort; per-thread priority needs Windows or Linux."""
+    if priority == "normal":
+        return
+    try:
+        if os.name == "nt":
+            kernel32 = ctypes.windll.kernel32
+            if thread:
+                kernel32.SetThreadPriority(kernel32.GetCurrentThread(), _THREAD_PRIORITY_BELOW_NORMAL)
+            else:
+                kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), _BELOW_NORMAL_PRIORITY_CLASS)
+        elif not thread:
+            os.setpriority(os.PRIO_PROCESS, 0, WORKER_NICE)
+        elif sys.platform.startswith("linux"):
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), WORKER_NICE)
+    except Exception:
+        pass
+
+
+def timed_call(func: Callable, args=()):
+    """Run `func(*args)` in a worker; returns (result, CPU seconds of the calling thread)."""
+    started = time.thread_time()
+    result = func(*args)
+    return result, time.thread_time() - started
+
+
+class InlinePool:
+    """The subset of the Pool interface used here, running every task in the caller."""
+
+    def apply_async(self, func: Callable, args=(), callback: Optional[Callable] = None,
+                    error_callback: Optional[Callable] = None):
+        try:
+            result = func(*args)
+        except Exception as e:
+            if error_callback is not None:
+                error_callback(e)
+            return None
+        if callback is not None:
+            callback(result)
+        return None
+
+    def map_async(self, func: Callable, iterable, chunksize=None):
+        for item in iterable:
+            func(item)
+        return _Done()
+
+    def close(self) -> None:
+        pass
+
+    def join(self) -> None:
+        pass
+
+    def terminate(self) -> None:
+        pass
+
+
+class _Done:
+    def wait(self, timeout=None):
+        pass
+
+    def ready(self) -> bool:
+        return True
+
+
+class EncoderService:
+    """A warm worker pool shared by recording sessions."""
+
+    def __init__(self, executor: str = "process", processes: Optional[int] = None,
+                 warm_modules: Iterable[str] = WARM_MODULES, priority: str = ENCODER_PRIORITY):
+        if executor not in EXECUTORS:
+            raise ValueError(f"unknown encoder executor {executor!r}, expected one of {EXECUTORS}")
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown encoder priority {priority!r}, expected one of {PRIORITIES}")
+        self._logger = get_logger("encoder")
+        started = time.perf_counter()
+        self.executor = executor
+        self.processes = processes or os.cpu_count() or 1
+        if executor == "process":
+            # Using a dedicated context improves Windows/pyinstaller reliability.
+            try:
+                ctx = multiprocessing.get_context("spawn")
+            except Exception:
+                ctx = multiprocessing
+
+            # maxtasksperchild helps avoid long-run worker memory growth (PIL, etc.).
+            self.pool = ctx.Pool(self.processes, initializer=set_worker_priority, initargs=(priority,),
+                                 maxtasksperchild=200)
+        elif executor == "thread":
+            self.pool = multiprocessing.pool.ThreadPool(self.processes, initializer=set_worker_priority,
+                                                        initargs=(priority, True))
+        else:
+            self.processes = 0
+            self.pool = InlinePool()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._sessions = 0
+        self._closed = False
+        self._warm = self.pool.map_async(warm_up, [tuple(warm_modules)] * max(1, self.processes), chunksize=1)
+        self._logger.info("%s encoder service started with %s workers (%s priority) in %.0f ms", executor,
+                          self.processes, priority if executor != "inline" else "caller's",
+                          (time.perf_counter() - started) * 1000.0)
+
+    @property
+    def in_process(self) -> bool:
+        """Whether tasks run in this process (arguments are not pickled)."""
+        return self.executor != "process"
+
+    def attach(self, name: str = "") -> "EncoderSession":
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("encoder service is closed")
+            self._sessions += 1
+            return EncoderSession(self, name or f"session {next(self._ids)}")
+
+    def _detach(self) -> None:
+        with self._lock:
+            self._sessions -= 1
+
+    def wait_warm(self, timeout: Optional[float] = None) -> bool:
+        """Block until every worker has imported the warm-up modules."""
+        self._warm.wait(timeout)
+        return self._warm.ready()
+
+    def close(self) -> None:
+        """Finish all queued work and stop the workers."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            self.pool.close()
+            self.pool.join()
+        except Exception:
+            try:
+                self.pool.terminate()
+            except Exception:
+                pass
+        self._logger.info("encoder service stopped")
+
+
+class EncoderSession:
+    """One recording session's use of an EncoderService.
+
+    `apply_async` has the signature of `multiprocessing.Pool.apply_async`; `wait()`
+    returns once every task submitted through this session has finished and its
+    callback has run. `cpu_seconds` adds up the CPU time of the finished tasks.
+    """
+
+    def __init__(self, service: EncoderService, name: str):
+        self.service = service
+        self.name = name
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._detached = False
+        self.submitted = 0
+        self.cpu_seconds = 0.0
+
+    def apply_async(self, func: Callable, args=(), callback: Optional[Callable] = None,
+                    error_callback: Optional[Callable] = None):
+        if self._detached:
+            raise RuntimeError(f"encoder session {self.name} is detached")
+        with self._cond:
+            self._pending += 1
+            self.submitted += 1
+
+        def _callback(timed):
+            result, cpu_seconds = timed
+            try:
+                if callback is not None:
+                    callback(result)
+            finally:
+                self._finished(cpu_seconds)
+
+        def _error_callback(error):
+            try:
+                if error_callback is not None:
+                    error_callback(error)
+            finally:
+                self._finished()
+
+        try:
+            return self.service.pool.apply_async(timed_call, (func, args), callback=_callback,
+                                                 error_callback=_error_callback)
+        except Exception:
+            self._finished()
+            raise
+
+    def _finished(self, cpu_seconds: float = 0.0) -> None:
+        with self._cond:
+            self._pending -= 1
+            self.cpu_seconds += cpu_seconds
+            self._cond.notify_all()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Completion barrier: block until this session's tasks are done."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending <= 0, timeout)
+
+    def detach(self) -> None:
+        if not self._detached:
+            self._detached = True
+            self.service._detach()
@@ -0,0 +1,99 @@
+"""Per-session timing report from the monotonic event stamps.
+
+Events record time.perf_counter_ns() stamps of their raw input (`input_ns`),
+their frame's capture (`frame_ns`) and their save (`save_ns`), see recorder.py.
+For each session JSONL this reports the distributions of
+
+- input-to-frame skew, frame_ns - input_ns: negative when the screenshot was
+  captured before the input (as intended), positive when the capture ring had
+  no older frame left and the screenshot may already show the input's effect;
+- input-to-disk latency, save_ns - input_ns: until the event was handed to the
+  event log (which writes it within EVENT_FLUSH_SECONDS, see eventlog.py) and
+  its screenshot to the encoder.
+
+Sessions recorded before these stamps existed are skipped.
+
+    python event_timing.py [events_dir_or_session.jsonl ...]   (default: events)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from sessiondir import session_files
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+def session_timings(path: str) -> Dict[str, List[float]]:
+    """Skew and latency samples (ms) of one session JSONL."""
+    skew_ms: List[float] = []
+    latency_ms: List[float] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue  # torn last line, see eventlog.recover_event_log
+            input_ns = event.get("input_ns")
+            if input_ns is None:
+                continue
+            if event.get("frame_ns") is not None:
+                skew_ms.append((event["frame_ns"] - input_ns) / 1e6)
+            if event.get("save_ns") is not None:
+                latency_ms.append((event["save_ns"] - input_ns) / 1e6)
+    return {"skew_ms": skew_ms, "latency_ms": latency_ms}
+
+
+def distribution(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    return (f"min {min(values):8.1f}  p50 {percentile(values, 0.5):8.1f}  p90 {percentile(values, 0.9):8.1f}  "
+            f"p99 {percentile(values, 0.99):8.1f}  max {max(values):8.1f} ms")
+
+
+def event_files(paths: Iterable[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(session_files(path, ".jsonl"))
+        else:
+            files.append(path)
+    return files
+
+
+def report(path: str) -> Optional[str]:
+    timings = session_timings(path)
+    skew, latency = timings["skew_ms"], timings["latency_ms"]
+    if not skew and not latency:
+        return None
+    late = sum(1 for v in skew if v > 0)
+    return (f"{os.path.basename(path)}: {len(latency)} events\n"
+            f"  input -> frame skew   {distribution(skew)}  ({late} frames captured after the input)\n"
+            f"  input -> disk latency {distribution(latency)}")
+
+
+def main(argv: List[str]) -> int:
+    files = event_files(argv or ["events"])
+    reported = 0
+    for path in files:
+        text = report(path)
+        if text is not None:
+            print(text)
+            reported += 1
+    if not reported:
+        print("no sessions with monotonic timestamps found")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
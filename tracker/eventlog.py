@@ -0,0 +1,176 @@
+"""Buffered JSONL event writer.
+
+`Recorder.save()` used to open the session's JSONL file, write one event and
+close it again for every action, on the input-handling thread. `EventWriter`
+keeps the file open and serializes events into a batch in memory; the batch is
+written (one write call) on the writer's own scheduler thread once it holds
+EVENT_FLUSH_EVENTS events or its oldest event is EVENT_FLUSH_SECONDS old, and
+synchronously by `flush()` / `close()`.
+
+EVENT_FSYNC decides when written data is forced to disk:
+
+- "batch": after every batch write (at most EVENT_FLUSH_SECONDS of events can
+  be lost on a power failure);
+- "close": once, when the session's file is closed;
+- "never": leave it to the OS.
+
+A crash can leave a torn (partial) last line. `recover_event_log` truncates it,
+and `recover_event_logs` runs it over an events directory; the tracker does
+this when it starts.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List
+
+from log import get_logger
+from scheduler import Scheduler
+
+EVENT_FLUSH_EVENTS = 32  # buffered events before a write
+EVENT_FLUSH_SECONDS = 1.0  # longest time an event stays in memory
+EVENT_FSYNC = "batch"
+FSYNC_POLICIES = ("batch", "close", "never")
+
+_TAIL_BYTES = 1024 * 1024
+
+
+class EventWriter:
+    """Appends JSON lines to a file in batches (thread-safe)."""
+
+    def __init__(self, path: str, flush_events: int = EVENT_FLUSH_EVENTS,
+                 flush_seconds: float = EVENT_FLUSH_SECONDS, fsync: str = EVENT_FSYNC):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy {fsync!r}, expected one of {FSYNC_POLICIES}")
+        self.path = path
+        self.flush_events = max(1, int(flush_events))
+        self.flush_seconds = flush_seconds
+        self.fsync = fsync
+        self._logger = get_logger("recorder")
+        self._lock = threading.Lock()
+        self._batch: List[bytes] = []
+        self._file = None
+        self._closed = False
+        self._scheduler = Scheduler("EventWriter")
+        self._flush_call = self._scheduler.schedule(None, self.flush)
+
+        self.events = 0
+        self.writes = 0
+        self.fsyncs = 0
+        self.bytes_written = 0
+        self.max_write_ms = 0.0
+
+    def write(self, event: Dict[str, Any]) -> None:
+        """Queue one event; it reaches the file within `flush_seconds`."""
+        line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._closed:
+                raise ValueError(f"event writer for {self.path} is closed")
+            self._batch.append(line)
+            self.events += 1
+            if len(self._batch) >= self.flush_events:
+                self._flush_call.reschedule(0.0)
+            elif len(self._batch) == 1:
+                self._flush_call.reschedule(self.flush_seconds)
+
+    def flush(self) -> None:
+        """Write the pending batch now (fsync'd with the "batch" policy)."""
+        with self._lock:
+            self._write_batch()
+
+    def _write_batch(self) -> None:
+        if not self._batch:
+            return
+        started = time.perf_counter()
+        data = b"".join(self._batch)
+        self._batch.clear()
+        self._flush_call.cancel()
+        if self._file is None:
+            if os.path.exists(self.path):
+                recover_event_log(self.path)
+            self._file = open(self.path, "ab", buffering=0)
+        self._file.write(data)
+        if self.fsync == "batch":
+            os.fsync(self._file.fileno())
+            self.fsyncs += 1
+        self.writes += 1
+        self.bytes_written += len(data)
+        self.max_write_ms = max(self.max_write_ms, (time.perf_counter() - started) * 1000.0)
+
+    def close(self, discard: bool = False) -> None:
+        """Write what is pending (unless `discard`) and close the file."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if discard:
+                self._batch.clear()
+            try:
+                self._write_batch()
+                if self._file is not None and self.fsync == "close":
+                    os.fsync(self._file.fileno())
+                    self.fsyncs += 1
+            finally:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+        self._scheduler.stop()
+
+    def summary(self) -> str:
+        per_write = self.events / self.writes if self.writes else 0.0
+        return (f"{self.events} events in {self.writes} writes ({per_write:.1f} per write, "
+                f"{self.bytes_written / 1024:.0f} KB), {self.fsyncs} fsyncs ({self.fsync}), "
+                f"slowest write {self.max_write_ms:.1f} ms")
+
+
+def recover_event_log(path: str) -> bool:
+    """Truncate a torn last line (no newline, or not valid JSON) left by a crash.
+
+    Only the last _TAIL_BYTES of the file are examined. Returns whether the file
+    was changed.
+    """
+    with open(path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        start = max(0, size - _TAIL_BYTES)
+        f.seek(start)
+        tail = f.read()
+        end = len(tail)
+        while end > 0:
+            if tail[end - 1:end] != b"\n":
+                # Partial line: cut back to the previous newline.
+                cut = tail.rfind(b"\n", 0, end) + 1
+                if cut == 0 and start > 0:
+                    break
+                end = cut
+                continue
+            # A complete last line must parse too (a crash may leave zero-filled blocks).
+            line_start = tail.rfind(b"\n", 0, end - 1) + 1
+            if line_start == 0 and start > 0:
+                break
+            try:
+                json.loads(tail[line_start:end])
+                break
+            except ValueError:
+                end = line_start
+        if start + end == size:
+            return False
+        f.truncate(start + end)
+    get_logger("recorder").warning("truncated torn event log %s from %d to %d bytes", path, size, start + end)
+    return True
+
+
+def recover_event_logs(directory: str) -> int:
+    """Repair every JSONL event log in `directory`; returns how many were truncated."""
+    if not os.path.isdir(directory):
+        return 0
+    repaired = 0
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".jsonl"):
+            try:
+                repaired += recover_event_log(os.path.join(directory, name))
+            except OSError:
+                get_logger("recorder").exception("could not check event log %s", name)
+    return repaired
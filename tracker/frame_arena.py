@@ -0,0 +1,118 @@
+"""Shared-memory frame arena.
+
+Raw BGRX frames are large (~8 MB at 1080p, ~33 MB at 4K). Passing them to the
+PNG encoder pool as `apply_async` arguments pickles the whole frame and pushes it
+through a pipe for every event. Instead, the recorder copies each frame into a
+slot of this arena once and only sends the slot name plus the frame size to the
+worker, which reads the pixels directly from shared memory.
+
+Slots are recycled: the recorder releases a slot when the worker reports back,
+and only reallocates one when a frame no longer fits (resolution change).
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+SHM_SLOTS = 8  # upper bound on frames in flight through shared memory
+
+
+@dataclass(frozen=True)
+class ArenaSlot:
+    """Handle to a frame stored in the arena."""
+
+    index: int
+    name: str
+    nbytes: int
+
+
+class FrameArena:
+    """A bounded pool of reusable `SharedMemory` blocks owned by the recorder."""
+
+    def __init__(self, max_slots: int = SHM_SLOTS):
+        self.max_slots = max(1, int(max_slots))
+        self._blocks: List[Optional[shared_memory.SharedMemory]] = []
+        self._free: List[int] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Counters (for diagnostics).
+        self.allocations = 0
+        self.exhausted = 0
+
+    def put(self, data) -> Optional[ArenaSlot]:
+        """Copy `data` into a free slot.
+
+        Returns None if every slot is in flight (or the arena is closed); callers
+        should then fall back to passing the bytes directly.
+        """
+        nbytes = len(data)
+        if nbytes == 0:
+            return None
+
+        with self._lock:
+            if self._closed:
+                return None
+            if self._free:
+                index = self._free.pop()
+            elif len(self._blocks) < self.max_slots:
+                index = len(self._blocks)
+                self._blocks.append(None)
+            else:
+                self.exhausted += 1
+                return None
+
+        block = self._blocks[index]
+        try:
+            if block is None or block.size < nbytes:
+                if block is not None:
+                    _destroy(block)
+                block = shared_memory.SharedMemory(create=True, size=nbytes)
+                self._blocks[index] = block
+                self.allocations += 1
+            block.buf[:nbytes] = data
+        except Exception:
+            self._blocks[index] = None
+            self.release(index)
+            raise
+
+        return ArenaSlot(index=index, name=block.name, nbytes=nbytes)
+
+    def release(self, index: int) -> None:
+        """Return a slot to the free list (safe to call from pool callback threads)."""
+        with self._lock:
+            if not self._closed and index not in self._free:
+                self._free.append(index)
+
+    def close(self) -> None:
+        """Unlink all blocks. Must only be called once no worker uses them anymore."""
+        with self._lock:
+            self._closed = True
+            blocks, self._blocks = self._blocks, []
+            self._free.clear()
+        for block in blocks:
+            if block is not None:
+                _destroy(block)
+
+
+def attach(name: str) -> shared_memory.SharedMemory:
+    """Open an existing arena block from a worker process.
+
+    Pool workers share the recorder's resource tracker, so attaching does not
+    transfer ownership: the recorder still unlinks the block in `close()`.
+    """
+    return shared_memory.SharedMemory(name=name)
+
+
+def _destroy(block: shared_memory.SharedMemory) -> None:
+    try:
+        block.close()
+    except Exception:
+        pass
+    try:
+        block.unlink()
+    except Exception:
+        pass
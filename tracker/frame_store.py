@@ -0,0 +1,144 @@
+"""Refcounted frames shared by pending events.
+
+An event used to carry a private copy of its screenshot bytes from the moment
+it was created until it was saved, so during fast input (a typing burst, a
+scroll, a drag) memory grew with the number of buffered events even though most
+of them point at the same captured frame. `FrameStore` keeps one copy per
+distinct frame (identified by the RecentScreen capture sequence number) and
+hands out `FrameHandle`s; the copy is dropped when the last handle is released,
+i.e. when the last event using it is saved or discarded (or, in "idle" spool
+mode, once the frame has left the idle queue, see idle.py). Memory is thus
+bounded by the number of distinct frames referenced by pending events and
+queued frames.
+
+Metrics (logged per session by the Recorder): high-water mark of bytes and
+frames held, and of the bytes the same events would have pinned with one copy
+each.
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+from typing import Dict, List, Optional
+
+
+class FrameHandle:
+    """Reference to a frame held by a FrameStore; `release()` when done with it."""
+
+    __slots__ = ("_store", "_key", "seq", "size", "tile_hashes", "nbytes", "captured_ns")
+
+    def __init__(self, store: "FrameStore", key: int, seq: int, size, tile_hashes, nbytes: int,
+                 captured_ns: int = 0):
+        self._store = store
+        self._key = key
+        self.seq = seq
+        self.size = size
+        self.tile_hashes = tile_hashes
+        self.nbytes = nbytes
+        self.captured_ns = captured_ns
+
+    @property
+    def bits(self) -> bytes:
+        """The frame's BGRA pixels (immutable, so they stay valid after `release()`
+        for whoever already holds them)."""
+        if self._store is None:
+            raise ValueError("frame handle already released")
+        return self._store._bits(self._key)
+
+    @property
+    def released(self) -> bool:
+        return self._store is None
+
+    def share(self) -> "FrameHandle":
+        """Another reference to the same frame, released on its own."""
+        if self._store is None:
+            raise ValueError("frame handle already released")
+        return self._store._share(self)
+
+    def release(self) -> None:
+        """Drop the reference; idempotent."""
+        store, self._store = self._store, None
+        if store is not None:
+            store._release(self._key, self.nbytes)
+
+    def __del__(self):
+        # Safety net for events dropped without being saved or discarded.
+        try:
+            self.release()
+        except Exception:
+            pass
+
+
+class FrameStore:
+    """Distinct frames referenced by pending events, keyed by capture sequence number."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[int, List] = {}  # key -> [bits, refcount]
+        self._anonymous = itertools.count(-1, -1)  # keys for frames without a seq
+
+        self.bytes_held = 0
+        self.event_bytes = 0  # what the live handles would hold with a copy each
+        self.peak_bytes = 0
+        self.peak_frames = 0
+        self.peak_event_bytes = 0
+        self.handles = 0
+        self.copies = 0
+
+    def acquire_at(self, recent_screen, ts: float) -> Optional[FrameHandle]:
+        """Handle to the frame `recent_screen` had just before `ts`, or None if
+        nothing was captured yet. The pixels are only copied out of the capture
+        ring the first time a frame is referenced."""
+        with self._lock:
+            frame = recent_screen.get_frame_at(ts, known=self._entries)
+            if frame is None:
+                return None
+            key = frame.seq if frame.seq >= 0 else next(self._anonymous)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [frame.bits, 0]
+                self.copies += 1
+                self.bytes_held += len(frame.bits)
+                self.peak_bytes = max(self.peak_bytes, self.bytes_held)
+                self.peak_frames = max(self.peak_frames, len(self._entries))
+            entry[1] += 1
+            nbytes = len(entry[0])
+            self.handles += 1
+            self.event_bytes += nbytes
+            self.peak_event_bytes = max(self.peak_event_bytes, self.event_bytes)
+            return FrameHandle(self, key, frame.seq, frame.size, frame.tile_hashes, nbytes, frame.captured_ns)
+
+    def _share(self, handle: FrameHandle) -> FrameHandle:
+        with self._lock:
+            self._entries[handle._key][1] += 1
+            self.handles += 1
+            self.event_bytes += handle.nbytes
+            self.peak_event_bytes = max(self.peak_event_bytes, self.event_bytes)
+        return FrameHandle(self, handle._key, handle.seq, handle.size, handle.tile_hashes, handle.nbytes,
+                           handle.captured_ns)
+
+    def _bits(self, key: int) -> bytes:
+        with self._lock:
+            return self._entries[key][0]
+
+    def _release(self, key: int, nbytes: int) -> None:
+        with self._lock:
+            self.event_bytes -= nbytes
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._entries[key]
+                self.bytes_held -= len(entry[0])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def summary(self) -> str:
+        mb = 1024 * 1024
+        return (f"{self.handles} handles on {self.copies} frames, "
+                f"peak {self.peak_bytes / mb:.1f} MB in {self.peak_frames} frames "
+                f"(one copy per event: {self.peak_event_bytes / mb:.1f} MB), "
+                f"held now {self.bytes_held / mb:.1f} MB")
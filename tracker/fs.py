@@ -13,6 +13,8 @@ def ensure_folder(folder_path):
 
 def hide_folder(folder_path):
     # Set folder attribute to hidden
+    if os.name != "nt":
+        return  # the hidden attribute only exists on Windows
     FILE_ATTRIBUTE_HIDDEN = 0x02
     ctypes.windll.kernel32.SetFileAttributesW(folder_path, FILE_ATTRIBUTE_HIDDEN)
 
@@ -0,0 +1,181 @@
+"""Hotkey chord matcher.
+
+The keyboard monitor used to compare the stack of held keys against a list of
+two-key combinations on every key press, and recognized Ctrl+<key> separately
+from the control character the key produced. `ChordMatcher` compiles the
+chords into a prefix trie over normalized key names, so chords of any length
+(Ctrl+Shift+Esc, Win+Shift+S) are matched with O(chord length) work per key
+event, whatever the number of chords.
+
+A chord is matched in canonical order: its modifiers first (in MODIFIERS
+order), then the other keys in the order they were pressed. Modifiers may thus
+be pressed in any order, but the chord only fires on the press of its last key.
+Keys still held from typing when the first modifier goes down are ignored.
+`pending()` tells whether the keys held so far may still complete a chord, so the
+monitor can hold back the modifier presses instead of recording them.
+WILDCARD stands for any single character key (Ctrl+<char> covers Ctrl+C, Ctrl+V,
+...).
+
+Chords are loaded from HOTKEYS_FILE (JSON, next to the executable or in the
+working directory):
+
+    {"hotkeys": [{"keys": ["alt", "tab"], "description": "..."},
+                 {"keys": ["Ctrl", "<char>"], "description": "..."}]}
+
+Key names are matched case-insensitively; a recorded hotkey shows the names as
+written in the file, with WILDCARD replaced by the upper-cased key.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from log import get_logger
+
+HOTKEYS_FILE = "hotkeys.json"
+WILDCARD = "<char>"
+MODIFIERS = ("ctrl", "cmd", "alt", "shift")  # canonical order of the modifiers in a chord
+ALIASES = {
+    "control": "ctrl", "win": "cmd", "windows": "cmd", "super": "cmd", "meta": "cmd",
+    "option": "alt", "escape": "esc", "del": "delete", "return": "enter",
+}
+
+# Used when HOTKEYS_FILE is missing; the shipped file has the same chords.
+DEFAULT_HOTKEYS = [
+    ["alt", "tab"], ["alt", "f4"], ["cmd", "d"], ["cmd", "e"], ["cmd", "l"], ["cmd", "r"], ["cmd", "t"],
+    ["cmd", "x"], ["cmd", "space"], ["cmd", "i"], ["cmd", "a"], ["cmd", "s"], ["cmd", "u"], ["cmd", "p"],
+    ["cmd", "v"], ["cmd", "tab"], ["shift", "delete"], ["Ctrl", WILDCARD],
+]
+
+_END = None  # trie key of a chord's display names
+_RANK = {name: rank for rank, name in enumerate(MODIFIERS)}
+
+
+@lru_cache(maxsize=1024)
+def normalize(name: str) -> str:
+    """Normalized key name: lower case, aliases resolved, control characters
+    (a character key pressed with Ctrl) mapped back to their key."""
+    if len(name) == 1 and ord(name) <= 31:
+        name = chr(ord("@") + ord(name))
+    name = name.lower()
+    return ALIASES.get(name, name)
+
+
+def _canonical(names: Sequence[str]) -> List[str]:
+    modifiers = sorted((n for n in names if n in _RANK), key=_RANK.__getitem__)
+    return modifiers + [n for n in names if n not in _RANK]
+
+
+class ChordMatcher:
+    """Prefix trie of chords plus the keys currently held."""
+
+    def __init__(self, chords: Iterable[Sequence[str]] = ()):
+        self._root: Dict = {}
+        self._held: List[str] = []  # normalized names, in press order
+        self.chords = 0
+        for chord in chords:
+            self.add(chord)
+
+    def add(self, keys: Sequence[str]) -> None:
+        """Add a chord; `keys` are key names as they should appear in the recorded hotkey."""
+        names = [n if n == WILDCARD else normalize(n) for n in keys]
+        if len(names) < 2 or not any(n in _RANK for n in names):
+            raise ValueError(f"a hotkey needs at least two keys, one of them a modifier: {list(keys)}")
+        node = self._root
+        for name in _canonical(names):
+            node = node.setdefault(name, {})
+        if _END not in node:
+            self.chords += 1
+        node[_END] = tuple(keys)
+
+    def press(self, name: str) -> Optional[Tuple[str, ...]]:
+        """A key went down; returns the chord it completes (display names) or None."""
+        if not name:
+            return None  # key without a name (e.g. a KeyCode with only a virtual key code)
+        name = normalize(name)
+        if name in self._held:
+            return None  # auto-repeat
+        self._held.append(name)
+        if len(self._held) < 2:
+            return None  # plain typing: every chord has two keys or more
+        path = self._path()
+        if len(path) < 2 or path[-1] != name:
+            return None  # a modifier pressed after the chord's other keys
+        node, wildcard = self._walk(path)
+        display = node.get(_END) if node is not None else None
+        if display is None:
+            return None
+        if wildcard is not None:
+            display = tuple(wildcard.upper() if k == WILDCARD else k for k in display)
+        return display
+
+    def pending(self) -> bool:
+        """Whether the keys held so far start a chord that a further key press may complete."""
+        if not self._held:
+            return False
+        node, _ = self._walk(self._path())
+        return node is not None and any(key is not _END for key in node)
+
+    def _path(self) -> List[str]:
+        # Keys still held from typing before the chord's first modifier are not part of it.
+        first = next((i for i, held in enumerate(self._held) if held in _RANK), len(self._held) - 1)
+        return _canonical(self._held[first:])
+
+    def _walk(self, path: Sequence[str]) -> Tuple[Optional[Dict], Optional[str]]:
+        """Trie node reached by `path` (None if no chord starts so), and the character
+        matched by WILDCARD on the way."""
+        node = self._root
+        wildcard = None
+        for key in path:
+            child = node.get(key)
+            if child is None and len(key) == 1 and key.isprintable():
+                child = node.get(WILDCARD)
+                wildcard = key
+            if child is None:
+                return None, None
+            node = child
+        return node, wildcard
+
+    def release(self, name: str) -> None:
+        if not name:
+            return
+        name = normalize(name)
+        if name in self._held:
+            self._held.remove(name)
+
+    def reset(self) -> None:
+        self._held.clear()
+
+    @property
+    def held(self) -> Tuple[str, ...]:
+        return tuple(self._held)
+
+
+def _config_paths(filename: str) -> List[str]:
+    paths = [os.path.abspath(filename)]
+    if getattr(sys, "frozen", False):
+        paths.append(os.path.join(os.path.dirname(sys.executable), filename))
+    paths.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), filename))
+    return paths
+
+
+def load_hotkeys(path: Optional[str] = None) -> ChordMatcher:
+    """ChordMatcher for the chords in `path` (default: HOTKEYS_FILE, else DEFAULT_HOTKEYS)."""
+    logger = get_logger("input")
+    for candidate in [path] if path else _config_paths(HOTKEYS_FILE):
+        if not os.path.exists(candidate):
+            continue
+        try:
+            with open(candidate, "r", encoding="utf-8") as f:
+                config = json.load(f)
+            matcher = ChordMatcher(entry["keys"] for entry in config["hotkeys"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error("invalid hotkey file %s (%r), using the default hotkeys", candidate, e)
+            break
+        logger.info("loaded %d hotkeys from %s", matcher.chords, candidate)
+        return matcher
+    return ChordMatcher(DEFAULT_HOTKEYS)
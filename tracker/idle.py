@@ -0,0 +1,181 @@
+"""Idle-time encoding scheduler.
+
+With SPOOL_MODE = "idle" (recorder.py) screenshots are not handed to the encoder
+as events are saved: their frames queue up in an IdleQueue and an IdleEncoder
+thread submits them once input has been idle for IDLE_SECONDS, so encoding does
+not compete with the user's foreground work. A frame that has been queued for
+MAX_STALENESS seconds is submitted even while input continues, which bounds the
+queue and the work left for `Recorder.wait()`. The encoder workers run at
+lowered priority either way (ENCODER_PRIORITY, encoder.py).
+
+The queue holds FrameHandles (frame_store.py), so a queued frame costs no copy
+and no disk write. Past `limit` queued frames (the encoder backlog limit),
+further frames are spilled raw to the session's spool (spool.py).
+
+During idle windows at most `depth` frames are in flight at a time, so input
+that resumes after an idle window does not find a long queue in the pool.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from collections import deque
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+from backlog import EncoderBacklog
+from frame_store import FrameHandle
+from log import get_logger
+from spool import FrameSpool
+
+IDLE_SECONDS = 0.5  # input-idle time before queued frames are encoded
+MAX_STALENESS = 5.0  # queued frames older than this are encoded regardless of input
+IDLE_TICK = 0.05
+
+
+class IdleQueue:
+    """Frames waiting for encoding, oldest first: up to `limit` in memory, then spilled
+    to `spool` (thread-safe, like the spool).
+
+    Once a frame has been spilled, later frames go to the spool too until it is
+    drained, so the frames in memory are always older than the spooled ones.
+    """
+
+    def __init__(self, spool: FrameSpool, limit: int):
+        self.spool = spool
+        self.limit = max(1, int(limit))
+        self._lock = threading.Lock()
+        self._frames: deque = deque()  # (FrameHandle, size, meta, time.monotonic() when queued)
+
+        self.queued = 0
+        self.max_queued = 0
+        self.spilled = 0
+
+    def append(self, frame: Optional[FrameHandle], data: bytes, size: Tuple[int, int], meta: Any = None) -> None:
+        """Queue a frame; `frame` is shared (the caller keeps its own handle), or
+        `data` spooled when there is no handle or no room."""
+        with self._lock:
+            self.queued += 1
+            if frame is not None and not len(self.spool) and len(self._frames) < self.limit:
+                self._frames.append((frame.share(), size, meta, time.monotonic()))
+                self.max_queued = max(self.max_queued, len(self._frames))
+                return
+            self.spilled += 1
+        self.spool.append(data, size, meta)
+
+    def __len__(self) -> int:
+        return len(self._frames) + len(self.spool)
+
+    def oldest_age(self) -> Optional[float]:
+        """Seconds the oldest queued frame has been waiting, None if none is."""
+        with self._lock:
+            if self._frames:
+                return time.monotonic() - self._frames[0][3]
+        return self.spool.oldest_age()
+
+    def pop(self) -> Optional[Tuple[bytes, Tuple[int, int], Any]]:
+        """Remove the oldest queued frame and return (data, size, meta), or None."""
+        with self._lock:
+            if self._frames:
+                frame, size, meta, _ = self._frames.popleft()
+                data = frame.bits  # immutable: stays valid once the handle is released
+                frame.release()
+                return data, size, meta
+        return self.spool.pop()
+
+    def drain(self) -> Iterator[Tuple[bytes, Tuple[int, int], Any]]:
+        """Yield (data, size, meta) for every queued frame, oldest first, and forget them."""
+        while True:
+            frame = self.pop()
+            if frame is None:
+                return
+            yield frame
+
+    def clear(self) -> None:
+        """Release the frames held in memory (the spool is closed by its owner)."""
+        with self._lock:
+            for frame, _, _, _ in self._frames:
+                frame.release()
+            self._frames.clear()
+
+    def summary(self) -> str:
+        return (f"{self.queued} frames queued (max {self.max_queued} in memory), "
+                f"{self.spilled} spilled to the spool")
+
+
+class IdleEncoder:
+    """Feeds queued frames to the encoder during input-idle windows, on its own thread.
+
+    `submit(data, size, meta)` hands one frame to the encoder; it must admit the
+    frame to `backlog`, whose depth tells whether the encoder is still busy.
+    """
+
+    def __init__(self, queue: IdleQueue, submit: Callable[[bytes, Tuple[int, int], Any], None],
+                 backlog: EncoderBacklog, depth: int = 1, idle_seconds: float = IDLE_SECONDS,
+                 max_staleness: float = MAX_STALENESS, tick: float = IDLE_TICK):
+        self.queue = queue
+        self.submit = submit
+        self.backlog = backlog
+        self.depth = max(1, depth)
+        self.idle_seconds = idle_seconds
+        self.max_staleness = max_staleness
+        self.tick = tick
+        self._logger = get_logger("recorder")
+        self._last_input = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="IdleEncoder", daemon=True)
+
+        self.encoded: Counter = Counter()  # frames submitted, by trigger ("idle" / "stale")
+        self.idle_time = 0.0  # seconds of input-idle time seen during the session
+        self.busy_idle_time = 0.0  # ... of which the encoder had this session's frames in flight
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def notify_input(self) -> None:
+        """Called on every raw input (from listener callbacks: only stores a timestamp)."""
+        self._last_input = time.monotonic()
+
+    def stop(self) -> None:
+        """Stop submitting; frames still queued stay in the queue."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _idle(self) -> bool:
+        return time.monotonic() - self._last_input >= self.idle_seconds
+
+    def _run(self) -> None:
+        last, last_busy = time.monotonic(), self.backlog.busy_seconds()
+        while not self._stop.wait(self.tick):
+            now, busy = time.monotonic(), self.backlog.busy_seconds()
+            if self._idle():
+                self.idle_time += now - last
+                self.busy_idle_time += min(busy - last_busy, now - last)
+            last, last_busy = now, busy
+
+            while not self._stop.is_set():
+                age = self.queue.oldest_age()
+                if age is None:
+                    break
+                if age >= self.max_staleness:
+                    trigger = "stale"
+                elif self._idle() and self.backlog.in_flight < self.depth:
+                    trigger = "idle"
+                else:
+                    break
+                frame = self.queue.pop()
+                if frame is None:
+                    break
+                try:
+                    self.submit(*frame)
+                except Exception:
+                    self._logger.exception("idle encoder failed to submit a frame")
+                self.encoded[trigger] += 1
+
+    def summary(self) -> str:
+        utilization = self.busy_idle_time / self.idle_time if self.idle_time else 0.0
+        return (f"{self.encoded['idle']} frames encoded while idle, {self.encoded['stale']} past the "
+                f"{self.max_staleness:.0f} s staleness bound; encoder busy {self.busy_idle_time:.1f} s of "
+                f"{self.idle_time:.1f} s idle ({utilization:.0%} idle utilization)")
@@ -0,0 +1,173 @@
+"""Screenshot codecs.
+
+`save_screenshot` used to write every frame as a PNG with PIL's defaults (zlib
+level 6), which is both slow and large for screen content. A codec names the
+file format and the encoder settings:
+
+    png            PNG, zlib level 6 (PIL default)
+    png-fast       PNG, zlib level 1
+    png-small      PNG, optimize=True (level 9, slowest, smallest PNG)
+    webp-lossless  lossless WebP
+    webp           WebP, quality 90
+    jpeg           JPEG, quality 92, no chroma subsampling
+    qoi            QOI ("Quite OK Image"), a fast lossless format; encoded here
+                   with numpy (PIL only reads it)
+
+Each codec has a `fast` variant in the same file format, used when the encoder
+falls behind (see backlog.py). The screenshot's file extension comes from its
+codec, so readers must take the format from the path recorded in the event.
+"""
+
+from __future__ import annotations
+
+import io
+import struct
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Union
+
+import numpy as np
+from PIL import Image
+
+SCREENSHOT_CODEC = "png"
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    format: str  # PIL format name, or "QOI" for encode_qoi
+    ext: str
+    lossless: bool
+    fast: str  # codec name of the fast variant (same format)
+    options: Dict = field(default_factory=dict)  # PIL save options
+
+
+CODECS: Dict[str, Codec] = {codec.name: codec for codec in (
+    Codec("png", "PNG", ".png", True, "png-fast"),
+    Codec("png-fast", "PNG", ".png", True, "png-fast", {"compress_level": 1}),
+    Codec("png-small", "PNG", ".png", True, "png-fast", {"optimize": True}),
+    Codec("webp-lossless", "WEBP", ".webp", True, "webp-lossless-fast", {"lossless": True, "quality": 50, "method": 3}),
+    Codec("webp-lossless-fast", "WEBP", ".webp", True, "webp-lossless-fast",
+          {"lossless": True, "quality": 0, "method": 0}),
+    Codec("webp", "WEBP", ".webp", False, "webp-fast", {"quality": 90, "method": 4}),
+    Codec("webp-fast", "WEBP", ".webp", False, "webp-fast", {"quality": 80, "method": 0}),
+    Codec("jpeg", "JPEG", ".jpg", False, "jpeg", {"quality": 92, "subsampling": 0}),
+    Codec("qoi", "QOI", ".qoi", True, "qoi"),
+)}
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"unknown screenshot codec {name!r}, expected one of {sorted(CODECS)}") from None
+
+
+def save_image(image: Image.Image, target: Union[str, BinaryIO], codec: Codec) -> None:
+    """Encode `image` with `codec` into a file path or a binary file object."""
+    if codec.format == "QOI":
+        _write(encode_qoi(np.asarray(image.convert("RGB"))), target)
+        return
+    image.save(target, format=codec.format, **codec.options)
+
+
+def save_raw(raw, size, target: Union[str, BinaryIO], codec: Codec) -> None:
+    """Encode a raw BGRX frame (as captured, any buffer) with `codec`."""
+    w, h = size
+    if codec.format == "QOI":
+        pixels = np.frombuffer(raw, dtype=np.uint8, count=w * h * 4).reshape(h, w, 4)
+        _write(encode_qoi(pixels, "BGRX"), target)
+        return
+    save_image(Image.frombuffer("RGB", (w, h), raw, "raw", "BGRX", 0, 1), target, codec)
+
+
+def _write(data: bytes, target: Union[str, BinaryIO]) -> None:
+    if isinstance(target, str):
+        with open(target, "wb") as f:
+            f.write(data)
+    else:
+        target.write(data)
+
+
+def encode(image: Image.Image, codec: Codec) -> bytes:
+    out = io.BytesIO()
+    save_image(image, out, codec)
+    return out.getvalue()
+
+
+def decode(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+_QOI_HEADER = struct.Struct(">4sIIBB")  # magic, width, height, channels, colorspace
+_QOI_END = b"\x00" * 7 + b"\x01"
+_QOI_MAX_RUN = 62
+
+
+def encode_qoi(pixels: np.ndarray, channel_order: str = "RGB") -> bytes:
+    """Encode an (h, w, 3) RGB or (h, w, 4) BGRX/BGRA uint8 array as an RGB QOI image.
+
+    The encoder is vectorized: it emits QOI_OP_RUN, QOI_OP_DIFF, QOI_OP_LUMA and
+    QOI_OP_RGB but never QOI_OP_INDEX (whose hash table is inherently
+    sequential), which any QOI decoder accepts. Screen content is dominated by
+    runs and small differences, so little is lost by skipping the index.
+    """
+    h, w, channels = pixels.shape
+    n = h * w
+    if channel_order == "BGRX":
+        # Raw capture layout: compare whole pixels as uint32, ignoring the 4th byte.
+        key = np.ascontiguousarray(pixels, dtype=np.uint8).reshape(-1).view(np.uint32) & 0x00FFFFFF
+        px = pixels.reshape(-1, channels)[:, 2::-1]
+    else:
+        px = np.ascontiguousarray(pixels, dtype=np.uint8).reshape(-1, channels)
+        key = px[:, 0].astype(np.uint32) | (px[:, 1].astype(np.uint32) << 8) | (px[:, 2].astype(np.uint32) << 16)
+    same = np.empty(n, dtype=bool)
+    same[0] = key[0] == 0  # the decoder starts from (0, 0, 0, 255)
+    np.equal(key[1:], key[:-1], out=same[1:])
+
+    # Runs of pixels equal to their predecessor, split into chunks of at most 62.
+    edges = np.diff(same.view(np.int8), prepend=0, append=0)
+    run_starts = np.flatnonzero(edges == 1)
+    run_lengths = np.flatnonzero(edges == -1) - run_starts
+    chunks = -(-run_lengths // _QOI_MAX_RUN)
+    group = np.repeat(np.arange(len(run_starts)), chunks)
+    k = np.arange(int(chunks.sum())) - np.repeat(np.cumsum(chunks) - chunks, chunks)
+    run_pos = run_starts[group] + _QOI_MAX_RUN * k
+    run_len = np.minimum(_QOI_MAX_RUN, run_lengths[group] - _QOI_MAX_RUN * k)
+
+    # Every other pixel: the smallest of DIFF (1 byte), LUMA (2) and RGB (4).
+    idx = np.flatnonzero(~same)
+    cur = px[idx].astype(np.int16)
+    prev = np.zeros_like(cur)
+    has_prev = idx > 0
+    prev[has_prev] = px[idx[has_prev] - 1]
+    d = ((cur - prev + 128) & 0xFF) - 128
+    dr, dg, db = d[:, 0], d[:, 1], d[:, 2]
+    dr_dg, db_dg = dr - dg, db - dg
+    is_diff = ((d >= -2) & (d <= 1)).all(axis=1)
+    is_luma = ~is_diff & (dg >= -32) & (dg <= 31) & (dr_dg >= -8) & (dr_dg <= 7) & (db_dg >= -8) & (db_dg <= 7)
+    is_rgb = ~(is_diff | is_luma)
+
+    # Byte offset of every op, in pixel order.
+    pos = np.concatenate((run_pos, idx))
+    length = np.concatenate((np.ones(len(run_pos), dtype=np.int64), np.where(is_diff, 1, np.where(is_luma, 2, 4))))
+    order = np.argsort(pos, kind="stable")
+    offsets = np.empty(len(pos), dtype=np.int64)
+    offsets[order] = np.cumsum(length[order]) - length[order]
+    run_off, px_off = offsets[:len(run_pos)], offsets[len(run_pos):]
+    body = np.zeros(int(length.sum()), dtype=np.uint8)
+
+    body[run_off] = 0xC0 | (run_len - 1)
+    o = px_off[is_diff]
+    body[o] = 0x40 | ((dr[is_diff] + 2) << 4) | ((dg[is_diff] + 2) << 2) | (db[is_diff] + 2)
+    o = px_off[is_luma]
+    body[o] = 0x80 | (dg[is_luma] + 32)
+    body[o + 1] = ((dr_dg[is_luma] + 8) << 4) | (db_dg[is_luma] + 8)
+    o = px_off[is_rgb]
+    body[o] = 0xFE
+    rgb_px = cur[is_rgb]
+    for c in range(3):
+        body[o + 1 + c] = rgb_px[:, c]
+
+    return _QOI_HEADER.pack(b"qoif", w, h, 3, 0) + body.tobytes() + _QOI_END
@@ -0,0 +1,134 @@
+"""Hand-off of raw input from listener callbacks to a consumer thread.
+
+pynput callbacks run on the OS low-level hook thread, and Windows silently drops
+hooks that take too long to return; running the typing/scroll/hotkey state
+machine, screenshot lookups and JSONL writes there loses actions during fast
+input. Callbacks therefore only timestamp the raw event and put it on a
+`queue.SimpleQueue` (lock-free on the producer side); `InputQueue` runs the
+handlers in arrival order on one consumer thread, which also receives the timer
+ticks from the scheduler so that all monitor state is touched by one thread.
+
+Each event is also stamped with `time.perf_counter_ns()` when it is posted (the
+monotonic input time recorded in the events as `input_ns`).
+
+Metrics, logged when the queue stops: events handled, maximum queue depth,
+maximum listener callback duration, maximum queueing lag and handler time.
+Setting `latencies` to a list also collects the per-event latency (enqueue to
+handler done, in ms), e.g. for the replay benchmark.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+from log import get_logger
+
+_STOP = object()
+_FLUSH = object()
+
+
+class InputQueue:
+    """Single consumer for input events posted from listener and timer threads."""
+
+    def __init__(self, before_dispatch: Optional[Callable[[Optional[float], Optional[int]], None]] = None,
+                 name: str = "InputConsumer"):
+        """`before_dispatch(ts, input_ns)` is called on the consumer thread before each
+        handler with the event's input time and monotonic post time (and with None,
+        None after it)."""
+        self.before_dispatch = before_dispatch
+        self._logger = get_logger("input")
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._stopped = False
+
+        self.handled = 0
+        self.max_depth = 0
+        self.max_callback_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.max_handler_ms = 0.0
+        self.latencies: Optional[List[float]] = None
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def post(self, handler: Callable, *args, ts: Optional[float] = None) -> None:
+        """Queue `handler(*args)` for the consumer thread; `ts` (input time) defaults to now."""
+        if self._stopped:
+            return
+        self._queue.put((handler, args, time.time() if ts is None else ts, time.perf_counter_ns()))
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def poster(self, handler: Callable) -> Callable:
+        """A callable that posts `handler` (for scheduler callbacks)."""
+        return lambda *args: self.post(handler, *args)
+
+    def timed(self, callback: Callable) -> Callable:
+        """Wrap a listener callback to track the longest time it blocks the hook thread."""
+
+        def wrapper(*args):
+            started = time.perf_counter()
+            try:
+                return callback(*args)
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000.0
+                if elapsed_ms > self.max_callback_ms:
+                    self.max_callback_ms = elapsed_ms
+
+        return wrapper
+
+    def flush(self) -> None:
+        """Block until everything queued so far has been handled."""
+        if self._stopped or threading.current_thread() is self._thread:
+            return
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        done.wait()
+
+    def stop(self) -> None:
+        """Handle everything queued so far, then stop the consumer thread."""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._queue.put(_STOP)
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+        self._logger.info("input queue: %s", self.summary())
+
+    def summary(self) -> str:
+        return (f"{self.handled} events, max depth {self.max_depth}, "
+                f"max callback {self.max_callback_ms:.2f} ms, max lag {self.max_lag_ms:.1f} ms, "
+                f"max handler {self.max_handler_ms:.1f} ms")
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if item[0] is _FLUSH:
+                item[1].set()
+                continue
+            handler, args, ts, queued_ns = item
+            started = time.perf_counter_ns()
+            lag_ms = (started - queued_ns) / 1e6
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+            try:
+                if self.before_dispatch is not None:
+                    self.before_dispatch(ts, queued_ns)
+                handler(*args)
+            except Exception:
+                self._logger.exception("input handler %s failed", getattr(handler, "__name__", handler))
+            finally:
+                if self.before_dispatch is not None:
+                    self.before_dispatch(None, None)
+            self.handled += 1
+            done = time.perf_counter_ns()
+            handler_ms = (done - started) / 1e6
+            if handler_ms > self.max_handler_ms:
+                self.max_handler_ms = handler_ms
+            if self.latencies is not None:
+                self.latencies.append((done - queued_ns) / 1e6)
@@ -0,0 +1,119 @@
+"""Input sources for the monitor.
+
+The monitor reads keyboard/mouse input through an input source:
+
+- `PynputSource`: the live OS hooks (pynput listeners), used by the tracker.
+- `replay.ReplaySource`: a recorded or generated event stream, used to exercise
+  the monitor headless (see replay.py).
+
+A source provides `keyboard_listener(on_press, on_release)` and
+`mouse_listener(on_click, on_scroll, on_move)` (objects with `start()`/`stop()`
+calling the callbacks with pynput's arguments), `capslock_state()` and
+`clock()`, the time.time()-like timestamp of the input being delivered.
+
+`Key`, `KeyCode` and `Button` are pynput's types. pynput cannot be imported without
+a desktop session (e.g. Linux without an X server), so a minimal stand-in with the
+same member names is used there; live listeners are unavailable in that case.
+"""
+
+from __future__ import annotations
+
+import enum
+import time
+
+try:
+    from pynput import keyboard as _keyboard
+    from pynput import mouse as _mouse
+
+    Key = _keyboard.Key
+    KeyCode = _keyboard.KeyCode
+    Button = _mouse.Button
+    HAVE_PYNPUT = True
+except Exception:  # no desktop session: stand-in key model for replay
+    _keyboard = _mouse = None
+    HAVE_PYNPUT = False
+
+    _KEY_NAMES = (
+        "alt alt_l alt_r alt_gr backspace caps_lock cmd cmd_r ctrl ctrl_l ctrl_r delete down end enter esc "
+        + " ".join(f"f{i}" for i in range(1, 25))
+        + " home left page_down page_up right shift shift_r space tab up media_play_pause media_volume_mute "
+          "media_volume_down media_volume_up media_previous media_next insert menu num_lock pause "
+          "print_screen scroll_lock"
+    ).split()
+    _members = [(name, i) for i, name in enumerate(_KEY_NAMES)]
+    # Same aliases as pynput's Windows backend.
+    _members += [("shift_l", _KEY_NAMES.index("shift")), ("cmd_l", _KEY_NAMES.index("cmd"))]
+    Key = enum.Enum("Key", _members)
+
+    class KeyCode:
+        """A character or virtual key, compared like pynput's KeyCode."""
+
+        def __init__(self, vk=None, char=None, is_dead=False, **kwargs):
+            self.vk = vk
+            self.char = char
+            self.is_dead = is_dead
+
+        @classmethod
+        def from_vk(cls, vk, **kwargs):
+            return cls(vk=vk, **kwargs)
+
+        @classmethod
+        def from_char(cls, char, **kwargs):
+            return cls(char=char, **kwargs)
+
+        def __repr__(self):
+            if self.char is not None:
+                return repr(self.char)
+            return f"<{self.vk}>"
+
+        def __eq__(self, other):
+            if not isinstance(other, KeyCode):
+                return False
+            if self.char is not None and other.char is not None:
+                return self.char == other.char and self.is_dead == other.is_dead
+            return self.vk == other.vk
+
+        def __hash__(self):
+            return hash(repr(self))
+
+    Button = enum.Enum("Button", "unknown left middle right x1 x2")
+
+
+def parse_key(spec: str):
+    """Key from its text form: "Key.shift", a single character, or "<vk>"."""
+    if spec.startswith("Key."):
+        return Key[spec[4:]]
+    if len(spec) > 2 and spec.startswith("<") and spec.endswith(">"):
+        return KeyCode.from_vk(int(spec[1:-1]))
+    return KeyCode.from_char(spec)
+
+
+def key_spec(key) -> str:
+    """Inverse of `parse_key`."""
+    if isinstance(key, Key):
+        return f"Key.{key.name}"
+    if key.char is not None:
+        return key.char
+    return f"<{key.vk}>"
+
+
+class PynputSource:
+    """Live keyboard and mouse input from the OS hooks."""
+
+    def keyboard_listener(self, on_press, on_release):
+        if not HAVE_PYNPUT:
+            raise RuntimeError("pynput is unavailable: no desktop session")
+        return _keyboard.Listener(on_press=on_press, on_release=on_release)
+
+    def mouse_listener(self, on_click, on_scroll, on_move):
+        if not HAVE_PYNPUT:
+            raise RuntimeError("pynput is unavailable: no desktop session")
+        return _mouse.Listener(on_click=on_click, on_scroll=on_scroll, on_move=on_move)
+
+    def capslock_state(self) -> int:
+        from utils import get_capslock_state
+
+        return get_capslock_state()
+
+    def clock(self) -> float:
+        return time.time()
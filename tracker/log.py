@@ -0,0 +1,34 @@
+"""Shared diagnostics logger.
+
+All tracker modules log below the "pc_tracker" logger, which writes to a small
+rotating `pc_tracker.log` in the working directory (or $PC_TRACKER_LOG).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+
+
+def get_logger(name: str = "") -> logging.Logger:
+    """Return "pc_tracker.<name>", configuring the shared file handler on first use."""
+    root = logging.getLogger("pc_tracker")
+    if not root.handlers:
+        root.setLevel(logging.INFO)
+
+        # Try to log to a file in the working directory.
+        # If it fails (e.g., permissions), fall back to stderr.
+        try:
+            from logging.handlers import RotatingFileHandler
+
+            log_path = os.environ.get("PC_TRACKER_LOG", os.path.join(os.getcwd(), "pc_tracker.log"))
+            handler = RotatingFileHandler(log_path, maxBytes=2_000_000, backupCount=3, encoding="utf-8")
+        except Exception:
+            handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
+        root.addHandler(handler)
+
+        # Avoid double logging via root
+        root.propagate = False
+
+    return root.getChild(name) if name else root
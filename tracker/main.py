@@ -5,6 +5,9 @@ import tkinter as tk
 import tkinter.font as tkFont
 import tkinter.ttk as ttk
 from tkinter import messagebox  # Import messagebox
+from storage import OK
+
+STORAGE_STATUS_MS = 2000  # refresh interval of the storage footer
 
 
 class TrackerApp:
@@ -35,6 +38,12 @@ class TrackerApp:
             wraplength=400, bg="#f0f0f0", fg="#555555")
         self.title_label.pack(pady=(20, 40))
 
+        # Footer: disk usage of the recordings and projected time until full (storage.py)
+        self.storage_label = tk.Label(
+            root, text="", font=("Arial", 11), bg="#f0f0f0", fg="#777777")
+        self.storage_label.pack(side="bottom", anchor="sw", padx=30, pady=(0, 10))
+        self.update_storage_status()
+
         # Intercept close button click event
         self.root.protocol("WM_DELETE_WINDOW", self.quit_app)
 
@@ -42,7 +51,7 @@ class TrackerApp:
         self.initial_interface()
 
     def quit_app(self):
-        self.tracker.stop()
+        self.tracker.close()
         self.tracker.update_tasks()
         self.root.destroy()
 
@@ -221,9 +230,15 @@ class TrackerApp:
 
     def clear_interface(self):
         for widget in self.root.winfo_children():
-            if widget != self.title_label:
+            if widget not in (self.title_label, self.storage_label):
                 widget.destroy()
 
+    def update_storage_status(self):
+        state = self.tracker.storage.state()
+        self.storage_label.config(text=self.tracker.storage.status(),
+                                  fg="#777777" if state == OK else "#cc0000")
+        self.root.after(STORAGE_STATUS_MS, self.update_storage_status)
+
     """
     Given Task Mode Functions
     """
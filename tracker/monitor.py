@@ -1,37 +1,27 @@
-import threading
 import time
 from enum import Enum
-from pynput import keyboard, mouse
-from pynput.keyboard import Key
+from element_cache import ElementCache
+from element_resolver import ElementResolver, PendingElement
+from hotkeys import MODIFIERS, load_hotkeys
+from ingest import InputQueue
+from inputs import Button, Key, KeyCode, PynputSource
+from log import get_logger
 from recorder import Recorder
+from scheduler import Scheduler
+from trajectory import MOUSE_TRAJECTORY, TrajectoryBuffer
 from utils import *
 
 WAIT_INTERVAL = 1800  # 30min per wait
 DOUBLE_CLICK_INTERVAL = 0.5  # 0.5s for double click
+# a pause this long ends a scroll action; None = only the next action does (a gesture stays one event)
+SCROLL_FLUSH_INTERVAL = None
 
-HOT_KEY = [
-    ["alt", "tab"],  # Switch between running program windows
-    ["alt", "f4"],  # Close current window or program
-    ["cmd", 'd'],  # Show desktop
-    ["cmd", 'e'],  # Open file explorer
-    ["cmd", 'l'],  # Lock computer
-    ["cmd", 'r'],  # Open run dialog
-    ["cmd", 't'],  # Cycle through taskbar programs
-    ["cmd", 'x'],  # Open advanced user menu (Start button right-click menu)
-    ["cmd", "space"],  # Switch input method
-    ["cmd", 'i'],  # Open Windows settings
-    ["cmd", 'a'],  # Open action center
-    ["cmd", 's'],  # Open search
-    ["cmd", 'u'],  # Open accessibility settings
-    ["cmd", 'p'],  # Open projection settings
-    ["cmd", 'v'],  # Open clipboard history
-    ["cmd", "tab"],  # Open task view
-    ["shift", "delete"]  # Permanently delete selected items (bypass recycle bin)
-]
-
-
-def switch_caption(char):
-    if char.isalpha() and get_capslock_state() == 1:  # Caps lock is on
+
+def switch_caption(char, capslock=None):
+    # capslock: state read when the key arrived (the key is handled later on the consumer thread)
+    if capslock is None:
+        capslock = get_capslock_state()
+    if char.isalpha() and capslock == 1:  # Caps lock is on
         if char.islower():
             return char.upper()
         else:
@@ -72,26 +62,44 @@ class Action:
         if self.action_type == ActionType.KEY_DOWN:
             str += f" {self.kwargs['key']}"
         if self.action_type == ActionType.HOTKEY:
-            str += f" ({self.kwargs['key1']}, {self.kwargs['key2']})"
+            str += f" ({', '.join(self.kwargs['keys'])})"
         if self.action_type == ActionType.TYPE:
             str += f": {self.kwargs['text']}"
         return str
 
     def get_element(self):
         ele = self.kwargs.get('name')
+        if isinstance(ele, PendingElement):
+            ele = ele.name  # waits for the resolver, at most until the click's deadline
         return ele if ele != "" else "Unknown"
 
 
 class Monitor:
-    def __init__(self, task):
-        self.recorder = Recorder(task)
+    def __init__(self, task, input_source=None, capture=None, directory="events",
+                 element_lookup=get_element_info_at_position, window_probe=get_foreground_window, encoder=None,
+                 trajectory=MOUSE_TRAJECTORY, quota=None):
+        # input_source / capture / element_lookup / window_probe are replaced by the replay harness (replay.py)
+        # encoder: the tracker's shared EncoderService (encoder.py); None = one for this session only
+        # trajectory: attach the simplified pointer path to click and drag events (see trajectory.py)
+        # quota: the tracker's StorageManager (storage.py); None = no quota
+        self.input_source = input_source if input_source is not None else PynputSource()
+        self.recorder = Recorder(task, directory=directory, capture=capture, encoder=encoder, quota=quota)
+        # Listener callbacks only enqueue; all state below is handled on the consumer thread
+        self.ingest = InputQueue(self.recorder.set_input_time)
+        self.input_stopped = False
         self.type_buffer = TypeBuffer(self.recorder)  # How many keyboard operations have been executed consecutively
-        self.timer = Timer(self.recorder, self.type_buffer)
-        self.scroll_buffer = ScrollBuffer(self.recorder)
+        self.scheduler = Scheduler()  # one thread for all debounce timers
+        self.timer = Timer(self.recorder, self.type_buffer, self.scheduler, self.ingest)
+        self.scroll_buffer = ScrollBuffer(self.recorder, self.scheduler, self.ingest)
+        self.chord_buffer = ChordBuffer(self.recorder)  # modifier presses that may start a hotkey
+        self.element_cache = ElementCache(window_probe, self.recorder.recent_screen.get_hashes_at)
+        self.element_resolver = ElementResolver(element_lookup, cache=self.element_cache)
         self.keyboard_monitor = KeyboardMonitor(
-            self.recorder, self.type_buffer, self.timer, self.scroll_buffer)
+            self.recorder, self.type_buffer, self.timer, self.scroll_buffer, self.chord_buffer, self.ingest,
+            self.input_source)
         self.mouse_monitor = MouseMonitor(
-            self.recorder, self.type_buffer, self.timer, self.scroll_buffer)
+            self.recorder, self.type_buffer, self.timer, self.scroll_buffer, self.chord_buffer,
+            self.element_resolver, self.ingest, self.input_source, TrajectoryBuffer() if trajectory else None)
 
     def start(self):
         self.keyboard_monitor.start()
@@ -99,14 +107,26 @@ class Monitor:
         self.type_buffer.reset()
         self.timer.reset()
 
-    def stop_without_md(self):
+    def stop_input(self):
+        # Stop listening, then handle everything already queued
+        if self.input_stopped:
+            return
+        self.input_stopped = True
         self.keyboard_monitor.stop()
         self.mouse_monitor.stop()
+        self.scheduler.stop()
+        self.ingest.stop()
+
+    def stop_without_md(self):
+        self.stop_input()
         self.timer.stop()
         # Flush any pending buffered actions before final save.
+        self.chord_buffer.reset()
         self.scroll_buffer.reset()
         self.type_buffer.reset()
+        self.mouse_monitor.reset()
         self.recorder.wait()
+        self.element_resolver.stop()
 
     def generate_md(self, task=None):
         self.recorder.generate_md(task)
@@ -116,14 +136,17 @@ class Monitor:
         self.generate_md()
 
     def finish(self):
+        self.stop_input()  # queued input comes before the final action
         self.recorder.record_action(Action(ActionType.FINISH))
         self.stop()
 
     def finish_without_md(self):
+        self.stop_input()
         self.recorder.record_action(Action(ActionType.FINISH))
         self.stop_without_md()
 
     def fail(self):
+        self.stop_input()
         self.recorder.record_action(Action(ActionType.FAIL))
         self.stop()
 
@@ -132,22 +155,18 @@ class Monitor:
 
 
 class Timer:
-    def __init__(self, recorder: Recorder, type_buffer):
-        self.timer_inner = None
+    def __init__(self, recorder: Recorder, type_buffer, scheduler: Scheduler, ingest: InputQueue):
         self.recorder = recorder
         self.type_buffer = type_buffer
+        self.timer_inner = scheduler.schedule(None, ingest.poster(self.save_wait))  # fires on the consumer thread
         self.reset()
 
     def reset(self):
-        if self.timer_inner:
-            self.timer_inner.cancel()
-        self.timer_inner = threading.Timer(
-            WAIT_INTERVAL, self.save_wait)  # Start timing, execute save_wait after interval seconds
-        self.timer_inner.start()
+        # Start timing, execute save_wait after interval seconds (moves the deadline, no new thread)
+        self.timer_inner.reschedule(WAIT_INTERVAL)
 
     def stop(self):
-        if self.timer_inner:
-            self.timer_inner.cancel()
+        self.timer_inner.cancel()
 
     def save_wait(self):
         if not self.type_buffer.last_action_is_typing:
@@ -155,21 +174,6 @@ class Timer:
         self.reset()
 
 
-class HotKeyBuffer:
-    def __init__(self):
-        self.buffer = []
-
-    def add(self, key):
-        self.buffer.append(key)
-
-    def pop(self):
-        if len(self.buffer) > 0:
-            self.buffer.pop()
-
-    def reset(self):
-        self.buffer.clear()
-
-
 class TypeBuffer:
     def __init__(self, recorder: Recorder):
         self.recorder = recorder
@@ -182,6 +186,8 @@ class TypeBuffer:
         self.events_buffer = []  # Buffer keyboard events before confirming typing
 
     def pre_save_type_event(self):
+        if self.pre_saved_type_event is not None:
+            self.recorder.release_event(self.pre_saved_type_event)
         self.pre_saved_type_event = self.recorder.get_event()
 
     def reset(self):
@@ -192,13 +198,19 @@ class TypeBuffer:
             type_action = Action(ActionType.TYPE, text=self.text)
             self.pre_saved_type_event['action'] = type_action
             self.recorder.record_event(self.pre_saved_type_event)
+            self.pre_saved_type_event = None
         elif not self.is_typing:
             # self.recorder.save_all()
             # Record all previous operations that were cached
             for event in self.events_buffer:
                 self.recorder.record_event(event)
+            self.events_buffer.clear()
 
-        # reset type buffer
+        # reset type buffer (dropping events that were not recorded)
+        if self.pre_saved_type_event is not None:
+            self.recorder.release_event(self.pre_saved_type_event)
+        for event in self.events_buffer:
+            self.recorder.release_event(event)
         self.text = ""
         self.is_typing = False
         self.last_action_is_typing = False
@@ -218,6 +230,8 @@ class TypeBuffer:
         # The typing operation is about to be added
         if len(self.text) >= 2 and not self.is_typing:
             self.is_typing = True  # Enter typing state
+            for event in self.events_buffer:
+                self.recorder.release_event(event)
             self.events_buffer.clear()  # The previous recorded keyboard operations will be merged into TYPE, no need to record separately
 
     def backspace(self):
@@ -253,25 +267,45 @@ class TypeBuffer:
 
 
 class ScrollBuffer:
-    def __init__(self, recorder: Recorder):
+    def __init__(self, recorder: Recorder, scheduler: Scheduler, ingest: InputQueue):
         self.recorder = recorder
         self.dx = 0
         self.dy = 0
         self.pre_saved_scroll_event = None
         # self.empty = self.pre_saved_scroll_event is None
+        self.last_scroll_time = None
+        self.flush_timer = scheduler.schedule(None, ingest.poster(self.reset))  # fires on the consumer thread
 
     def is_empty(self):
         return self.pre_saved_scroll_event is None
 
     def reset(self):
+        self.flush_timer.cancel()
         if not self.is_empty() and (self.dx != 0 or self.dy != 0):
             scroll_action = Action(ActionType.SCROLL, dx=self.dx, dy=self.dy)
             self.pre_saved_scroll_event['action'] = scroll_action
             self.recorder.record_event(self.pre_saved_scroll_event)
+        elif not self.is_empty():
+            self.recorder.release_event(self.pre_saved_scroll_event)
         self.dx = 0
         self.dy = 0
         self.pre_saved_scroll_event = None
 
+    def scroll(self, dx, dy, ts):
+        # Coalesce consecutive scroll steps; flushed by the next action (or after a pause,
+        # if SCROLL_FLUSH_INTERVAL is set). The pause is also checked on input timestamps,
+        # so replays at any speed coalesce alike.
+        if SCROLL_FLUSH_INTERVAL is not None and self.last_scroll_time is not None \
+                and ts - self.last_scroll_time >= SCROLL_FLUSH_INTERVAL:
+            self.reset()
+        self.last_scroll_time = ts
+        if self.is_empty():
+            self.new(dx, dy)
+        else:
+            self.add_delta(dx, dy)
+        if SCROLL_FLUSH_INTERVAL is not None:
+            self.flush_timer.reschedule(SCROLL_FLUSH_INTERVAL)
+
     def new(self, dx, dy):
         self.dx = dx
         self.dy = dy
@@ -282,15 +316,56 @@ class ScrollBuffer:
         self.dy += dy
 
 
+class ChordBuffer:
+    """Modifier presses held back while the keys held may still become a hotkey chord.
+
+    With one event in the recorder's buffer, only the last key press could be
+    replaced by the hotkey: the first modifiers of Ctrl+Shift+Esc were saved as
+    key presses of their own. Held-back presses keep their observation; the
+    hotkey takes the first one's, or they are all recorded if no chord completes.
+    """
+
+    def __init__(self, recorder: Recorder):
+        self.recorder = recorder
+        self.events = []
+
+    def hold(self, action):
+        self.events.append(self.recorder.get_event(action))
+
+    def take(self, action):
+        # The chord completed: the first held-back event becomes the hotkey, the others are dropped
+        if not self.events:
+            return None
+        event = self.events.pop(0)
+        event['action'] = action
+        for other in self.events:
+            self.recorder.release_event(other)
+        self.events.clear()
+        return event
+
+    def reset(self):
+        # No chord can complete any more: record the held-back key presses
+        for event in self.events:
+            self.recorder.record_event(event)
+        self.events.clear()
+
+    def is_empty(self):
+        return len(self.events) == 0
+
+
 class KeyboardMonitor:
-    def __init__(self, recorder: Recorder, type_buffer: TypeBuffer, timer: Timer, scroll_buffer: ScrollBuffer):
+    def __init__(self, recorder: Recorder, type_buffer: TypeBuffer, timer: Timer, scroll_buffer: ScrollBuffer,
+                 chord_buffer: ChordBuffer, ingest: InputQueue, input_source: PynputSource):
         self.recorder = recorder
-        self.listener = keyboard.Listener(
-            on_press=self.on_press, on_release=self.on_release)
+        self.ingest = ingest
+        self.input_source = input_source
+        self.listener = input_source.keyboard_listener(
+            on_press=ingest.timed(self.on_press), on_release=ingest.timed(self.on_release))
         self.type_buffer = type_buffer
         self.timer = timer
         self.scroll_buffer = scroll_buffer
-        self.hotkey_buffer = HotKeyBuffer()
+        self.chord_buffer = chord_buffer
+        self.hotkeys = load_hotkeys()  # chord matcher, see hotkeys.py
 
         #Yuantsy Modified
         self.currently_pressed_keys = set()
@@ -302,7 +377,15 @@ class KeyboardMonitor:
     def stop(self):
         self.listener.stop()
 
+    # Listener callbacks run on the OS hook thread: only timestamp and enqueue (see ingest.py)
     def on_press(self, key: Key):
+        self.recorder.notify_input()
+        self.ingest.post(self.handle_press, key, self.input_source.capslock_state(), ts=self.input_source.clock())
+
+    def on_release(self, key: Key):
+        self.ingest.post(self.handle_release, key, ts=self.input_source.clock())
+
+    def handle_press(self, key: Key, capslock):
         try:
             #Yuantsy Modification
             # if key is already in pressed set, ignore repeated press
@@ -329,11 +412,14 @@ class KeyboardMonitor:
             else:
                 self.type_buffer.reset_last_action_is_shift()
 
-            record_hotkey = False
-            # Determine hotkey operation
-            self.hotkey_buffer.add(get_key_str(key))
-            if self.hotkey_buffer.buffer in HOT_KEY:
-                record_hotkey = True  # Should be recorded as a hotkey operation
+            # Determine hotkey operation (the chord completed by this key, if any)
+            chord = self.hotkeys.press(get_key_str(key))
+            record_hotkey = chord is not None  # Should be recorded as a hotkey operation
+            chord_keys = self.hotkeys.held[:-1]  # the keys held before this one
+            # A modifier that may still start a chord is held back instead of recorded
+            hold = not record_hotkey and get_key_str(key) in MODIFIERS and self.hotkeys.pending()
+            if not record_hotkey and not hold:
+                self.chord_buffer.reset()  # no chord: the held-back modifiers were plain key presses
 
             # Handle record operation
             if not is_related_to_type(key):  # Keys that cannot appear in typing scenarios
@@ -341,35 +427,17 @@ class KeyboardMonitor:
                 if self.type_buffer.last_action_is_shift:
                     shift_action = Action(ActionType.KEY_DOWN, key="shift")
                     self.recorder.record_action(shift_action)
-                hotkey_2 = get_ctrl_hotkey(key)
-                if hotkey_2 is not None:
-                    last_action = self.recorder.get_last_action()
-                    if last_action is not None and last_action.action_type == ActionType.KEY_DOWN and (
-                            last_action.kwargs['key'] == 'ctrl_l' or last_action.kwargs['key'] == 'ctrl_r'):
-                        ctrl_hotkey_action = Action(
-                            ActionType.HOTKEY, key1='Ctrl', key2=hotkey_2)
-                        self.recorder.change_last_action(ctrl_hotkey_action)
-                    else:
-                        ctrl_hotkey_action = Action(
-                            ActionType.HOTKEY, key1='Ctrl', key2=hotkey_2)
-                        self.recorder.record_action(ctrl_hotkey_action)
-                elif not record_hotkey:
-                    key_name = get_key_str(key)
-                    key_press_action = Action(
-                        ActionType.KEY_DOWN, key=key_name)
-                    self.recorder.record_action(key_press_action)
+                if not record_hotkey:
+                    self.record_key_press(key, hold)
             elif not record_hotkey:  # Keys that may appear in typing scenarios
                 if self.type_buffer.is_empty():  # Only characters can be the first element of the buffer
                     if hasattr(key, 'char'):
-                        switched_char = switch_caption(key.char)
+                        switched_char = switch_caption(key.char, capslock)
                         self.type_buffer.append(switched_char)
                         self.type_buffer.pre_save_type_event()  # Save observation when entering typing state
                     else:
                         # At this time, the buffer is empty, directly record special keys
-                        key_name = get_key_str(key)
-                        key_press_action = Action(
-                            ActionType.KEY_DOWN, key=key_name)
-                        self.recorder.record_action(key_press_action)
+                        self.record_key_press(key, hold)
                 else:
                     # Just throw into the buffer
                     if key == Key.backspace:
@@ -377,31 +445,42 @@ class KeyboardMonitor:
                     elif key == Key.space:
                         self.type_buffer.append(' ')
                     elif hasattr(key, 'char'):
-                        switched_char = switch_caption(key.char)
+                        switched_char = switch_caption(key.char, capslock)
                         self.type_buffer.append(switched_char)
 
             if record_hotkey:
+                # The chord's modifiers were held back: the hotkey takes the observation of the first one
+                hotkey_action = Action(ActionType.HOTKEY, keys=list(chord))
+                hotkey_event = self.chord_buffer.take(hotkey_action)
                 last_action = self.recorder.get_last_action()
-                if last_action.action_type == ActionType.KEY_DOWN and last_action.kwargs['key'] == \
-                        self.hotkey_buffer.buffer[0]:
-                    ctrl_hotkey_action = Action(
-                        ActionType.HOTKEY, key1=self.hotkey_buffer.buffer[0], key2=self.hotkey_buffer.buffer[1])
-                    self.recorder.change_last_action(ctrl_hotkey_action)
+                if hotkey_event is not None:
+                    self.recorder.record_event(hotkey_event)
+                elif last_action is not None and last_action.action_type == ActionType.KEY_DOWN and \
+                        last_action.kwargs['key'] in chord_keys:
+                    # a chord key recorded as a key press: replace it
+                    self.recorder.change_last_action(hotkey_action)
                 else:
-                    ctrl_hotkey_action = Action(
-                        ActionType.HOTKEY, key1=self.hotkey_buffer.buffer[0], key2=self.hotkey_buffer.buffer[1])
-                    self.recorder.record_action(ctrl_hotkey_action)
+                    self.recorder.record_action(hotkey_action)
         except AttributeError:
             print_debug("error!")
 
-    def on_release(self, key: Key):
+    def record_key_press(self, key: Key, hold: bool):
+        key_press_action = Action(ActionType.KEY_DOWN, key=get_key_str(key))
+        if hold:
+            self.chord_buffer.hold(key_press_action)
+        else:
+            self.recorder.record_action(key_press_action)
+
+    def handle_release(self, key: Key):
         #Yuantsy Modifcation Start
         #remove the key from currently pressed set. 
         if key in self.currently_pressed_keys:
             self.currently_pressed_keys.remove(key)
         #Yuantsy Modification End
 
-        self.hotkey_buffer.pop()
+        self.hotkeys.release(get_key_str(key))
+        if not self.chord_buffer.is_empty() and not self.hotkeys.pending():
+            self.chord_buffer.reset()  # the modifiers were released without completing a chord
 
 
 class LastClick:
@@ -409,115 +488,146 @@ class LastClick:
         self.x = 0
         self.y = 0
         self.time = 0
-        self.button = mouse.Button.left
+        self.button = Button.left
         self.element_name = ""
 
-    def update(self, x, y, button, element_name):
+    def update(self, x, y, button, element_name, ts=None):
         self.x = x
         self.y = y
-        self.time = time.time()
+        self.time = time.time() if ts is None else ts
         self.button = button
         self.element_name = element_name
 
 
 class MouseMonitor:
-    def __init__(self, recorder: Recorder, type_buffer: TypeBuffer, timer: Timer, scroll_buffer: ScrollBuffer):
+    def __init__(self, recorder: Recorder, type_buffer: TypeBuffer, timer: Timer, scroll_buffer: ScrollBuffer,
+                 chord_buffer: ChordBuffer, element_resolver: ElementResolver, ingest: InputQueue,
+                 input_source: PynputSource, trajectory: TrajectoryBuffer = None):
         self.recorder = recorder
-        self.listener = mouse.Listener(
-            on_click=self.on_click, on_scroll=self.on_scroll, on_move=self.on_move)
+        self.ingest = ingest
+        self.input_source = input_source
+        self.listener = input_source.mouse_listener(
+            on_click=ingest.timed(self.on_click), on_scroll=ingest.timed(self.on_scroll),
+            on_move=ingest.timed(self.on_move))
         self.type_buffer = type_buffer
         self.timer = timer
         self.scroll_buffer = scroll_buffer
+        self.chord_buffer = chord_buffer
+        self.element_resolver = element_resolver
         self.last_click = LastClick()
         self.pre_saved_drag_event = None
+        self.trajectory = trajectory  # fed and taken on the listener thread only
 
     def start(self):
         self.listener.start()
 
     def stop(self):
         self.listener.stop()
+        if self.trajectory is not None:
+            get_logger("input").info("mouse trajectory: %s", self.trajectory.summary())
 
+    def reset(self):
+        # drop the observation kept for a drag that did not happen
+        if self.pre_saved_drag_event is not None:
+            self.recorder.release_event(self.pre_saved_drag_event)
+            self.pre_saved_drag_event = None
+
+    # Listener callbacks run on the OS hook thread: only timestamp and enqueue (see ingest.py)
     def on_click(self, x, y, button, pressed):
+        self.recorder.notify_input()
+        # The path since the previous click: the approach to a press, the drag for a release
+        path = self.trajectory.take(x, y) if self.trajectory is not None else None
+        self.ingest.post(self.handle_click, x, y, button, pressed, path, ts=self.input_source.clock())
+
+    def on_move(self, x, y):
+        # print(f"Mouse moved to {(x, y)}")
+        # Pointer movement usually precedes a click: ramp up capture so the pre-click frame is fresh.
+        self.recorder.notify_input()
+        if self.trajectory is not None:
+            self.trajectory.add(x, y)
+
+    def on_scroll(self, x, y, dx, dy):
+        self.recorder.notify_input()
+        self.ingest.post(self.handle_scroll, x, y, dx, dy, ts=self.input_source.clock())
+
+    def handle_click(self, x, y, button, pressed, path=None):
+        now = self.recorder.input_time  # when the click arrived
         self.timer.reset()
         self.type_buffer.reset_last_action_is_typing()
         self.type_buffer.reset_last_action_is_shift()
         self.scroll_buffer.reset()
+        self.chord_buffer.reset()  # a modifier held for the click (Ctrl+click) is a key press
         if pressed:
             # Mouse click triggers information update
-            element = get_element_info_at_position(x, y)  # Get UI element info at mouse click position
+            # UI element info at the click position is looked up off this thread; the event
+            # keeps a pending handle that is resolved before the recorder saves it.
+            element = self.element_resolver.submit(x, y, now)
             self.type_buffer.reset()  # reset type buffer
             # Save observation when mouse is pressed, for possible drag operation
+            if self.pre_saved_drag_event is not None:
+                self.recorder.release_event(self.pre_saved_drag_event)
             self.pre_saved_drag_event = self.recorder.get_event()
 
-            delta_time = time.time() - self.last_click.time
+            delta_time = now - self.last_click.time
             if delta_time < DOUBLE_CLICK_INTERVAL and x == self.last_click.x and y == self.last_click.y:
                 # Double click
                 last_action = self.recorder.get_last_action()
                 if last_action is not None and last_action.action_type == ActionType.CLICK:
                     double_click_action = Action(
-                        ActionType.DOUBLE_CLICK, x=x, y=y, name=last_action.kwargs['name'])
+                        ActionType.DOUBLE_CLICK, x=x, y=y, name=last_action.kwargs['name'],
+                        trajectory=last_action.kwargs.get('trajectory'))
                     self.recorder.change_last_action(double_click_action)
             else:
                 # Click
-                if button == mouse.Button.left:
+                if button == Button.left:
                     click_action = Action(
-                        ActionType.CLICK, x=x, y=y, name=element['name'])
+                        ActionType.CLICK, x=x, y=y, name=element, trajectory=path)
                     self.recorder.record_action(
-                        click_action, element['coordinates'])
-                elif button == mouse.Button.right:
+                        click_action, element)
+                elif button == Button.right:
                     click_action = Action(
-                        ActionType.RIGHT_CLICK, x=x, y=y, name=element['name'])
+                        ActionType.RIGHT_CLICK, x=x, y=y, name=element, trajectory=path)
                     self.recorder.record_action(
-                        click_action, element['coordinates'])
+                        click_action, element)
                 else:
                     print_debug(f"Unknown button {button}")
 
-            self.last_click.update(x, y, button, element['name'])
+            self.last_click.update(x, y, button, element, now)
 
         else:  # released
             if x != self.last_click.x or y != self.last_click.y:  # Mouse dragged
                 last_action = self.recorder.get_last_action()
-                if last_action.action_type == ActionType.CLICK:  # Previous operation was a click operation
+                if last_action.action_type == ActionType.CLICK and self.pre_saved_drag_event is not None:  # Previous operation was a click operation
                     press_action = Action(ActionType.MOUSE_DOWN, x=self.last_click.x,
-                                          y=self.last_click.y, name=self.last_click.element_name)
+                                          y=self.last_click.y, name=self.last_click.element_name,
+                                          trajectory=last_action.kwargs.get('trajectory'))
                     self.recorder.change_last_action(
                         press_action)  # Modify the previous click operation to press operation
                     # Record drag operation
-                    drag_action = Action(ActionType.DRAG, x=x, y=y)
+                    drag_action = Action(ActionType.DRAG, x=x, y=y, trajectory=path)
                     self.pre_saved_drag_event['action'] = drag_action
                     self.recorder.record_event(self.pre_saved_drag_event)
+                    self.pre_saved_drag_event = None
             else:  # Normal click
                 pass
 
-    def on_move(self, x, y):
-        # print(f"Mouse moved to {(x, y)}")
-        pass
-
-    def on_scroll(self, x, y, dx, dy):
+    def handle_scroll(self, x, y, dx, dy):
         self.timer.stop()  # Close timer during scrolling to avoid recording wait operations during scrolling
         self.type_buffer.reset_last_action_is_typing()
         self.type_buffer.reset_last_action_is_shift()
         self.type_buffer.reset()
-        if self.scroll_buffer.is_empty():
-            self.scroll_buffer.new(dx, dy)
-        else:
-            self.scroll_buffer.add_delta(dx, dy)
+        self.chord_buffer.reset()
+        self.scroll_buffer.scroll(dx, dy, self.recorder.input_time)
 
 
 def is_related_to_type(key):
     if isinstance(key, Key):
         return key in [Key.shift, Key.space, Key.caps_lock, Key.backspace]
-    elif isinstance(key, keyboard.KeyCode):
+    elif isinstance(key, KeyCode):
         return key.char is not None and ord(key.char) > 31
     return False
 
 
-def get_ctrl_hotkey(key):
-    if isinstance(key, keyboard.KeyCode) and key.char is not None and ord(key.char) <= 31:
-        return chr(ord('@') + ord(key.char))
-    return None
-
-
 def get_key_str(key):
     if isinstance(key, Key):
         key_str = str(key)
@@ -530,5 +640,5 @@ def get_key_str(key):
         if "cmd" in key_str:
             return "cmd"
         return key_str[4:]
-    elif isinstance(key, keyboard.KeyCode):
+    elif isinstance(key, KeyCode):
         return key.char
@@ -26,6 +26,7 @@ else
 
 # 3. copy ./tasks.json and ./README.md to ./dist/
 Copy-Item -Path "./tasks.json" -Destination "./dist/" -Force
+Copy-Item -Path "./hotkeys.json" -Destination "./dist/" -Force
 Copy-Item -Path "./README.md" -Destination "./dist/" -Force
 
 # 4. copy ./task_cnt.json to ./dist/
@@ -4,49 +4,166 @@ Robustness improvements (2026-02-27):
 - Store screenshot size together with screenshot bytes to survive resolution changes.
 - Do not rely on a module-level `screen_size` inside multiprocessing workers.
 - Add defensive error handling around async screenshot saving.
+
+Shared-memory hand-off (2026-10):
+- Raw frames reach the encoder pool through a recycled shared-memory arena
+  (see frame_arena.py); workers receive only a slot name and size.
+
+Change detection (2026-10):
+- Events carry the frame's tile hash grid (`tile_hash`) and the bounding box of
+  tiles that changed since the previous saved event (`changed_tiles`, null when
+  identical). Identical frames reuse the previous screenshot file instead of
+  being encoded again (`screenshot_reused: true`).
+
+Session archive (2026-10):
+- With SCREENSHOT_STORAGE = "archive", encoded screenshots go into one append-only
+  `<prefix>_<timestamp>.frames` file per session (see archive.py) instead of one
+  PNG per event; events then refer to them as "<archive>::<name>".
+- With SCREENSHOT_STORAGE = "delta", the archive holds periodic PNG keyframes and,
+  in between, only the rectangles that changed since the previous frame
+  (see deltacodec.py). A frame whose encoding fails is stored as a plain PNG
+  keyframe, so the deltas after it keep their base.
+
+Shared frames (2026-10):
+- Pending events hold a refcounted handle into a per-session FrameStore (see
+  frame_store.py) instead of their own copy of the frame; it is released once the
+  event is saved or discarded. The store's memory high-water mark is logged when
+  the session ends.
+
+Encoder backlog (2026-10):
+- At most ENCODER_BACKLOG frames are in flight to the encoder pool; beyond that
+  BACKLOG_POLICY decides (block, downscale, fast compression or spool raw frames
+  until the session ends, see backlog.py). Degraded screenshots are marked with
+  `screenshot_degraded` in the event; the backlog depth is logged per session.
+
+Encoder service (2026-10):
+- Frames are encoded by an EncoderService (encoder.py) that the Tracker keeps
+  across sessions; `wait()` only waits for this session's frames. Without a
+  service the recorder starts and closes a private one. ENCODER_EXECUTOR selects
+  worker processes, threads, or inline encoding (see encoder.py).
+
+Screenshot codecs (2026-10):
+- SCREENSHOT_CODEC (imagecodec.py) selects the file format and encoder settings
+  (PNG levels, WebP, JPEG, QOI); the screenshot's extension follows the codec.
+  "delta" storage always uses PNG.
+
+Raw spool (2026-10):
+- With SPOOL_MODE = "finish", `save()` only appends the raw frame to the
+  session's spool (spool.py, optionally zlib/lz4 compressed) and every
+  screenshot is encoded after the session ends, in recording order. The spool
+  size, encode throughput and time until all screenshots are written are logged.
+
+Idle-time encoding (2026-10):
+- With SPOOL_MODE = "idle" (the default) frames wait in a queue and are
+  encoded during input-idle windows, or once they have waited MAX_STALENESS
+  seconds (see idle.py), by encoder workers running at lowered priority. Queued
+  frames are shared FrameHandles; only past the encoder backlog limit are they
+  spilled raw to the spool. The session summary logs the frames queued and
+  spilled, the encoding CPU time and how much of the idle time the encoder used.
+
+Event log (2026-10):
+- Events are appended to the JSONL file by a buffered EventWriter (eventlog.py)
+  that writes in batches off the input-handling thread; `wait()` flushes it.
+  `save_ms` keeps the time each `save()` took.
+
+Monotonic timestamps (2026-10):
+- Besides the one-second `timestamp` string, every event records
+  time.perf_counter_ns() stamps of its raw input (`input_ns`, when the listener
+  posted it), of its frame's capture (`frame_ns`, null without a frame) and of
+  its save (`save_ns`). They are comparable within a session only; see
+  event_timing.py for the per-session skew and latency report.
+
+Mouse trajectories (2026-10):
+- Click, press and drag events carry the pointer path since the previous click
+  (`trajectory`), simplified online on the listener thread and packed as
+  base64 int32 (x, y, ms) points, see trajectory.py.
+
+Session directories (2026-10):
+- Each session is recorded into its own directory under `.staging/`, which
+  `wait()` renames into place once every file is complete, after writing a
+  `manifest.json` with the session's counts, bytes and timings; `discard()`
+  removes it in one tree removal (see sessiondir.py). Screenshot paths in the
+  events are relative to the session directory.
+
+Storage quota (2026-10):
+- With a StorageManager (storage.py) the recorder reports the bytes it has written
+  after every event and asks for the storage state before every screenshot: when
+  storage is short, screenshots are encoded right away with the smaller
+  QUOTA_CODEC (`screenshot_degraded: "quota"`); with no headroom left, none is
+  written and the event keeps the previous screenshot (`screenshot_skipped: "quota"`).
 """
 
 from __future__ import annotations
 
+import io
 import json
-import multiprocessing
 import os
+import time
+from collections import Counter
 from datetime import datetime
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 from PIL import Image, ImageDraw
 
+from archive import ARCHIVE_EXT, FrameArchiveWriter, make_ref, split_ref
+from backlog import BACKLOG_POLICY, ENCODER_BACKLOG, NORMAL, EncoderBacklog
 from capturer import RecentScreen
-from fs import delete_file, ensure_folder, hide_folder
+from deltacodec import DeltaEncoder, encode_delta, encode_png
+from encoder import EncoderService
+from element_resolver import PendingElement
+from eventlog import EventWriter
+from frame_arena import FrameArena, attach
+from frame_store import FrameHandle, FrameStore
+from idle import IdleEncoder, IdleQueue
+from imagecodec import SCREENSHOT_CODEC, get_codec, save_image, save_raw
+from tilehash import changed_tiles, encode as encode_tile_hashes
+from fs import ensure_folder, hide_folder
+from log import get_logger
+from sessiondir import SessionDir, refresh_manifest, session_manifest
+from spool import SPOOL_COMPRESSION, SPOOL_EXT, FrameSpool
+from storage import DEGRADE, OK, PAUSE, QUOTA_CODEC, StorageManager
 from utils import get_current_time
 
-MARK_IMAGE = False
+MARK_IMAGE = False  # debugging aid, only meaningful with "files" storage
+# "files": one PNG per event in screenshot/; "archive": one file per session;
+# "delta": one file per session with keyframes + changed rectangles.
+SCREENSHOT_STORAGE = "files"
+# "process": spawn worker pool; "thread": thread pool, no IPC; "inline": encode on the calling thread.
+ENCODER_EXECUTOR = "process"
+# "off": encode while recording; "finish": spool raw frames, encode after the session (see spool.py);
+# "idle": spool raw frames, encode them when input is idle (see idle.py).
+SPOOL_MODE = "idle"
+SPOOL_MODES = ("off", "finish", "idle")
 
 
 class Recorder:
-    def __init__(self, task=None, buffer_len: int = 1, directory: str = "events"):
-        # Using a dedicated context improves Windows/pyinstaller reliability.
-        try:
-            ctx = multiprocessing.get_context("spawn")
-        except Exception:
-            ctx = multiprocessing
-
-        # maxtasksperchild helps avoid long-run worker memory growth (PIL, etc.).
-        self.pool = ctx.Pool(maxtasksperchild=200)
+    def __init__(self, task=None, buffer_len: int = 1, directory: str = "events",
+                 storage: str = SCREENSHOT_STORAGE, capture=None,
+                 backlog_policy: str = BACKLOG_POLICY, backlog_limit: int = ENCODER_BACKLOG,
+                 encoder: Optional[EncoderService] = None, executor: str = ENCODER_EXECUTOR,
+                 codec: str = SCREENSHOT_CODEC, spool_mode: str = SPOOL_MODE,
+                 spool_compression: str = SPOOL_COMPRESSION, quota: Optional[StorageManager] = None):
+        # encoder: shared EncoderService (see encoder.py), None = a private `executor` one for this session
+        self._own_encoder = encoder is None
+        self.encoder = encoder if encoder is not None else EncoderService(executor)
+        # quota: the tracker's StorageManager (storage.py), None = no quota
+        self.quota = quota
 
         self.task = task
         self.buffer_len = int(buffer_len)
-        self.directory = directory
-        self.screenshot_dir = os.path.join(directory, "screenshot")
+        self.directory = directory  # all sessions; this one gets a directory of its own (sessiondir.py)
 
         self.buffer = []  # [(event, rect)]
         self.saved_cnt = 0
+        self.input_time: Optional[float] = None  # time.time() of the input being handled, see set_input_time()
+        self.input_ns: Optional[int] = None  # its time.perf_counter_ns()
 
         self.timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.started = time.time()
 
         # Ensure directories exist
         ensure_folder(self.directory)
-        ensure_folder(self.screenshot_dir)
 
         # Hide directory
         hide_folder(self.directory)
@@ -58,24 +175,115 @@ class Recorder:
         else:
             prefix = "events"
 
-        self.event_filename = os.path.join(self.directory, f"{prefix}_{self.timestamp_str}.jsonl")
-        self.md_filename = os.path.join(self.directory, f"{prefix}_{self.timestamp_str}.md")
-
-        self.recent_screen = RecentScreen()
-        self.screenshot_f_list = []
-
-    def get_event(self, action=None) -> Dict[str, Any]:
-        timestamp = get_current_time()
-        screenshot, size = self.recent_screen.get(with_size=True)
+        # Staging directory until wait() moves it into place
+        self.session = SessionDir(self.directory, f"{prefix}_{self.timestamp_str}")
+        if storage == "files":
+            ensure_folder(self.screenshot_dir)
+        if self.quota is not None:
+            self.quota.begin(self.session.name)
+
+        self.pool = self.encoder.attach(self.session.name)
+        self.events = EventWriter(self.event_filename)
+        self.save_ms: List[float] = []  # duration of each save(), for benchmarks
+        self.counts: Counter = Counter()  # events saved, screenshots reused / degraded / skipped
+        self.screenshot_bytes = 0  # encoded so far (updated by the pool's result thread)
+
+        self.archive: Optional[FrameArchiveWriter] = None
+        self.delta: Optional[DeltaEncoder] = None
+        if storage in ("archive", "delta"):
+            self.archive = FrameArchiveWriter(self.session.file(ARCHIVE_EXT))
+        if storage == "delta":
+            self.delta = DeltaEncoder()
+        # Delta records and keyframes are PNG (see deltacodec.py).
+        self.codec = get_codec("png" if self.delta is not None else codec)
+
+        # Archive members are written in recording order, so a frame spooled until the
+        # end would hold back the rest; delta frames must keep the keyframe's size.
+        if backlog_policy == "spool" and self.archive is not None \
+                or backlog_policy == "downscale" and self.delta is not None:
+            backlog_policy = "fast"
+        self.backlog = EncoderBacklog(backlog_limit, backlog_policy)
+        if spool_mode not in SPOOL_MODES:
+            raise ValueError(f"unknown spool mode {spool_mode!r}, expected one of {SPOOL_MODES}")
+        self.spool_mode = spool_mode
+        self.spool = FrameSpool(self.session.file(SPOOL_EXT), spool_compression)
+        # frames waiting to be encoded: the spool, or in "idle" mode frames kept in memory
+        # up to the backlog limit and spilled to the spool past it (see idle.py)
+        self.queue = self.spool
+        self.idle: Optional[IdleEncoder] = None
+        if spool_mode == "idle":
+            self.queue = IdleQueue(self.spool, self.backlog.limit)
+            self.idle = IdleEncoder(self.queue, self._submit_spooled, self.backlog, depth=self.encoder.processes)
+            self.idle.start()
+
+        self.recent_screen = RecentScreen(capture=capture)  # capture: see RecentScreen, None = desktop
+        self.arena = FrameArena()
+        self.frames = FrameStore()  # frames referenced by pending events
+        self._logger = get_logger("recorder")
+
+        # Previous saved frame, for change detection / screenshot reuse.
+        self._last_hashes = None
+        self._last_size: Optional[Tuple[int, int]] = None
+        self._last_screenshot: Optional[str] = None
+
+    # Paths follow the session directory from staging into place (sessiondir.py).
+    @property
+    def event_filename(self) -> str:
+        return self.session.file(".jsonl")
+
+    @property
+    def md_filename(self) -> str:
+        return self.session.file(".md")
+
+    @property
+    def screenshot_dir(self) -> str:
+        return os.path.join(self.session.path, "screenshot")
+
+    def get_event(self, action=None, ts: Optional[float] = None) -> Dict[str, Any]:
+        """Build an event observed just before the input that arrived at `ts`.
+
+        `ts` defaults to the input time set by `set_input_time()`, or now.
+        """
+        if ts is None:
+            ts = self.input_time if self.input_time is not None else time.time()
+        timestamp = get_current_time(ts)
+        input_ns = self.input_ns if self.input_ns is not None else time.perf_counter_ns()
+        frame = self.frames.acquire_at(self.recent_screen, ts)
 
         event: Dict[str, Any] = {
             "timestamp": timestamp,
+            "input_ns": input_ns,
+            "frame_ns": (frame.captured_ns or None) if frame else None,
             "action": action,
-            "screenshot": screenshot,  # bytes until saved; later becomes filename
-            "screenshot_size": list(size),  # JSON-friendly; removed/kept as needed
+            "screenshot": frame,  # FrameHandle (or None) until saved; later becomes filename
+            "screenshot_size": list(frame.size) if frame else [0, 0],  # JSON-friendly; removed/kept as needed
+            "tile_hash": frame.tile_hashes if frame else None,  # ndarray until saved; later encoded
         }
         return event
 
+    @staticmethod
+    def release_event(event: Dict[str, Any]) -> None:
+        """Release the frame of an event that will not be saved."""
+        frame = event.get("screenshot")
+        if isinstance(frame, FrameHandle):
+            frame.release()
+
+    def set_input_time(self, ts: Optional[float], input_ns: Optional[int] = None) -> None:
+        """Set the time of the input event being handled (None when done), and its
+        time.perf_counter_ns() stamp.
+
+        The monitor handles input on a consumer thread some time after it arrived, so
+        events built meanwhile take their timestamp and screenshot from this time.
+        """
+        self.input_time = ts
+        self.input_ns = input_ns
+
+    def notify_input(self) -> None:
+        """Called on every raw input so screen capture can ramp up (and encoding waits)."""
+        self.recent_screen.notify_input()
+        if self.idle is not None:
+            self.idle.notify_input()
+
     def record_event(self, event: Dict[str, Any], rect=None) -> None:
         self.buffer.append((event, rect))
         if len(self.buffer) > self.buffer_len:
@@ -101,27 +309,74 @@ class Recorder:
             print("WARNING: No record to change in the buffer!")
 
     def save(self, event: Dict[str, Any], rect) -> None:
+        started = time.perf_counter()
         self.saved_cnt += 1
 
+        if isinstance(rect, PendingElement):
+            # Clicks carry their element asynchronously; wait (bounded) for its rect.
+            rect = rect.coordinates
+
         timestamp = event["timestamp"].replace(":", "").replace("-", "")
         action = event["action"]
 
-        screenshot_filename = os.path.join(self.screenshot_dir, f"{timestamp}_{self.saved_cnt}.png")
+        space = self.quota.state() if self.quota is not None else OK
+        if space == PAUSE and self._last_screenshot is None:
+            space = DEGRADE  # the session's first screenshot is kept
+        # Delta records must stay PNG (see deltacodec.py).
+        codec = get_codec(QUOTA_CODEC) if space != OK and self.delta is None else self.codec
+
+        # Relative to the session directory
+        screenshot_name = f"{timestamp}_{self.saved_cnt}{codec.ext}"
+        if self.archive is not None:
+            screenshot_filename = make_ref(os.path.basename(self.archive.path), screenshot_name)
+        else:
+            screenshot_filename = os.path.join("screenshot", screenshot_name)
 
         point = {"x": getattr(action, "kwargs", {}).get("x"), "y": getattr(action, "kwargs", {}).get("y")}
         if None in point.values():
             point = None
 
-        screenshot_bytes: bytes = event.get("screenshot") or b""
+        frame = event.get("screenshot")
+        screenshot_bytes: bytes = frame.bits if isinstance(frame, FrameHandle) else b""
         size_list = event.get("screenshot_size") or [0, 0]
         size: Tuple[int, int] = (int(size_list[0]), int(size_list[1]))
 
-        # Async save screenshot; fall back to sync on failures.
-        try:
-            self.pool.apply_async(save_screenshot, (screenshot_filename, screenshot_bytes, size, rect, point))
-        except Exception:
-            # Pool might be closed/terminated; do sync save.
-            save_screenshot(screenshot_filename, screenshot_bytes, size, rect, point)
+        hashes = event.get("tile_hash")
+        if hashes is not None and self._last_size == size:
+            changed = changed_tiles(self._last_hashes, hashes, size)
+        else:
+            changed = [0, 0, size[0], size[1]]
+
+        if changed is None and self._last_screenshot is not None and not MARK_IMAGE:
+            # Byte-identical screen (per tile hashes): point at the previous file, skip encoding.
+            screenshot_filename = self._last_screenshot
+            event["screenshot_reused"] = True
+            self.counts["reused"] += 1
+        elif space == PAUSE:
+            # No storage left: point at the previous file, which no longer matches the screen.
+            screenshot_filename = self._last_screenshot
+            event["screenshot_skipped"] = "quota"
+            self.counts["skipped"] += 1
+        else:
+            # Async save screenshot; fall back to sync on failures.
+            mode = self.submit_screenshot(screenshot_filename, screenshot_bytes, size, rect, point,
+                                          codec.name if space != OK else None,
+                                          frame if isinstance(frame, FrameHandle) else None)
+            if mode == NORMAL and codec is not self.codec:
+                mode = "quota"
+            if mode != NORMAL:
+                event["screenshot_degraded"] = mode
+                self.counts["degraded"] += 1
+
+        if space != PAUSE:
+            # (a skipped frame must not become the reference for change detection)
+            self._last_hashes = hashes
+            self._last_size = size
+            self._last_screenshot = screenshot_filename
+        # The encoder got its own reference to the (immutable) bytes.
+        self.release_event(event)
+        event["tile_hash"] = encode_tile_hashes(hashes) if hashes is not None else None
+        event["changed_tiles"] = changed
 
         # Write jsonl record (replace bytes with path)
         event["screenshot"] = screenshot_filename
@@ -131,18 +386,166 @@ class Recorder:
         except Exception:
             event["element"] = "Unknown"
         event["rect"] = rect
+        trajectory = getattr(action, "kwargs", {}).get("trajectory")
+        if trajectory is not None:
+            event["trajectory"] = trajectory.to_json(event["input_ns"])
+        event["save_ns"] = time.perf_counter_ns()
+
+        self.events.write(event)
+        self.counts["events"] += 1
+        if self.quota is not None:
+            self.quota.update(self.session.name, self.bytes_written())
+        self.save_ms.append((time.perf_counter() - started) * 1000.0)
+
+    def bytes_written(self) -> int:
+        """Bytes of the session's output so far (the manifest has the exact figure).
+
+        The raw spool is scratch space deleted when the session ends: it is not
+        counted against the quota (the volume's free space still reflects it).
+        """
+        return self.events.bytes_written + self.screenshot_bytes
+
+    def submit_screenshot(self, screenshot_filename: str, screenshot_bytes: bytes, size: Tuple[int, int],
+                          rect, point, codec: Optional[str] = None, frame: Optional[FrameHandle] = None) -> str:
+        """Hand a raw frame to the encoder, applying the backlog policy if it is behind.
+
+        `codec` replaces the recorder's codec while storage is short; such frames are
+        encoded now rather than queued. `frame` is the handle the bytes come from,
+        shared by the idle queue instead of copying them. Returns the policy applied
+        to the frame, or NORMAL.
+        """
+        if self.spool_mode != "off" and codec is None:
+            # Encoded at full quality later (idle.py / wait()); nothing to do for a missing frame.
+            if screenshot_bytes:
+                meta = (screenshot_filename, rect, point, self.codec.name)
+                if self.spool_mode == "idle":
+                    self.queue.append(frame, screenshot_bytes, size, meta)
+                else:
+                    self.spool.append(screenshot_bytes, size, meta)
+            return NORMAL
+        mode = self.backlog.admit()
+        if mode == "spool":
+            if codec is None:
+                self.spool.append(screenshot_bytes, size, (screenshot_filename, rect, point, self.codec.name))
+                return mode
+            mode = self.backlog.admit("block")
+        codec = codec or self.codec.name
+        if mode == "downscale" and screenshot_bytes:
+            screenshot_bytes, size, rect, point = downscale(screenshot_bytes, size, rect, point)
+        elif mode == "fast":
+            codec = get_codec(codec).fast
+        self._encode(screenshot_filename, screenshot_bytes, size, rect, point, codec)
+        return mode
+
+    def _submit_spooled(self, data: bytes, size: Tuple[int, int], meta) -> None:
+        """Hand a frame taken from the spool to the encoder, waiting for room if needed."""
+        filename, rect, point, codec = meta
+        self.backlog.admit("block")
+        self._encode(filename, data, size, rect, point, codec)
+
+    def _encode(self, screenshot_filename: str, screenshot_bytes: bytes, size: Tuple[int, int],
+                rect, point, codec: Optional[str] = None) -> None:
+        """Hand a raw frame to the encoder pool, via shared memory when a slot is free.
+
+        The frame must have been admitted to the backlog; it is marked done when the
+        encoder reports back. `codec` defaults to the recorder's codec.
+
+        In archive/delta mode `screenshot_filename` is an archive reference; workers then
+        return the encoded bytes and the result callback stores them in the archive
+        (in recording order, see FrameArchiveWriter.reserve).
+        """
+        codec = codec or self.codec.name
+        if self.archive is not None:
+            _, member = split_ref(screenshot_filename)
+            ticket = self.archive.reserve(member)
+            save_filename = None
+
+            def _store(data):
+                # Runs on the pool's result thread: never let an exception escape.
+                self.backlog.done()
+                if data is None and self.delta is not None and screenshot_bytes:
+                    data = self._fallback_keyframe(member, screenshot_bytes, size)
+                self.screenshot_bytes += len(data) if data else 0
+                try:
+                    self.archive.fill(ticket, data)
+                except Exception as e:
+                    print(f"Failed to archive screenshot {member}: {e}")
+                    if self.delta is not None:
+                        self.delta.restart()
+
+            if self.delta is not None and screenshot_bytes and size[0] > 0 and size[1] > 0:
+                plan = self.delta.plan(member, screenshot_bytes, size)
+                if not plan.keyframe:
+                    try:
+                        self.pool.apply_async(encode_delta, (plan.base, plan.rects),
+                                              callback=_store, error_callback=lambda _e: _store(None))
+                    except Exception:
+                        _store(encode_delta(plan.base, plan.rects))
+                    return
+        else:
+            save_filename = os.path.join(self.session.path, screenshot_filename)
 
-        with open(self.event_filename, "a", encoding="utf-8") as f:
-            json.dump(event, f, ensure_ascii=False)
-            f.write("\n")
+            def _store(written):
+                self.backlog.done()
+                self.screenshot_bytes += written or 0
 
-        self.screenshot_f_list.append(screenshot_filename)
+        slot = None
+        if not self.encoder.in_process:
+            try:
+                slot = self.arena.put(screenshot_bytes)
+            except Exception:
+                slot = None
+
+        if slot is None:
+            # Threads/inline, or arena exhausted or unavailable: pass the bytes directly
+            # (pickled for worker processes).
+            try:
+                self.pool.apply_async(save_screenshot,
+                                      (save_filename, screenshot_bytes, size, rect, point, codec),
+                                      callback=_store, error_callback=lambda _e: _store(None))
+            except Exception:
+                # Pool might be closed/terminated; do sync save.
+                _store(save_screenshot(save_filename, screenshot_bytes, size, rect, point, codec))
+            return
+
+        def _done(result):
+            self.arena.release(slot.index)
+            _store(result)
+
+        def _failed(_error):
+            self.arena.release(slot.index)
+            _store(None)
+
+        try:
+            self.pool.apply_async(
+                save_screenshot_shm,
+                (save_filename, slot.name, slot.nbytes, size, rect, point, codec),
+                callback=_done,
+                error_callback=_failed,
+            )
+        except Exception:
+            self.arena.release(slot.index)
+            _store(save_screenshot(save_filename, screenshot_bytes, size, rect, point, codec))
+
+    def _fallback_keyframe(self, member: str, screenshot_bytes: bytes, size: Tuple[int, int]) -> Optional[bytes]:
+        """Encode a delta session's frame whose encoding failed as a plain PNG keyframe.
+
+        The frames planned after it may name it as their base, so it must not be
+        dropped; if even this fails the delta encoder starts over with a keyframe.
+        """
+        try:
+            return encode_png(screenshot_bytes, size)
+        except Exception:
+            self._logger.exception("could not store screenshot %s as a keyframe either", member)
+            self.delta.restart()
+            return None
 
     def wait(self) -> None:
         # Save all buffered events
         for event, rect in self.buffer:
             self.save(event, rect)
         self.buffer.clear()
+        self.events.close()
 
         # Stop background screenshot refresh thread before shutdown.
         try:
@@ -150,17 +553,70 @@ class Recorder:
         except Exception:
             pass
 
-        # Close process pool
+        ended = time.perf_counter()
+        if self.idle is not None:
+            self.idle.stop()
+
+        # Frames still queued (spool modes, or spooled while the encoder was behind): encode them now.
+        if self.idle is not None:
+            self._logger.info("idle queue: %s", self.queue.summary())
+        if self.spool.frames:
+            self._logger.info("spool: %s", self.spool.summary())
+        if len(self.queue):
+            count, raw_bytes = len(self.queue), 0
+            for data, size, meta in self.queue.drain():
+                raw_bytes += len(data)
+                self._submit_spooled(data, size, meta)
+            self.backlog.wait_idle()
+            elapsed = max(time.perf_counter() - ended, 1e-9)
+            self._logger.info("encoded %d spooled frames in %.2f s after the session ended "
+                              "(%.1f frames/s, %.1f MB/s raw)", count, elapsed, count / elapsed,
+                              raw_bytes / (1024 * 1024) / elapsed)
+        self.spool.close()
+        if self.idle is not None:
+            self._logger.info("idle encoding: %s", self.idle.summary())
+
+        # Completion barrier: this session's frames are encoded (and archived).
+        self.pool.wait()
+        self.pool.detach()
+        flush_ms = (time.perf_counter() - ended) * 1000.0
+        self._logger.info("%d frames flushed %.0f ms after the session ended, encoding CPU time %.2f s",
+                          self.pool.submitted, flush_ms, self.pool.cpu_seconds)
+        if self._own_encoder:
+            self.encoder.close()
+
+        # No worker references the shared frames anymore.
+        self.arena.close()
+
+        if self.archive is not None:
+            self.archive.close()
+
+        self._logger.info("frame store: %s", self.frames.summary())
+        self._logger.info("encoder backlog: %s", self.backlog.summary())
+        self._logger.info("event log: %s", self.events.summary())
+
+        # All files are closed: move the complete session into place.
+        save_ms = sorted(self.save_ms)
+        manifest = session_manifest(
+            self.started,
+            counts={"events": self.counts["events"], "screenshots": self.pool.submitted,
+                    "screenshots_reused": self.counts["reused"], "screenshots_degraded": self.counts["degraded"],
+                    "screenshots_skipped": self.counts["skipped"], "spooled": self.spool.frames},
+            timings={"save_ms_p50": round(save_ms[len(save_ms) // 2], 3) if save_ms else None,
+                     "save_ms_max": round(save_ms[-1], 3) if save_ms else None,
+                     "flush_ms": round(flush_ms, 1), "encode_cpu_s": round(self.pool.cpu_seconds, 3)})
         try:
-            self.pool.close()
-            self.pool.join()
-        except Exception:
-            try:
-                self.pool.terminate()
-            except Exception:
-                pass
+            self.session.finalize(manifest)
+        except OSError:
+            self._logger.exception("could not finalize session %s, left in %s", self.session.name, self.session.path)
+        else:
+            self._logger.info("session saved to %s", self.session.path)
+        if self.quota is not None:
+            self.quota.finished(self.session.name, self.session.path)
+            self._logger.info("storage: %s", self.quota.status())
 
     def generate_md(self, task=None) -> None:
+        self.events.flush()
         if task is not None:
             self.task = task
 
@@ -190,9 +646,8 @@ class Recorder:
             event = json.loads(line.strip())
             timestamp = event.get("timestamp", "")
             action = event.get("action", "")
+            # relative to the session directory, where the md is
             screenshot_path = event.get("screenshot", "")
-            # remove the first directory so md can be moved around a bit easier
-            screenshot_path = "\\".join(screenshot_path.split("\\")[1:])
 
             markdown_content.append(f"### {timestamp}\n")
             markdown_content.append(f"**Input:** \n\n{prompt}\n\n")
@@ -201,22 +656,40 @@ class Recorder:
 
         with open(self.md_filename, "w", encoding="utf-8") as md_file:
             md_file.writelines(markdown_content)
+        if self.session.finalized:
+            refresh_manifest(self.session.path)
+            if self.quota is not None:
+                self.quota.finished(self.session.name, self.session.path)
 
     def discard(self) -> None:
-        delete_file(self.event_filename)
-        delete_file(self.md_filename)
-        for f in self.screenshot_f_list:
-            delete_file(f)
+        for event, _ in self.buffer:
+            self.release_event(event)
+        self.buffer.clear()
+        if self.idle is not None:
+            self.idle.stop()
+            self.queue.clear()
+        self.spool.close()
+        self.events.close(discard=True)
+        if self.archive is not None:
+            self.archive.close()
+        # One tree removal, however many screenshots the session has
+        self.session.discard()
+        if self.quota is not None:
+            self.quota.discarded(self.session.name)
 
 
 def save_screenshot(
-    save_filename: str,
+    save_filename: Optional[str],
     screenshot: bytes,
     size: Tuple[int, int],
     rect=None,
     point=None,
-) -> None:
-    """Decode raw BGRX bytes into a PNG.
+    codec: str = SCREENSHOT_CODEC,
+) -> Optional[bytes]:
+    """Encode raw BGRX bytes with `codec` (see imagecodec.py).
+
+    If `save_filename` is None the image is returned as bytes instead of written
+    (archive mode); otherwise returns the size of the file written (None on failure).
 
     Note: this function is called inside multiprocessing worker processes.
     Avoid relying on globals that may become stale (e.g., screen_size).
@@ -225,20 +698,78 @@ def save_screenshot(
     w, h = size
     if not screenshot or w <= 0 or h <= 0:
         # Nothing to save.
-        return
+        return None
 
     try:
-        image = Image.frombuffer("RGB", (w, h), screenshot, "raw", "BGRX", 0, 1)
+        image_codec = get_codec(codec)
+        target = io.BytesIO() if save_filename is None else save_filename
         if MARK_IMAGE:
+            image = Image.frombuffer("RGB", (w, h), screenshot, "raw", "BGRX", 0, 1)
             mark_image(image, rect, point)
-        image.save(save_filename)
+            save_image(image, target, image_codec)
+        else:
+            save_raw(screenshot, (w, h), target, image_codec)
+        if save_filename is None:
+            return target.getvalue()
+        return os.path.getsize(save_filename)
     except Exception as e:
         # Avoid crashing workers; optionally write a small marker file.
+        if save_filename is None:
+            print(f"Failed to encode screenshot: {e!r}")
+            return None
         try:
             with open(save_filename + ".error.txt", "w", encoding="utf-8") as f:
                 f.write(repr(e))
         except Exception:
             pass
+    return None
+
+
+def save_screenshot_shm(
+    save_filename: Optional[str],
+    shm_name: str,
+    nbytes: int,
+    size: Tuple[int, int],
+    rect=None,
+    point=None,
+    codec: str = SCREENSHOT_CODEC,
+) -> Optional[bytes]:
+    """Like `save_screenshot`, but read the raw frame from a shared-memory arena slot.
+
+    Runs in a worker process; the slot is released by the recorder once this returns.
+    """
+    try:
+        block = attach(shm_name)
+    except Exception as e:
+        if save_filename is None:
+            print(f"Failed to attach shared frame {shm_name}: {e!r}")
+            return None
+        try:
+            with open(save_filename + ".error.txt", "w", encoding="utf-8") as f:
+                f.write(repr(e))
+        except Exception:
+            pass
+        return None
+
+    view = block.buf[:nbytes]
+    try:
+        return save_screenshot(save_filename, view, size, rect, point, codec)
+    finally:
+        # All exports of the block must be released before it can be closed.
+        view.release()
+        block.close()
+
+
+def downscale(screenshot: bytes, size: Tuple[int, int], rect=None, point=None):
+    """Half-resolution copy of a raw BGRX frame, with the rect/point to mark on it."""
+    w, h = size
+    frame = np.frombuffer(screenshot, dtype=np.uint8, count=w * h * 4).reshape(h, w, 4)
+    half = np.ascontiguousarray(frame[::2, ::2])
+    if rect is not None:
+        rect = {k: v // 2 for k, v in rect.items()}
+    if point is not None:
+        point = {k: v // 2 for k, v in point.items()}
+    return half.tobytes(), (half.shape[1], half.shape[0]), rect, point
 
 
 def mark_image(image: Image.Image, rect, point) -> None:
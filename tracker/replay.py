@@ -0,0 +1,366 @@
+"""Replay harness: drive the Monitor from an input event stream, headless.
+
+Feeds a recorded or generated stream of key/mouse/scroll events into
+`monitor.Monitor` through the same listener callbacks pynput would call, with a
+synthetic screen instead of the desktop capture and a stand-in element lookup.
+The session is written like a live one (JSONL, screenshots, markdown), so the
+typing/scroll/hotkey state machine and the recorder can be exercised and
+benchmarked on any machine, at any speed.
+
+Input stream: JSON lines sorted by "t" (seconds from the start of the stream):
+
+    {"t": 0.10, "event": "press",   "key": "a", "caps": 0}       key: parse_key() form
+    {"t": 0.15, "event": "release", "key": "Key.shift"}
+    {"t": 1.00, "event": "click",   "x": 10, "y": 20, "button": "left", "pressed": true,
+                                    "element": {"name": ..., "coordinates": {...}}}  (optional)
+    {"t": 1.50, "event": "scroll",  "x": 10, "y": 20, "dx": 0, "dy": -1}
+    {"t": 1.60, "event": "move",    "x": 11, "y": 20}
+
+Event times are replayed on a virtual clock (start time + "t"), so double clicks,
+scroll coalescing and event timestamps do not depend on the replay speed. The
+screen is captured on the same clock, at the capture rate of an active session,
+after the monitor has caught up with the input so far: each event gets the frame
+it would have got live, however fast the replay runs.
+
+    python replay.py input.jsonl [--speed 10] [--out replay_events]
+    python replay.py --generate 60 [--seed 0] [--save-input input.jsonl]
+    python replay.py --check-hotkeys     replay HOTKEY_CASES, check each gives one action
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from capturer import CAPTURE_MAX_FPS, CaptureBackend
+from inputs import Button, parse_key
+
+REPLAY_SCREEN_SIZE = (1280, 720)
+
+# Chords (with the shipped hotkeys.json) and the single action each must be recorded as:
+# the modifiers pressed first must not be recorded as key presses of their own.
+HOTKEY_CASES = [
+    (["Key.ctrl_l", "Key.shift", "Key.esc"], "hotkey (ctrl, shift, esc)"),
+    (["Key.cmd", "Key.shift", "s"], "hotkey (cmd, shift, s)"),
+    (["Key.alt_l", "Key.shift", "Key.tab"], "hotkey (alt, shift, tab)"),
+    (["Key.alt_l", "Key.tab"], "hotkey (alt, tab)"),
+    (["Key.ctrl_l", "\x03"], "hotkey (Ctrl, C)"),
+]
+
+
+class _ReplayListener:
+    """Listener object handed to the monitor; the callbacks are driven by ReplaySource."""
+
+    def __init__(self, **callbacks):
+        self.callbacks = callbacks
+        self.running = False
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+
+class ReplaySource:
+    """Input source (see inputs.py) that plays back an event stream."""
+
+    def __init__(self, events: List[Dict], speed: float = 0.0):
+        """`speed`: replay speed factor (1 = real time), 0 = as fast as possible."""
+        self.events = sorted(events, key=lambda e: e["t"])
+        self.speed = float(speed)
+        self._keyboard: Optional[_ReplayListener] = None
+        self._mouse: Optional[_ReplayListener] = None
+        self._base = time.time()
+        self._t = 0.0
+        self._caps = 0
+        self._elements: Dict[Tuple[int, int], Dict] = {}
+        self.dispatched = 0
+
+    def keyboard_listener(self, on_press, on_release):
+        self._keyboard = _ReplayListener(on_press=on_press, on_release=on_release)
+        return self._keyboard
+
+    def mouse_listener(self, on_click, on_scroll, on_move):
+        self._mouse = _ReplayListener(on_click=on_click, on_scroll=on_scroll, on_move=on_move)
+        return self._mouse
+
+    def capslock_state(self) -> int:
+        return self._caps
+
+    def clock(self) -> float:
+        return self._base + self._t
+
+    def element_at(self, x: int, y: int) -> Optional[Dict]:
+        """Element lookup: the element recorded with the click, or a box around the point."""
+        element = self._elements.get((x, y))
+        if element is not None:
+            return element
+        return {
+            "name": f"element at ({x}, {y})",
+            "coordinates": {"left": x - 20, "top": y - 10, "right": x + 20, "bottom": y + 10},
+        }
+
+    def run(self, on_event=None) -> None:
+        """Dispatch every event to the listeners; `on_event(event)` runs after each one."""
+        started = time.perf_counter()
+        for event in self.events:
+            if self.speed > 0:
+                delay = event["t"] / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            self._t = event["t"]
+            self._dispatch(event)
+            self.dispatched += 1
+            if on_event is not None:
+                on_event(event)
+
+    def _dispatch(self, event: Dict) -> None:
+        kind = event["event"]
+        if kind in ("press", "release"):
+            if self._keyboard is None or not self._keyboard.running:
+                return
+            self._caps = int(event.get("caps", self._caps))
+            self._keyboard.callbacks["on_" + kind](parse_key(event["key"]))
+            return
+
+        if self._mouse is None or not self._mouse.running:
+            return
+        x, y = int(event["x"]), int(event["y"])
+        if kind == "click":
+            if event.get("element") is not None:
+                self._elements[(x, y)] = event["element"]
+            self._mouse.callbacks["on_click"](x, y, Button[event.get("button", "left")], bool(event["pressed"]))
+        elif kind == "scroll":
+            self._mouse.callbacks["on_scroll"](x, y, int(event["dx"]), int(event["dy"]))
+        elif kind == "move":
+            self._mouse.callbacks["on_move"](x, y)
+        else:
+            raise ValueError(f"unknown replay event {kind!r}")
+
+
+class ReplayScreen(CaptureBackend):
+    """Capture backend whose screen reacts to the replayed events.
+
+    Typing paints a text line, clicks paint a box at the pointer and scrolling
+    shifts the content, so consecutive frames differ in small regions like on a
+    real desktop.
+    """
+
+    name = "replay"
+
+    def __init__(self, clock, size: Tuple[int, int] = REPLAY_SCREEN_SIZE):
+        super().__init__(clock)
+        self._size = size
+        w, h = size
+        self._frame = np.full((h, w, 4), 230, dtype=np.uint8)
+        self._lock = threading.Lock()
+        self._cursor = 0
+        self._count = 0
+
+    def size(self) -> Tuple[int, int]:
+        return self._size
+
+    def _grab_into(self, buffer: bytearray) -> Tuple[int, int]:
+        nbytes = self.frame_nbytes()
+        with self._lock:
+            memoryview(buffer)[:nbytes] = self._frame.reshape(-1).data
+        return self._size
+
+    def apply(self, event: Dict) -> None:
+        """Update the screen after an event (the application reacting to it)."""
+        w, h = self._size
+        self._count += 1
+        color = (37 * self._count) % 200
+        with self._lock:
+            kind = event["event"]
+            if kind == "press":
+                x = 16 + (self._cursor % ((w - 32) // 8)) * 8
+                y = 16 + (self._cursor // ((w - 32) // 8)) % ((h - 32) // 16) * 16
+                self._frame[y:y + 12, x:x + 6, :3] = color
+                self._cursor += 1
+            elif kind == "click" and event.get("pressed"):
+                x = min(max(int(event["x"]), 0), w - 1)
+                y = min(max(int(event["y"]), 0), h - 1)
+                self._frame[max(0, y - 40):y + 40, max(0, x - 80):x + 80, :3] = color
+            elif kind == "scroll":
+                self._frame[:] = np.roll(self._frame, 16 * int(event["dy"]), axis=0)
+
+
+def generate_events(seconds: float = 60.0, keys_per_second: float = 15.0, seed: int = 0) -> List[Dict]:
+    """A synthetic session: typing bursts with corrections, hotkeys, clicks, drags and scrolling."""
+    rng = random.Random(seed)
+    words = "the quick brown fox jumps over lazy dog report table cell value".split()
+    w, h = REPLAY_SCREEN_SIZE
+    events: List[Dict] = []
+    t = 0.0
+
+    def key(spec, dt):
+        nonlocal t
+        events.append({"t": round(t, 4), "event": "press", "key": spec, "caps": 0})
+        events.append({"t": round(t + 0.04, 4), "event": "release", "key": spec})
+        t += dt
+
+    while t < seconds:
+        roll = rng.random()
+        if roll < 0.45:  # type a few words
+            for word in rng.sample(words, rng.randint(1, 4)):
+                for char in word:
+                    key(char, rng.expovariate(keys_per_second))
+                if rng.random() < 0.2:
+                    key("Key.backspace", rng.expovariate(keys_per_second))
+                key("Key.space", rng.expovariate(keys_per_second))
+            if rng.random() < 0.3:
+                key("Key.enter", 0.3)
+        elif roll < 0.75:  # click, sometimes double click or drag
+            x, y = rng.randrange(w), rng.randrange(h)
+            for _ in range(2 if rng.random() < 0.15 else 1):
+                events.append({"t": round(t, 4), "event": "click", "x": x, "y": y, "button": "left", "pressed": True})
+                t += 0.08
+                if rng.random() < 0.1:
+                    x, y = min(w - 1, x + 120), y
+                    events.append({"t": round(t, 4), "event": "move", "x": x, "y": y})
+                events.append({"t": round(t, 4), "event": "click", "x": x, "y": y, "button": "left", "pressed": False})
+                t += 0.1
+            t += rng.uniform(0.3, 1.5)
+        elif roll < 0.85:  # scroll burst
+            x, y = rng.randrange(w), rng.randrange(h)
+            for _ in range(rng.randint(2, 10)):
+                events.append({"t": round(t, 4), "event": "scroll", "x": x, "y": y, "dx": 0, "dy": rng.choice((-1, 1))})
+                t += 0.05
+            t += rng.uniform(0.5, 2.5)
+        elif roll < 0.92:  # ctrl + c / ctrl + v
+            events.append({"t": round(t, 4), "event": "press", "key": "Key.ctrl_l", "caps": 0})
+            key(rng.choice(("\x03", "\x16")), 0.05)
+            events.append({"t": round(t, 4), "event": "release", "key": "Key.ctrl_l"})
+            t += 0.5
+        else:  # pause
+            t += rng.uniform(1.0, 4.0)
+    return events
+
+
+def chord_events(keys: List[str], t: float = 0.5) -> List[Dict]:
+    """Press `keys` in order, then release them in reverse order."""
+    events = [{"t": round(t + 0.05 * i, 4), "event": "press", "key": key, "caps": 0} for i, key in enumerate(keys)]
+    events += [{"t": round(t + 0.3 + 0.05 * i, 4), "event": "release", "key": key}
+               for i, key in enumerate(reversed(keys))]
+    return events
+
+
+def check_hotkeys(directory: str = "replay_events") -> int:
+    """Replay every HOTKEY_CASES chord into its own session; returns the number of failures."""
+    failures = 0
+    for keys, expected in HOTKEY_CASES:
+        result = replay(chord_events(keys), directory)
+        with open(result.event_file, "r", encoding="utf-8") as f:
+            actions = [json.loads(line)["action"] for line in f if line.strip()]
+        ok = actions == [expected]
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {' + '.join(keys)!r:40s} -> {actions}")
+    return failures
+
+
+def load_events(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def dump_events(events: List[Dict], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for event in events:
+            json.dump(event, f, ensure_ascii=False)
+            f.write("\n")
+
+
+@dataclass
+class ReplayResult:
+    event_file: str
+    events: int  # input events dispatched
+    recorded: int  # actions written to the JSONL
+    seconds: float  # wall time from first event to session saved
+    latencies_ms: List[float]  # per input event, enqueue to handled
+    start_ms: float = 0.0  # Monitor construction and start
+    stop_ms: float = 0.0  # Monitor.stop(), i.e. until the session's frames are flushed
+    save_ms: List[float] = field(default_factory=list)  # per recorded action, Recorder.save()
+
+
+def replay(events: List[Dict], directory: str = "replay_events", speed: float = 0.0,
+           size: Tuple[int, int] = REPLAY_SCREEN_SIZE, task=None, encoder=None, quota=None) -> ReplayResult:
+    """Replay `events` into a fresh Monitor and save the session under `directory`.
+
+    `encoder` is a shared EncoderService (see encoder.py), None for a private one;
+    `quota` a StorageManager (see storage.py), None for no quota.
+    """
+    from monitor import Monitor
+
+    source = ReplaySource(events, speed)
+    screen = ReplayScreen(source.clock, size)
+    setup = time.perf_counter()
+    monitor = Monitor(task, input_source=source, capture=screen, directory=directory,
+                      element_lookup=source.element_at, window_probe=lambda: None, encoder=encoder, quota=quota)
+    monitor.ingest.latencies = []
+    recent_screen = monitor.recorder.recent_screen
+    recent_screen.stop()  # frames are captured below, on the virtual clock
+    last_capture = [source.clock()]
+
+    def after_event(event):
+        screen.apply(event)
+        if source.clock() - last_capture[0] >= 1.0 / CAPTURE_MAX_FPS:
+            monitor.ingest.flush()  # the ring only keeps a few frames: let the monitor catch up first
+            recent_screen.capture_now()
+            last_capture[0] = source.clock()
+
+    monitor.start()
+    started = time.perf_counter()
+    source.run(on_event=after_event)
+    stopping = time.perf_counter()
+    monitor.stop()
+    elapsed = time.perf_counter() - started
+
+    with open(monitor.recorder.event_filename, "r", encoding="utf-8") as f:
+        recorded = sum(1 for line in f if line.strip())
+    return ReplayResult(monitor.recorder.event_filename, source.dispatched, recorded, elapsed,
+                        monitor.ingest.latencies, (started - setup) * 1000.0,
+                        (time.perf_counter() - stopping) * 1000.0, monitor.recorder.save_ms)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", help="input event stream (JSONL)")
+    parser.add_argument("--generate", type=float, metavar="SECONDS", help="replay a generated session instead")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-input", help="also write the generated input stream here")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = real time, 0 = as fast as possible")
+    parser.add_argument("--out", default="replay_events", help="session directory")
+    parser.add_argument("--check-hotkeys", action="store_true", help="replay HOTKEY_CASES and check the actions")
+    args = parser.parse_args(argv)
+
+    if args.check_hotkeys:
+        return 1 if check_hotkeys(args.out) else 0
+    if args.input:
+        events = load_events(args.input)
+    elif args.generate:
+        events = generate_events(args.generate, seed=args.seed)
+        if args.save_input:
+            dump_events(events, args.save_input)
+    else:
+        parser.print_help()
+        return 1
+
+    result = replay(events, args.out, args.speed)
+    print(f"{result.events} input events -> {result.recorded} actions in {result.seconds:.2f}s: "
+          f"{result.event_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
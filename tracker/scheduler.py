@@ -0,0 +1,130 @@
+"""Single-thread deadline scheduler for debounce timers.
+
+`threading.Timer` starts a new OS thread per timer, and the monitor re-arms its
+timers on every key press, click and scroll. `Scheduler` runs all callbacks on one
+long-lived thread instead: deadlines live in a binary heap, so arming or moving
+a deadline is O(log n) and never creates a thread.
+
+Rescheduling pushes a new heap entry and leaves the old one behind as stale (it is
+recognized by its generation number and skipped when popped); the heap is rebuilt
+when stale entries outnumber live ones.
+
+Callbacks run on the scheduler thread and must not block for long.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from log import get_logger
+
+
+class ScheduledCall:
+    """Handle of a callback registered with `Scheduler.schedule()`."""
+
+    def __init__(self, scheduler: "Scheduler", callback: Callable[[], None]):
+        self._scheduler = scheduler
+        self.callback = callback
+        self.generation = 0
+        self.deadline: Optional[float] = None  # time.monotonic(), None while not armed
+
+    def reschedule(self, delay: float) -> None:
+        """(Re-)arm the call `delay` seconds from now, replacing any pending deadline."""
+        self._scheduler._arm(self, time.monotonic() + delay)
+
+    def cancel(self) -> None:
+        self._scheduler._arm(self, None)
+
+    @property
+    def pending(self) -> bool:
+        return self.deadline is not None
+
+
+class Scheduler:
+    """Runs callbacks at deadlines on a single daemon thread."""
+
+    def __init__(self, name: str = "Scheduler"):
+        self._logger = get_logger("scheduler")
+        self._heap: List[Tuple[float, int, int, ScheduledCall]] = []  # (deadline, seq, generation, call)
+        self._seq = itertools.count()
+        self._stale = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+
+        self.fired = 0
+        self.max_late_ms = 0.0
+        self.total_late_ms = 0.0
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def schedule(self, delay: Optional[float], callback: Callable[[], None]) -> ScheduledCall:
+        """Register `callback`; it is armed `delay` seconds from now unless delay is None."""
+        call = ScheduledCall(self, callback)
+        if delay is not None:
+            call.reschedule(delay)
+        return call
+
+    def _arm(self, call: ScheduledCall, deadline: Optional[float]) -> None:
+        with self._cond:
+            if call.deadline is not None:
+                self._stale += 1  # the old heap entry stays behind
+            call.generation += 1
+            call.deadline = deadline
+            if deadline is None:
+                return
+            heapq.heappush(self._heap, (deadline, next(self._seq), call.generation, call))
+            if self._stale > 64 and self._stale > len(self._heap) // 2:
+                self._compact()
+            if self._heap[0][3] is call:
+                self._cond.notify()  # new earliest deadline
+
+    def _compact(self) -> None:
+        self._heap = [entry for entry in self._heap if entry[2] == entry[3].generation]
+        heapq.heapify(self._heap)
+        self._stale = 0
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+        self._logger.info("scheduler: %s", self.summary())
+
+    def summary(self) -> str:
+        avg = self.total_late_ms / self.fired if self.fired else 0.0
+        return f"{self.fired} callbacks, lateness avg {avg:.2f} ms / max {self.max_late_ms:.2f} ms"
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    if self._heap:
+                        deadline, _, generation, call = self._heap[0]
+                        if generation != call.generation:
+                            heapq.heappop(self._heap)
+                            self._stale -= 1
+                            continue
+                        wait = deadline - time.monotonic()
+                        if wait <= 0:
+                            heapq.heappop(self._heap)
+                            call.deadline = None
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+
+            late_ms = (time.monotonic() - deadline) * 1000.0
+            self.fired += 1
+            self.total_late_ms += late_ms
+            self.max_late_ms = max(self.max_late_ms, late_ms)
+            try:
+                call.callback()
+            except Exception:
+                self._logger.exception("scheduled callback failed")
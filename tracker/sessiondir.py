@@ -0,0 +1,362 @@
+"""Per-session directory layout.
+
+Sessions used to write into the shared `events/` folder side by side: JSONL,
+Markdown, archive and spool files of every session in one directory, and all
+screenshots in one flat `events/screenshot/` directory that grows with the
+whole recording history. Discarding a session deleted its screenshots one file
+at a time. Now each session has a directory of its own:
+
+    events/.staging/<session>/     while recording (and until its data is complete)
+    events/<session>/              finished
+        <session>.jsonl
+        <session>.md
+        screenshot/                (or <session>.frames with archive/delta storage)
+        manifest.json
+
+The recorder writes into the staging directory. Once the session's data is
+complete (`Recorder.wait()`) it writes MANIFEST_FILE (counts, bytes and
+timings) and moves the directory into place with one atomic rename, so
+`events/<session>/` never holds a partial session. Discarding a session is one
+rename into TRASH_DIR, whatever its size; the tree is removed on a background
+thread. Screenshot paths in the events are relative to the session directory
+("screenshot\\<name>", "<session>.frames::<name>").
+
+A session left in staging by a crash is finalized by `recover_sessions`, with
+"recovered": true in its manifest. The tracker does this when it starts, except
+for sessions with spooled frames, which the command line tool encodes first.
+
+Command line (run from the tracker directory):
+
+    python sessiondir.py migrate [events_dir]   flat layout -> one directory per session
+    python sessiondir.py recover [events_dir]   finalize sessions left in staging, encoding their spools
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from archive import ARCHIVE_EXT, INDEX_EXT, make_ref, split_ref
+from fs import delete_folder
+from log import get_logger
+from spool import SPOOL_EXT
+
+STAGING_DIR = ".staging"
+TRASH_DIR = ".trash"  # discarded sessions being deleted; emptied again when the tracker starts
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+_manifest_lock = threading.RLock()  # the recorder and the storage manager (storage.py) both update manifests
+
+_SCREENSHOT_DIR = "screenshot"
+_SESSION_SUFFIXES = (".jsonl", ".md", ARCHIVE_EXT, ARCHIVE_EXT + INDEX_EXT, SPOOL_EXT, SPOOL_EXT + INDEX_EXT)
+
+
+class SessionDir:
+    """The directory of one session: staging until `finalize()`, then in place."""
+
+    def __init__(self, root: str, name: str, create: bool = True):
+        """Create the staging directory of a new session `name` (with `create`, sessions
+        started within the same second get a suffix), or refer to an existing one."""
+        self.root = root
+        candidate, n = name, 1
+        while create and (os.path.exists(os.path.join(root, STAGING_DIR, candidate)) or
+                          os.path.exists(os.path.join(root, candidate))):
+            n += 1
+            candidate = f"{name}_{n}"
+        self.name = candidate
+        self.path = os.path.join(root, STAGING_DIR, candidate)
+        self.finalized = False
+        if create:
+            os.makedirs(self.path)
+
+    def file(self, suffix: str) -> str:
+        """Path of the session's `<session><suffix>` file."""
+        return os.path.join(self.path, self.name + suffix)
+
+    def finalize(self, manifest: Dict[str, Any]) -> str:
+        """Write the manifest and move the directory into place; returns its new path."""
+        if self.finalized:
+            return self.path
+        write_manifest(self.path, self.name, manifest)
+        target = os.path.join(self.root, self.name)
+        os.rename(self.path, target)  # atomic within the volume; fails if the target exists
+        self.path = target
+        self.finalized = True
+        return target
+
+    def discard(self, wait: bool = False) -> None:
+        """Remove the session (staging or finished): one rename into TRASH_DIR, then a
+        tree removal on a background thread (unless `wait`)."""
+        if not os.path.isdir(self.path):
+            return
+        trash = os.path.join(self.root, TRASH_DIR)
+        os.makedirs(trash, exist_ok=True)
+        target = os.path.join(trash, f"{self.name}_{time.time_ns()}")
+        try:
+            os.rename(self.path, target)
+        except OSError:
+            target = self.path  # e.g. a file still open on Windows: remove in place
+        self.path = target
+        if wait:
+            delete_folder(target)
+        else:
+            threading.Thread(target=delete_folder, args=(target,), name="SessionDiscard", daemon=True).start()
+
+
+def directory_bytes(directory: str) -> Dict[str, int]:
+    """Bytes in a session directory, by kind."""
+    sizes = {"events": 0, "markdown": 0, "screenshots": 0, "other": 0}
+    for parent, _dirs, files in os.walk(directory):
+        for filename in files:
+            try:
+                size = os.path.getsize(os.path.join(parent, filename))
+            except OSError:
+                continue
+            if filename.endswith(".jsonl"):
+                kind = "events"
+            elif filename.endswith(".md"):
+                kind = "markdown"
+            elif parent != directory or filename.endswith((ARCHIVE_EXT, ARCHIVE_EXT + INDEX_EXT)):
+                kind = "screenshots"
+            else:
+                kind = "other"
+            sizes[kind] += size
+    sizes["total"] = sum(sizes.values())
+    return sizes
+
+
+def write_manifest(directory: str, name: str, fields: Dict[str, Any]) -> None:
+    """Write MANIFEST_FILE: `fields` plus the session name and its bytes on disk."""
+    manifest = {"version": MANIFEST_VERSION, "session": name}
+    manifest.update(fields)
+    manifest["bytes"] = directory_bytes(directory)
+    path = os.path.join(directory, MANIFEST_FILE)
+    with _manifest_lock:
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(path + ".tmp", path)
+
+
+def refresh_manifest(directory: str) -> None:
+    """Recount the bytes of a finished session's manifest (after its Markdown was written)."""
+    update_manifest(directory)
+
+
+def update_manifest(directory: str, **fields: Any) -> Optional[Dict[str, Any]]:
+    """Add `fields` to a finished session's manifest and recount its bytes; returns the
+    new manifest, or None without one."""
+    with _manifest_lock:
+        manifest = read_manifest(directory)
+        if manifest is None:
+            return None
+        manifest.update(fields)
+        write_manifest(directory, manifest["session"], manifest)
+        return read_manifest(directory)
+
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def session_dirs(root: str, staging: bool = False) -> List[str]:
+    """Finished session directories under `root` (or those in staging)."""
+    base = os.path.join(root, STAGING_DIR) if staging else root
+    if not os.path.isdir(base):
+        return []
+    return [os.path.join(base, name) for name in sorted(os.listdir(base))
+            if not name.startswith(".") and name != _SCREENSHOT_DIR and os.path.isdir(os.path.join(base, name))]
+
+
+def session_files(root: str, suffix: str, staging: bool = False) -> Iterator[str]:
+    """Files ending with `suffix` of every session under `root`: in the session
+    directories (and staging ones if `staging`) and, from the flat layout, in `root`."""
+    dirs = [root] + session_dirs(root) + (session_dirs(root, staging=True) if staging else [])
+    for directory in dirs:
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(suffix) and os.path.isfile(os.path.join(directory, filename)):
+                yield os.path.join(directory, filename)
+
+
+def _event_summary(jsonl_path: str) -> Dict[str, Any]:
+    """Counts and first/last timestamps of a session's JSONL."""
+    events, screenshots, first, last = 0, set(), None, None
+    if os.path.exists(jsonl_path):
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                events += 1
+                if event.get("screenshot"):
+                    screenshots.add(event["screenshot"])
+                first = first or event.get("timestamp")
+                last = event.get("timestamp") or last
+    return {"counts": {"events": events, "screenshots": len(screenshots)}, "started": first, "finished": last}
+
+
+def _spooled_frames(path: str) -> bool:
+    try:
+        return os.path.getsize(path + INDEX_EXT) > 0
+    except OSError:
+        return False
+
+
+def recover_sessions(root: str, encode: bool = False) -> int:
+    """Finalize the sessions a crash left in staging; returns how many.
+
+    Their event logs are repaired first. Sessions with spooled frames are left in
+    staging unless `encode`, which encodes the spool first (can take a while); a
+    drained spool (empty index) is just removed.
+    """
+    from eventlog import recover_event_log
+    from spool import encode_spool
+
+    logger = get_logger("recorder")
+    trash = os.path.join(root, TRASH_DIR)
+    if os.path.isdir(trash):
+        delete_folder(trash)  # discards interrupted by the exit of the previous run
+    recovered = 0
+    for directory in session_dirs(root, staging=True):
+        name = os.path.basename(directory)
+        try:
+            jsonl_path = os.path.join(directory, name + ".jsonl")
+            if os.path.exists(jsonl_path):
+                recover_event_log(jsonl_path)
+            spools = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(SPOOL_EXT)]
+            if any(_spooled_frames(spool) for spool in spools) and not encode:
+                logger.warning("session %s has spooled frames, run `python sessiondir.py recover` to encode "
+                               "and finalize it", name)
+                continue
+            frames = sum(encode_spool(spool) for spool in spools)
+            manifest = _event_summary(jsonl_path)
+            manifest.update({"recovered": True, "spooled_frames_encoded": frames})
+            SessionDir(root, name, create=False).finalize(manifest)
+        except OSError:
+            logger.exception("could not recover session %s", name)
+            continue
+        logger.warning("recovered session %s left in staging by a crash", name)
+        recovered += 1
+    return recovered
+
+
+def _move(src: str, dst: str) -> None:
+    """Move a file unless that already happened (a migration may be resumed)."""
+    if os.path.exists(src):
+        os.replace(src, dst)
+
+
+def migrate_session(root: str, jsonl_name: str) -> int:
+    """Move one flat-layout session (`root/<session>.jsonl`, its Markdown, archive and
+    screenshots) into its own directory. Returns the screenshots moved."""
+    name = jsonl_name[:-len(".jsonl")]
+    staging = os.path.join(root, STAGING_DIR, name)
+    os.makedirs(os.path.join(staging, _SCREENSHOT_DIR), exist_ok=True)
+
+    with open(os.path.join(root, jsonl_name), "r", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    moved = 0
+    for entry in entries:
+        for key in ("screenshot", "marked_screenshot"):  # the latter: data already post-processed
+            ref = entry.get(key) or ""
+            if not ref:
+                continue
+            sep = "\\" if "\\" in ref else "/"
+            archive_path, member = split_ref(ref)
+            if archive_path is not None:
+                # events\<session>.frames::x.png -> <session>.frames::x.png
+                entry[key] = make_ref(archive_path.split(sep)[-1], member)
+                continue
+            # events\screenshot\x.png -> screenshot\x.png
+            filename = ref.split(sep)[-1]
+            source = os.path.join(root, _SCREENSHOT_DIR, filename)
+            target = os.path.join(staging, _SCREENSHOT_DIR, filename)
+            if os.path.exists(source) and not os.path.exists(target):
+                os.replace(source, target)
+                moved += 1
+            entry[key] = sep.join([_SCREENSHOT_DIR, filename])
+
+    for suffix in _SESSION_SUFFIXES[1:]:
+        _move(os.path.join(root, name + suffix), os.path.join(staging, name + suffix))
+    if not os.listdir(os.path.join(staging, _SCREENSHOT_DIR)):
+        os.rmdir(os.path.join(staging, _SCREENSHOT_DIR))
+    # The JSONL goes last: while it is in `root`, the session is not migrated yet.
+    jsonl_path = os.path.join(staging, jsonl_name)
+    with open(jsonl_path + ".tmp", "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(jsonl_path + ".tmp", jsonl_path)
+    os.remove(os.path.join(root, jsonl_name))
+
+    manifest = _event_summary(jsonl_path)
+    manifest["migrated"] = True
+    write_manifest(staging, name, manifest)
+    os.rename(staging, os.path.join(root, name))
+    return moved
+
+
+def migrate(root: str) -> int:
+    """Move every flat-layout session of `root` into its own directory; returns how many."""
+    logger = get_logger("recorder")
+    count = 0
+    for filename in sorted(os.listdir(root)):
+        if not filename.endswith(".jsonl") or not os.path.isfile(os.path.join(root, filename)):
+            continue
+        if os.path.exists(os.path.join(root, filename[:-len(".jsonl")])):
+            logger.error("cannot migrate %s: a session directory of that name exists", filename)
+            continue
+        started = time.perf_counter()
+        moved = migrate_session(root, filename)
+        logger.info("migrated %s (%d screenshots) in %.0f ms", filename, moved, (time.perf_counter() - started) * 1000)
+        print(f"migrate {filename}: {moved} screenshots")
+        count += 1
+    flat = os.path.join(root, _SCREENSHOT_DIR)
+    if os.path.isdir(flat):
+        left = os.listdir(flat)
+        if left:
+            print(f"{len(left)} screenshots in {flat} belong to no session, left in place")
+        else:
+            os.rmdir(flat)
+    return count
+
+
+def session_manifest(started: float, **fields: Any) -> Dict[str, Any]:
+    """Manifest fields of a session recorded now, started at `started` (time.time())."""
+    manifest: Dict[str, Any] = {
+        "started": datetime.fromtimestamp(started).isoformat(timespec="seconds"),
+        "finished": datetime.now().isoformat(timespec="seconds"),
+        "duration_s": round(time.time() - started, 3),
+    }
+    manifest.update(fields)
+    return manifest
+
+
+def main(argv: List[str]) -> int:
+    if not argv or argv[0] not in ("migrate", "recover"):
+        print(__doc__)
+        return 1
+    root = argv[1] if len(argv) > 1 else "events"
+    if not os.path.isdir(root):
+        print(f"{root} is not a directory")
+        return 1
+    if argv[0] == "migrate":
+        print(f"{migrate(root)} sessions migrated")
+    else:
+        print(f"{recover_sessions(root, encode=True)} sessions recovered")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,263 @@
+"""Raw frame spool.
+
+Raw BGRX frames appended to a memory-mapped scratch file so they can be encoded
+later, when the encoder has time:
+
+- with SPOOL_MODE = "finish" (recorder.py) every screenshot is spooled during
+  the session and encoded once it ends, so recording costs a memory copy per
+  frame instead of a PNG encode;
+- with SPOOL_MODE = "idle" frames waiting for an input-idle window are kept in
+  memory, and only those past the encoder backlog limit are spooled (see idle.py);
+- with the "spool" backlog policy (backlog.py) only frames that arrive while the
+  encoder is behind are spooled.
+
+Files:
+
+    <prefix>_<timestamp>.spool       frame data, optionally compressed per frame
+    <prefix>_<timestamp>.spool.idx   index: INDEX_ENTRY + JSON metadata per frame
+
+The data file grows in SPOOL_GROW steps and is trimmed to its length on close.
+Once every queued frame has been popped, the spool rewinds: the next frame is
+written at offset 0 and the index starts over, so an idle-mode spool stays as
+large as its longest backlog rather than the whole session. The index is
+appended after each frame, so a spool left behind by a crash can still be
+encoded from the command line (run from the tracker directory):
+
+    python spool.py encode [events_dir] [--keep]
+
+(`python sessiondir.py recover` also does this, and then finalizes the session.)
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Any, Iterator, List, Optional, Tuple
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # optional; "lz4" falls back to zlib
+    lz4_frame = None
+
+SPOOL_EXT = ".spool"
+INDEX_EXT = ".idx"
+SPOOL_COMPRESSION = "none"  # "none", "zlib" (level 1) or "lz4" (needs the lz4 package)
+SPOOL_GROW = 64 * 1024 * 1024
+INDEX_ENTRY = struct.Struct("<QIIIIBH")  # offset, stored length, raw length, width, height, compression, meta length
+
+_COMPRESSIONS = ("none", "zlib", "lz4")
+
+
+def _compress(data, compression: str) -> bytes:
+    if compression == "zlib":
+        return zlib.compress(data, 1)
+    if compression == "lz4":
+        return lz4_frame.compress(data)
+    return data
+
+
+def _decompress(data, compression: str) -> bytes:
+    if compression == "zlib":
+        return zlib.decompress(data)
+    if compression == "lz4":
+        return lz4_frame.decompress(data)
+    return bytes(data)
+
+
+class FrameSpool:
+    """Memory-mapped queue of raw frames (thread-safe); created on first append, rewound when drained."""
+
+    def __init__(self, path: str, compression: str = SPOOL_COMPRESSION):
+        if compression not in _COMPRESSIONS:
+            raise ValueError(f"unknown spool compression {compression!r}, expected one of {_COMPRESSIONS}")
+        if compression == "lz4" and lz4_frame is None:
+            compression = "zlib"
+        self.path = path
+        self.index_path = path + INDEX_EXT
+        self.compression = compression
+        self._lock = threading.Lock()
+        self._file = None
+        self._index_file = None
+        self._map: Optional[mmap.mmap] = None
+        self._length = 0  # bytes of frame data in the file
+        # (offset, stored length, size, compression flag, meta, time.monotonic() when queued)
+        self._index: deque = deque()
+
+        self.frames = 0
+        self.max_queued = 0
+        self.raw_bytes = 0
+        self.bytes_written = 0
+
+    def append(self, data, size: Tuple[int, int], meta: Any = None) -> None:
+        """Spool one frame; `meta` must be JSON serializable (it is kept in the index)."""
+        stored = _compress(data, self.compression)
+        flag = _COMPRESSIONS.index(self.compression)
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            if self._file is None:
+                self._open()
+            offset = self._length
+            self._reserve(offset + len(stored))
+            self._map[offset:offset + len(stored)] = stored
+            self._length += len(stored)
+            self._index_file.write(INDEX_ENTRY.pack(offset, len(stored), len(data), size[0], size[1], flag,
+                                                    len(meta_bytes)) + meta_bytes)
+            self._index_file.flush()
+            self._index.append((offset, len(stored), (size[0], size[1]), flag, meta, time.monotonic()))
+            self.frames += 1
+            self.max_queued = max(self.max_queued, len(self._index))
+            self.raw_bytes += len(data)
+            self.bytes_written += len(stored)
+
+    def _open(self) -> None:
+        self._file = open(self.path, "w+b")
+        self._index_file = open(self.index_path, "wb")
+
+    def _reserve(self, length: int) -> None:
+        capacity = len(self._map) if self._map is not None else 0
+        if length <= capacity:
+            return
+        capacity = max(length, capacity + SPOOL_GROW)
+        if self._map is not None:
+            self._map.close()
+        self._file.truncate(capacity)
+        self._map = mmap.mmap(self._file.fileno(), capacity)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def oldest_age(self) -> Optional[float]:
+        """Seconds the oldest queued frame has been waiting, None if none is."""
+        with self._lock:
+            return time.monotonic() - self._index[0][5] if self._index else None
+
+    def pop(self) -> Optional[Tuple[bytes, Tuple[int, int], Any]]:
+        """Remove the oldest queued frame and return (data, size, meta), or None."""
+        with self._lock:
+            if not self._index:
+                return None
+            offset, stored, size, flag, meta, _ = self._index.popleft()
+            data = self._map[offset:offset + stored]
+            if not self._index:
+                self._rewind()
+        return _decompress(data, _COMPRESSIONS[flag]), size, meta
+
+    def _rewind(self) -> None:
+        # nothing is queued: reuse the file from the start (the mapping keeps its capacity)
+        self._length = 0
+        self._index_file.seek(0)
+        self._index_file.truncate()
+        self._index_file.flush()
+
+    def drain(self) -> Iterator[Tuple[bytes, Tuple[int, int], Any]]:
+        """Yield (data, size, meta) for every queued frame, oldest first, and forget them."""
+        while True:
+            frame = self.pop()
+            if frame is None:
+                return
+            yield frame
+
+    def summary(self) -> str:
+        mb = 1024 * 1024
+        ratio = self.bytes_written / self.raw_bytes if self.raw_bytes else 1.0
+        return (f"{self.frames} frames (max {self.max_queued} queued), {self.bytes_written / mb:.1f} MB spooled "
+                f"({self.raw_bytes / mb:.1f} MB raw, {self.compression}, ratio {ratio:.2f})")
+
+    def close(self, delete: bool = True) -> None:
+        """Close the spool, deleting its files (or trimming them to length if kept)."""
+        with self._lock:
+            if self._file is None:
+                return
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.truncate(self._length)
+            self._file.close()
+            self._index_file.close()
+            self._file = self._index_file = None
+        if delete:
+            for path in (self.path, self.index_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def read_spool(path: str) -> Iterator[Tuple[bytes, Tuple[int, int], Any]]:
+    """Yield (data, size, meta) from a closed spool file, stopping at a torn index entry."""
+    with open(path, "rb") as data_file, open(path + INDEX_EXT, "rb") as index_file:
+        index = index_file.read()
+        length = os.fstat(data_file.fileno()).st_size
+        if length == 0:
+            return
+        with mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            pos = 0
+            while pos + INDEX_ENTRY.size <= len(index):
+                offset, stored, _, w, h, flag, meta_len = INDEX_ENTRY.unpack_from(index, pos)
+                pos += INDEX_ENTRY.size
+                if pos + meta_len > len(index) or offset + stored > length:
+                    return
+                meta = json.loads(index[pos:pos + meta_len].decode("utf-8"))
+                pos += meta_len
+                yield _decompress(data[offset:offset + stored], _COMPRESSIONS[flag]), (w, h), meta
+
+
+def encode_spool(path: str, keep: bool = False) -> int:
+    """Encode the frames of a spool left behind into their screenshot files (or session
+    archive, appending; delta sessions get full keyframes). Returns frames encoded.
+
+    Screenshot paths are relative to the spool's (session) directory."""
+    from archive import FrameArchiveWriter, split_ref
+    from recorder import save_screenshot
+
+    session_dir = os.path.dirname(path)
+    count = 0
+    writers = {}
+    try:
+        for data, size, meta in read_spool(path):
+            filename, rect, point, codec = meta
+            filename = os.path.join(session_dir, filename)
+            archive_path, name = split_ref(filename)
+            if archive_path is not None:
+                if archive_path not in writers:
+                    writers[archive_path] = FrameArchiveWriter(archive_path)
+                encoded = save_screenshot(None, data, size, rect, point, codec)
+                if encoded is not None:
+                    writers[archive_path].append(name, encoded)
+                    count += 1
+            elif not os.path.exists(filename):
+                save_screenshot(filename, data, size, rect, point, codec)
+                count += 1
+    finally:
+        for writer in writers.values():
+            writer.close()
+    if not keep:
+        for p in (path, path + INDEX_EXT):
+            os.remove(p)
+    return count
+
+
+def main(argv: List[str]) -> int:
+    if not argv or argv[0] != "encode":
+        print(__doc__)
+        return 1
+    keep = "--keep" in argv
+    args = [a for a in argv[1:] if a != "--keep"]
+    from sessiondir import session_files
+
+    events_dir = args[0] if args else "events"
+    for path in session_files(events_dir, SPOOL_EXT, staging=True):
+        cnt = encode_spool(path, keep=keep)
+        print(f"encode {os.path.relpath(path, events_dir)}: {cnt} frames")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,478 @@
+"""Storage quota and retention for the events folder.
+
+`events/` grew without limit, and nothing checked the free space before
+`Recorder.save` wrote the next screenshot (or spooled the next raw frame), so
+annotator machines filled up mid-session. A `StorageManager`, kept by the
+Tracker across sessions like the encoder service, tracks the folder's bytes:
+
+- finished sessions from their manifests (sessiondir.py), read once when the
+  manager starts (on its own thread) and updated when a session is finalized,
+  compacted, moved or discarded;
+- recording sessions incrementally, from the bytes their recorder reports after
+  every event (event log and encoded screenshots; the raw spool is scratch
+  space, deleted when the session ends, and only shows in the free space);
+- the volume's free space, polled every STORAGE_POLL_SECONDS and reduced by
+  what the recorders wrote since.
+
+The headroom is what can still be written before `events/` reaches
+STORAGE_QUOTA_GB or the volume's free space drops to STORAGE_RESERVE_GB.
+`state()` is O(1) and is asked by the recorder for every screenshot:
+
+    "ok"        screenshots are recorded as configured
+    "degrade"   less than STORAGE_DEGRADE_GB of headroom: screenshots are encoded
+                with QUOTA_CODEC (lossy WebP, about 1/7 of a PNG) right away,
+                never spooled raw, and marked `screenshot_degraded: "quota"`
+    "pause"     no headroom: no screenshot is written; the event keeps the
+                previous one and is marked `screenshot_skipped: "quota"`
+
+The write rate, smoothed over RATE_WINDOW seconds, projects the time until the
+headroom is used up; `status()` is the line shown in the tracker window's
+footer.
+
+While no session is recording, the manager's thread also
+- with COMPACT_CODEC set (off by default), compacts finished sessions older
+  than COMPACT_AFTER seconds: their `screenshot/` folder is packed into the
+  session archive (archive.py), PNGs re-encoded with the codec ("webp-lossless":
+  the same pixels, about 35% smaller); a recording that starts meanwhile
+  interrupts it. Postprocess unpacks such sessions again (postprocess/archive.py);
+- with STORAGE_ARCHIVE_DIR set (e.g. a folder on another drive), moves the
+  oldest finished sessions there while storage is short.
+Recorded sessions are never deleted.
+
+Command line (run from the tracker directory):
+
+    python storage.py status  [events_dir]   usage, free space, sessions left to compact
+    python storage.py compact [events_dir] [codec]
+                                             compact every finished session now
+                                             (codec: default COMPACT_CODEC or "webp-lossless")
+"""
+
+from __future__ import annotations
+
+import io
+import math
+import os
+import shutil
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from archive import ARCHIVE_EXT, delete_archive, pack_session
+from imagecodec import get_codec, save_image
+from log import get_logger
+from sessiondir import directory_bytes, read_manifest, session_dirs, update_manifest
+
+STORAGE_QUOTA_GB = 20.0  # events/ may use this much; None: only the free-space reserve applies
+STORAGE_RESERVE_GB = 2.0  # free space always left on the volume
+STORAGE_DEGRADE_GB = 2.0  # headroom below which screenshots are degraded
+QUOTA_CODEC = "webp"  # codec of screenshots while storage is short (see imagecodec.py)
+COMPACT_CODEC: Optional[str] = None  # e.g. "webp-lossless": compact finished sessions in the background; None: never
+COMPACT_AFTER = 300.0  # s after a session finished before it is compacted or moved
+STORAGE_ARCHIVE_DIR: Optional[str] = None  # finished sessions move here while storage is short; None: never
+STORAGE_POLL_SECONDS = 5.0
+RATE_WINDOW = 60.0  # s, smoothing of the write rate
+
+OK = "ok"
+DEGRADE = "degrade"
+PAUSE = "pause"
+
+GB = 1024 ** 3
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_SCREENSHOT_DIR = "screenshot"
+
+
+class _Interrupted(Exception):
+    """A recording started while a session was being compacted."""
+
+
+class StorageManager:
+    """Byte accounting, quota state and background retention for one events folder.
+
+    `begin()`, `update()`, `finished()` and `discarded()` are called by recorders;
+    `state()` and `status()` from any thread.
+    """
+
+    def __init__(self, root: str = "events", quota_gb: Optional[float] = STORAGE_QUOTA_GB,
+                 reserve_gb: float = STORAGE_RESERVE_GB, degrade_gb: float = STORAGE_DEGRADE_GB,
+                 compact_codec: Optional[str] = COMPACT_CODEC, compact_after: float = COMPACT_AFTER,
+                 archive_dir: Optional[str] = STORAGE_ARCHIVE_DIR, poll_seconds: float = STORAGE_POLL_SECONDS,
+                 background: bool = True):
+        self.root = root
+        self.quota = int(quota_gb * GB) if quota_gb else None
+        self.reserve = int(reserve_gb * GB)
+        self.degrade = int(degrade_gb * GB)
+        self.compact_codec = get_codec(compact_codec) if compact_codec else None
+        self.compact_after = compact_after
+        self.archive_dir = archive_dir
+        self.poll_seconds = poll_seconds
+        self._logger = get_logger("storage")
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        self._finished: Dict[str, int] = {}  # session name -> bytes, from its manifest
+        self._finished_total = 0
+        self._recording: Dict[str, int] = {}  # session name -> bytes reported so far
+        self._recording_total = 0
+        self._other = 0  # sessions left in staging, flat-layout files
+        self._skip: set = set()  # sessions not to compact again
+
+        self._free: Optional[int] = None  # volume free space at the last poll
+        self._written = 0  # bytes reported by recorders
+        self._written_at_poll = 0
+        self._polled: Optional[float] = None  # time.monotonic()
+        self._rate = 0.0  # bytes/s, smoothed
+        self._state = OK
+
+        self.scanned = threading.Event()
+        self.compacted = 0
+        self.bytes_saved = 0
+        self.moved = 0
+
+        os.makedirs(root, exist_ok=True)
+        self.poll()
+        self._thread: Optional[threading.Thread] = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name="StorageManager", daemon=True)
+            self._thread.start()
+        else:
+            self.scan()
+
+    # Recorders
+
+    def begin(self, name: str) -> None:
+        """A session started recording into its staging directory."""
+        with self._lock:
+            self._recording.setdefault(name, 0)
+
+    def update(self, name: str, nbytes: int) -> None:
+        """Bytes the recording session `name` has written so far (after every event)."""
+        with self._lock:
+            previous = self._recording.get(name)
+            if previous is None:
+                return
+            self._recording[name] = nbytes
+            self._recording_total += nbytes - previous
+            self._written += max(0, nbytes - previous)
+
+    def finished(self, name: str, directory: str) -> None:
+        """The session's files in `directory` are complete (again after its Markdown is
+        written): count it from its manifest from now on."""
+        nbytes = _session_bytes(directory)
+        with self._lock:
+            self._recording_total -= self._recording.pop(name, 0)
+            self._finished_total += nbytes - self._finished.get(name, 0)
+            self._finished[name] = nbytes
+
+    def discarded(self, name: str) -> None:
+        with self._lock:
+            self._recording_total -= self._recording.pop(name, 0)
+            self._finished_total -= self._finished.pop(name, 0)
+
+    # State
+
+    def used(self) -> int:
+        """Bytes in the events folder."""
+        with self._lock:
+            return self._finished_total + self._recording_total + self._other
+
+    def _headroom(self) -> Optional[int]:
+        limits = []
+        if self.quota is not None:
+            limits.append(self.quota - (self._finished_total + self._recording_total + self._other))
+        if self._free is not None:
+            limits.append(self._free - (self._written - self._written_at_poll) - self.reserve)
+        return min(limits) if limits else None
+
+    def headroom(self) -> Optional[int]:
+        """Bytes that can still be written (None: unknown, no limit applies)."""
+        with self._lock:
+            return self._headroom()
+
+    def state(self) -> str:
+        """OK, DEGRADE or PAUSE, see the module docstring."""
+        with self._lock:
+            headroom = self._headroom()
+            if headroom is None or headroom >= self.degrade:
+                state = OK
+            elif headroom > 0:
+                state = DEGRADE
+            else:
+                state = PAUSE
+            previous, self._state = self._state, state
+        if state != previous:
+            log = self._logger.info if state == OK else self._logger.warning
+            log("storage %s -> %s: %s", previous, state, self.status())
+        return state
+
+    def time_to_full(self) -> Optional[float]:
+        """Seconds until the headroom is used up at the current write rate, None while
+        nothing is recording (or the rate is negligible)."""
+        with self._lock:
+            headroom = self._headroom()
+            if not self._recording or headroom is None or self._rate < 1024:
+                return None
+            return max(0.0, headroom / self._rate)
+
+    def status(self) -> str:
+        """One line for the tracker window: usage, free space and projected time until full."""
+        with self._lock:
+            used = self._finished_total + self._recording_total + self._other
+            free = self._free
+            state = self._state
+        parts = [f"Recordings: {_gb(used)}" + (f" of {_gb(self.quota)}" if self.quota is not None else "")
+                 + ("" if self.scanned.is_set() else " (counting...)")]
+        if free is not None:
+            parts.append(f"{_gb(free)} free on disk")
+        if state == PAUSE:
+            parts.append("storage full, screenshots paused")
+        else:
+            remaining = self.time_to_full()
+            if remaining is not None:
+                parts.append(f"full in about {_duration(remaining)}")
+            if state == DEGRADE:
+                parts.append("low on space, screenshots compressed")
+        return "  |  ".join(parts)
+
+    def summary(self) -> str:
+        return (f"{_gb(self.used())} used, headroom {_gb(self.headroom() or 0)}, write rate "
+                f"{self._rate / (1024 * 1024):.1f} MB/s, {self.compacted} sessions compacted "
+                f"({_gb(self.bytes_saved)} saved), {self.moved} moved to the archive folder")
+
+    # Background
+
+    def poll(self) -> None:
+        """Read the volume's free space and update the write rate."""
+        try:
+            free: Optional[int] = shutil.disk_usage(self.root).free
+        except OSError:
+            free = None
+        now = time.monotonic()
+        with self._lock:
+            if self._polled is not None and now > self._polled:
+                elapsed = now - self._polled
+                sample = (self._written - self._written_at_poll) / elapsed
+                if self._rate == 0.0:
+                    self._rate = sample
+                else:
+                    self._rate += (1.0 - math.exp(-elapsed / RATE_WINDOW)) * (sample - self._rate)
+            self._polled = now
+            self._free = free
+            self._written_at_poll = self._written
+
+    def scan(self) -> None:
+        """Count the folder's bytes: manifests of finished sessions, staging leftovers and
+        flat-layout files."""
+        started = time.perf_counter()
+        finished = {os.path.basename(d): _session_bytes(d) for d in session_dirs(self.root)}
+        with self._lock:
+            recording = set(self._recording)
+        other = sum(directory_bytes(d)["total"] for d in session_dirs(self.root, staging=True)
+                    if os.path.basename(d) not in recording)
+        other += _flat_bytes(self.root)
+        with self._lock:
+            for name, nbytes in finished.items():
+                self._finished.setdefault(name, nbytes)  # finished() meanwhile is more recent
+            self._finished_total = sum(self._finished.values())
+            self._other = other
+        self.scanned.set()
+        self._logger.info("%d sessions, %s in %s (scanned in %.0f ms)", len(finished), _gb(self.used()),
+                          self.root, (time.perf_counter() - started) * 1000)
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._logger.info("storage: %s", self.summary())
+
+    def _run(self) -> None:
+        try:
+            self.scan()
+        except Exception:
+            self._logger.exception("could not scan %s", self.root)
+            self.scanned.set()
+        while not self._stopped.wait(self.poll_seconds):
+            try:
+                self.poll()
+                self.state()
+                if not self._recording:
+                    self._make_room()
+                if not self._recording and self.compact_codec is not None:
+                    self._compact_next()
+            except Exception:
+                self._logger.exception("storage maintenance failed")
+
+    def _settled(self) -> List[str]:
+        """Finished session directories, oldest first, that finished COMPACT_AFTER ago."""
+        dirs = []
+        now = time.time()
+        for directory in session_dirs(self.root):
+            try:
+                finished = os.path.getmtime(directory)
+            except OSError:
+                continue
+            if now - finished >= self.compact_after:
+                dirs.append((finished, directory))
+        return [directory for _, directory in sorted(dirs)]
+
+    def _make_room(self) -> None:
+        """Move the oldest finished sessions to the archive folder while storage is short."""
+        if self.archive_dir is None or self.state() == OK:
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for directory in self._settled():
+            if self._recording or self.state() == OK or self._stopped.is_set():
+                return
+            name = os.path.basename(directory)
+            target = os.path.join(self.archive_dir, name)
+            if os.path.exists(target):
+                continue
+            started = time.perf_counter()
+            shutil.move(directory, target)  # copy + delete across volumes
+            with self._lock:
+                self._finished_total -= self._finished.pop(name, 0)
+            self.moved += 1
+            self._logger.warning("storage short: moved session %s to %s in %.1f s", name, self.archive_dir,
+                                 time.perf_counter() - started)
+
+    def _compact_next(self) -> bool:
+        """Compact the oldest settled session that needs it; False if none does."""
+        for directory in self._settled():
+            name = os.path.basename(directory)
+            if name in self._skip:
+                continue
+            if needs_compaction(directory):
+                self.compact(directory)
+                return True
+            self._skip.add(name)
+        return False
+
+    def compact(self, directory: str, interruptible: bool = True) -> int:
+        """Pack a finished session's screenshot folder into its archive, re-encoding PNGs
+        with the compaction codec; returns the bytes saved (0 if interrupted)."""
+        name = os.path.basename(directory)
+        archive_path = os.path.join(directory, name + ARCHIVE_EXT)
+        before = _session_bytes(directory)
+        started = time.perf_counter()
+
+        def recode(member: str, data: bytes) -> Tuple[str, bytes]:
+            if interruptible and (self._recording or self._stopped.is_set()):
+                raise _Interrupted
+            return recode_png(member, data, self.compact_codec.name) if self.compact_codec else (member, data)
+
+        try:
+            frames = pack_session(os.path.join(directory, name + ".jsonl"), recode=recode)
+        except _Interrupted:
+            # The JSONL and the screenshots are untouched; the next attempt starts over.
+            delete_archive(archive_path)
+            self._logger.info("compaction of %s interrupted by a recording", name)
+            return 0
+        screenshots = os.path.join(directory, _SCREENSHOT_DIR)
+        if os.path.isdir(screenshots) and not os.listdir(screenshots):
+            os.rmdir(screenshots)
+        manifest = update_manifest(directory, compacted={
+            "frames": frames, "codec": self.compact_codec.name if self.compact_codec else None})
+        after = manifest["bytes"]["total"] if manifest is not None else directory_bytes(directory)["total"]
+        with self._lock:
+            if name in self._finished:
+                self._finished_total += after - self._finished[name]
+                self._finished[name] = after
+        self._skip.add(name)
+        self.compacted += 1
+        self.bytes_saved += before - after
+        self._logger.info("compacted session %s: %d frames, %s -> %s in %.1f s", name, frames, _gb(before),
+                          _gb(after), time.perf_counter() - started)
+        return before - after
+
+
+def needs_compaction(directory: str) -> bool:
+    """A finished session with a screenshot folder and no archive yet."""
+    name = os.path.basename(directory)
+    return (os.path.isdir(os.path.join(directory, _SCREENSHOT_DIR))
+            and not os.path.exists(os.path.join(directory, name + ARCHIVE_EXT)))
+
+
+def recode_png(name: str, data: bytes, codec_name: str) -> Tuple[str, bytes]:
+    """Re-encode a PNG screenshot with a lossless codec if that makes it smaller; returns
+    the (member name, data) to archive. Other formats are kept as they are."""
+    codec = get_codec(codec_name)
+    if not data.startswith(_PNG_SIGNATURE) or not codec.lossless:
+        return name, data
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            out = io.BytesIO()
+            save_image(image.convert("RGB"), out, codec)
+    except Exception:
+        return name, data
+    if out.tell() >= len(data):
+        return name, data
+    return os.path.splitext(name)[0] + codec.ext, out.getvalue()
+
+
+def _session_bytes(directory: str) -> int:
+    manifest = read_manifest(directory)
+    total = (manifest or {}).get("bytes", {}).get("total")
+    return int(total) if total is not None else directory_bytes(directory)["total"]
+
+
+def _flat_bytes(root: str) -> int:
+    """Bytes of flat-layout files: directly in `root`, and in `root/screenshot`."""
+    total = 0
+    for directory in (root, os.path.join(root, _SCREENSHOT_DIR)):
+        if not os.path.isdir(directory):
+            continue
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        total += entry.stat().st_size
+                except OSError:
+                    continue
+    return total
+
+
+def _gb(nbytes: float) -> str:
+    if abs(nbytes) < GB:
+        return f"{nbytes / (1024 * 1024):.0f} MB"
+    return f"{nbytes / GB:.1f} GB"
+
+
+def _duration(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return "1 min"
+    if minutes < 60:
+        return f"{minutes} min"
+    hours = minutes // 60
+    if hours < 48:
+        return f"{hours} h {minutes % 60} min"
+    return f"{hours // 24} days"
+
+
+def main(argv: List[str]) -> int:
+    if not argv or argv[0] not in ("status", "compact"):
+        print(__doc__)
+        return 1
+    root = argv[1] if len(argv) > 1 else "events"
+    if not os.path.isdir(root):
+        print(f"{root} is not a directory")
+        return 1
+    codec = argv[2] if len(argv) > 2 else COMPACT_CODEC or "webp-lossless"
+    manager = StorageManager(root, compact_codec=codec, background=False)
+    if argv[0] == "status":
+        pending = [d for d in session_dirs(root) if needs_compaction(d)]
+        print(manager.status())
+        print(f"{len(pending)} sessions to compact")
+        return 0
+    for directory in session_dirs(root):
+        if needs_compaction(directory):
+            saved = manager.compact(directory, interruptible=False)
+            print(f"compact {os.path.basename(directory)}: {_gb(saved)} saved")
+    print(manager.status())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,5 +1,10 @@
 import random
+from encoder import EncoderService
+from eventlog import recover_event_logs
 from monitor import Monitor
+from recorder import ENCODER_EXECUTOR
+from sessiondir import recover_sessions
+from storage import StorageManager
 from task import *
 
 
@@ -14,6 +19,13 @@ class Tracker:
         print(f"task num = {self.task_num}")
         self.task_id = random.randint(0, self.task_num - 1)
         self.task = None
+        # One warm screenshot encoder pool for all sessions, so starting/finishing a task is fast
+        self.encoder = EncoderService(ENCODER_EXECUTOR)
+        # Truncate event logs torn by a crash of the previous run, finalize its sessions
+        recover_event_logs("events")
+        recover_sessions("events")
+        # Disk usage of the recordings, quota and background compaction (shown in the window's footer)
+        self.storage = StorageManager("events")
 
     def get_given_task(self, offset):
         while True:
@@ -35,7 +47,7 @@ class Tracker:
 
     def start(self):
         if not self.running:
-            self.monitor = Monitor(self.task)
+            self.monitor = Monitor(self.task, encoder=self.encoder, quota=self.storage)
             self.monitor.start()
             self.running = True
 
@@ -44,6 +56,12 @@ class Tracker:
             self.monitor.stop()
             self.running = False
 
+    def close(self):
+        # stop the encoder pool when the app quits (after the last session was stopped)
+        self.stop()
+        self.encoder.close()
+        self.storage.close()
+
     def finish(self):
         if self.running:
             self.monitor.finish()
@@ -0,0 +1,194 @@
+"""Mouse trajectory channel.
+
+Pointer moves arrive at the mouse's report rate (125-1000 Hz), so recording each
+one as an event is not an option, and the monitor used to ignore them: drags
+were recorded as their two endpoints and hovering was lost. A
+`TrajectoryBuffer` samples the moves on the listener thread into a preallocated
+array and simplifies the path online (sleeve fitting, after Zhao and Saalfeld):
+the current segment starts at the last kept point, and every later move narrows
+the cone of directions in which a line passes within TRAJECTORY_TOLERANCE pixels
+of all of them. When the cone becomes empty (or the pointer turns back), the
+previous move ends the segment
+and is kept; a move after a TRAJECTORY_DWELL pause keeps the position the
+pointer rested at (hover). Each move costs O(1) and nothing is stored for the
+discarded ones.
+
+Each click takes the path collected since the previous click (the approach to
+the click, or the drag itself on release). The path is attached to the click or
+drag event as a packed field:
+
+    "trajectory": {"points": <kept>, "raw": <moves seen>, "dropped": <points lost to the capacity>,
+                   "data": <base64 of little-endian int32 (x, y, ms) triplets>}
+
+where ms is the point's time relative to the event's `input_ns` (negative: before
+the click). `decode()` unpacks it.
+"""
+
+from __future__ import annotations
+
+import base64
+import math
+import sys
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+MOUSE_TRAJECTORY = True  # attach the simplified pointer path to click and drag events
+TRAJECTORY_POINTS = 512  # kept points per path; the oldest half is dropped when full
+TRAJECTORY_TOLERANCE = 3.0  # px, largest distance of a dropped move from the simplified path
+TRAJECTORY_DWELL = 0.2  # s, a pointer resting this long keeps its position (hover)
+
+_FIELDS = 3  # x, y, ms
+
+
+class Trajectory:
+    """A taken path: kept points (x, y, ms since the buffer's epoch) and counters."""
+
+    __slots__ = ("data", "epoch_ns", "raw", "dropped")
+
+    def __init__(self, data: array, epoch_ns: int, raw: int, dropped: int):
+        self.data = data
+        self.epoch_ns = epoch_ns
+        self.raw = raw
+        self.dropped = dropped
+
+    @property
+    def points(self) -> int:
+        return len(self.data) // _FIELDS
+
+    def to_json(self, event_ns: int) -> Dict[str, Any]:
+        """Packed, JSON-friendly form with times relative to `event_ns` (perf_counter_ns)."""
+        data = array("i", self.data)
+        offset = (self.epoch_ns - event_ns) // 1_000_000
+        for i in range(2, len(data), _FIELDS):
+            data[i] += offset
+        if sys.byteorder == "big":
+            data.byteswap()
+        return {
+            "points": self.points,
+            "raw": self.raw,
+            "dropped": self.dropped,
+            "data": base64.b64encode(data.tobytes()).decode("ascii"),
+        }
+
+
+def decode(field: Dict[str, Any]) -> List[Tuple[int, int, int]]:
+    """(x, y, ms) points of a packed "trajectory" field."""
+    data = array("i", base64.b64decode(field["data"]))
+    if sys.byteorder == "big":
+        data.byteswap()
+    return [tuple(data[i:i + _FIELDS]) for i in range(0, len(data), _FIELDS)]
+
+
+class TrajectoryBuffer:
+    """Online-simplified pointer path.
+
+    `add()` and `take()` are called from the mouse listener thread only.
+    """
+
+    def __init__(self, capacity: int = TRAJECTORY_POINTS, tolerance: float = TRAJECTORY_TOLERANCE,
+                 dwell: float = TRAJECTORY_DWELL):
+        self.capacity = max(4, int(capacity))
+        self.tolerance = float(tolerance)
+        # The segment ends at a move, not on the cone's axis: half the tolerance for the
+        # cone keeps every dropped move within `tolerance` of the segment.
+        self._radius = self.tolerance / 2
+        self.dwell_ms = int(dwell * 1000)
+        self._data = array("i", bytes(4 * _FIELDS * self.capacity))  # preallocated, never resized
+        self.moves = 0  # moves seen in the session
+        self.kept = 0  # points kept in the session
+        self._reset()
+
+    def _reset(self) -> None:
+        self._n = 0  # committed points in _data
+        self._epoch_ns = 0
+        self._raw = 0
+        self._dropped = 0
+        self._candidate: Optional[Tuple[int, int, int]] = None  # latest move, not yet committed
+        self._reset_cone()
+
+    def _reset_cone(self) -> None:
+        # Feasible directions of the current segment: [lo, hi] radians around _axis (None: any)
+        self._axis: Optional[float] = None
+        self._lo = self._hi = 0.0
+        self._reach = 0.0  # distance of the farthest move from the segment's start
+
+    def add(self, x: int, y: int, ns: Optional[int] = None) -> None:
+        """One pointer move (listener thread); `ns` defaults to time.perf_counter_ns()."""
+        if ns is None:
+            ns = time.perf_counter_ns()
+        self.moves += 1
+        self._raw += 1
+        if self._n == 0 and self._candidate is None:
+            self._epoch_ns = ns
+            self._commit(x, y, 0)
+            return
+        ms = (ns - self._epoch_ns) // 1_000_000
+        candidate = self._candidate
+        if candidate is not None and ms - candidate[2] >= self.dwell_ms:
+            self._commit(*candidate)  # the pointer rested there (hover)
+            self._narrow(x, y)
+        elif not self._narrow(x, y) and candidate is not None:
+            self._commit(*candidate)  # no line fits: the previous move ends the segment
+            self._narrow(x, y)
+        self._candidate = (x, y, ms)
+
+    def _narrow(self, x: int, y: int) -> bool:
+        """Narrow the cone by the move (x, y); False if it would become empty (cone unchanged)."""
+        base = (self._n - 1) * _FIELDS
+        dx, dy = x - self._data[base], y - self._data[base + 1]
+        distance = math.hypot(dx, dy)
+        if distance < self._reach - self._radius:
+            return False  # the pointer turned back: the segment would not cover the farther moves
+        if distance <= self._radius:
+            return True  # close to any line through the segment's start
+        self._reach = max(self._reach, distance)
+        angle = math.atan2(dy, dx)
+        half = math.asin(self._radius / distance)
+        if self._axis is None:
+            self._axis, self._lo, self._hi = angle, -half, half
+            return True
+        angle = (angle - self._axis + math.pi) % (2 * math.pi) - math.pi
+        lo, hi = max(self._lo, angle - half), min(self._hi, angle + half)
+        if lo > hi:
+            return False
+        self._lo, self._hi = lo, hi
+        return True
+
+    def _commit(self, x: int, y: int, ms: int) -> None:
+        if self._n == self.capacity:
+            # Keep the recent half: it matters most for the click that follows.
+            half = self.capacity // 2
+            self._data[:half * _FIELDS] = self._data[half * _FIELDS:]
+            self._data[half * _FIELDS:] = array("i", bytes(4 * _FIELDS * half))
+            self._n -= half
+            self._dropped += half
+        base = self._n * _FIELDS
+        self._data[base] = x
+        self._data[base + 1] = y
+        self._data[base + 2] = ms
+        self._n += 1
+        self.kept += 1
+        self._candidate = None
+        self._reset_cone()
+
+    def take(self, x: Optional[int] = None, y: Optional[int] = None,
+             ns: Optional[int] = None) -> Optional[Trajectory]:
+        """The path since the last take, ending at the (x, y) of the click if given,
+        or None without moves; the buffer starts a new path."""
+        if self._n == 0 and self._candidate is None:
+            return None
+        if self._candidate is not None:
+            self._commit(*self._candidate)
+        if x is not None and y is not None:
+            base = (self._n - 1) * _FIELDS
+            if (self._data[base], self._data[base + 1]) != (x, y):
+                ms = ((ns if ns is not None else time.perf_counter_ns()) - self._epoch_ns) // 1_000_000
+                self._commit(x, y, ms)
+        trajectory = Trajectory(self._data[:self._n * _FIELDS], self._epoch_ns, self._raw, self._dropped)
+        self._reset()
+        return trajectory
+
+    def summary(self) -> str:
+        ratio = self.moves / self.kept if self.kept else 0.0
+        return f"{self.moves} pointer moves, {self.kept} points kept ({ratio:.1f}:1)"
@@ -1,12 +1,20 @@
 from datetime import datetime
-from pywinauto import Desktop
 
 
-def get_current_time():
-    return datetime.now().strftime('%Y-%m-%d_%H:%M:%S')
+def get_current_time(ts=None):
+    moment = datetime.now() if ts is None else datetime.fromtimestamp(ts)
+    return moment.strftime('%Y-%m-%d_%H:%M:%S')
 
 
-desktop = Desktop(backend="uia")
+desktop = None  # pywinauto UIA desktop, created on first use (Windows only)
+
+
+def get_desktop():
+    global desktop
+    if desktop is None:
+        from pywinauto import Desktop
+        desktop = Desktop(backend="uia")
+    return desktop
 
 
 def get_element_info_at_position(x, y):
@@ -14,7 +22,7 @@ def get_element_info_at_position(x, y):
     Get UI element info at specified coordinates
     """
     try:
-        element = desktop.from_point(x, y)
+        element = get_desktop().from_point(x, y)
         # Get element's rectangle coordinates
         rect = element.rectangle()
 
@@ -32,6 +40,17 @@ def get_element_info_at_position(x, y):
         return None
 
 
+def get_foreground_window():
+    """
+    Get (handle, rectangle) of the foreground window, or None
+    """
+    import win32gui
+    hwnd = win32gui.GetForegroundWindow()
+    if not hwnd:
+        return None
+    return hwnd, win32gui.GetWindowRect(hwnd)
+
+
 def print_debug(string):
     import sys
     sys.stderr.write(string + "\n")